@@ -0,0 +1,226 @@
+"""Computer opponent.
+
+An AiPlayer plans for one faction away from the frame loop: every
+AI_THINK_INTERVAL game seconds it copies the state it needs into an
+immutable, columnar AiSnapshot and hands it to plan() on a worker process.
+plan() returns a batch of orders by planet row, which become commands
+submitted to the simulation on the first update after the worker finishes,
+so the frame loop never waits for the AI.  Each decision has a time
+budget: plan() checks its deadline between orders and returns the orders
+chosen so far once it runs out.  The check cannot interrupt the work on one
+order, so a decision may overrun its budget by that much.
+
+Commands are validated when they are applied, so a plan made against a
+slightly older state cannot act on planets the AI has since lost, or that
+have been unloaded from a procedural galaxy.  Pure
+Python and NumPy, no pygame.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+import multiprocessing
+import time
+import numpy as np
+from commands import TransferFleet, BuildStation, BuildFighter
+from simulation import Simulation, Rules, MAX_STATION_LEVEL
+
+AI_THINK_INTERVAL = 1.0  # Game seconds between decisions
+AI_TIME_BUDGET = 0.05  # Real seconds a decision may take
+AI_ATTACK_FIGHTERS = 2  # Fighters a fleet needs before it is sent out
+AI_UPGRADE_RESERVE = 20_000  # Resources kept back before upgrading stations
+TARGET_DISTANCE_BIAS = 200  # Added to distances so nearby cheap targets don't always win
+
+# Owner codes in a snapshot, relative to the planning faction
+NOBODY = 0  # Neutral planet, or no fleet
+OWN = 1
+ENEMY = 2
+
+@dataclass(frozen=True)
+class AiSnapshot:
+    """What the planner sees, one array entry per planet in simulation order"""
+    resources: int
+    rules: Rules  # Costs of the match
+    positions: np.ndarray  # (n, 2) float64, fixed while the same planets are loaded
+    resource_rates: np.ndarray  # Fixed while the same planets are loaded
+    owner: np.ndarray  # NOBODY, OWN or ENEMY
+    station_level: np.ndarray
+    pending_stations: np.ndarray  # Station levels under construction or queued
+    pending_fighters: np.ndarray  # Fighters under construction or queued
+    fighters: np.ndarray  # Fighters in the fleet stationed at the planet
+    fleet_owner: np.ndarray  # NOBODY, OWN or ENEMY
+    incoming: np.ndarray  # Whether a fleet of the faction is on its way
+
+def static_tables(sim: Simulation) -> tuple:
+    """Planet names, positions, resource rates and rows by name, which only change with
+    the planets loaded"""
+    store = sim.planet_store
+    names = list(store.names)
+    rates = store.resource_rate[:store.count].astype(np.int64)
+    return names, store.positions(), rates, {name: row for row, name in enumerate(names)}
+
+def snapshot(sim: Simulation, faction: str, positions: np.ndarray, rates: np.ndarray,
+             rows: dict) -> AiSnapshot:
+    """Copy the planner's view of the game, on the simulation's thread.
+
+    Columns are copied straight out of the planet store; only the few planets
+    with production queues are visited from Python.
+    """
+    planets = sim.planet_store
+    n = planets.count
+    owner = planets.owner_codes({faction: OWN, "neutral": NOBODY}, ENEMY)
+    station_level = planets.station_level[:n].astype(np.int16)
+    pending_stations = planets.building_station[:n].astype(np.int16)
+    pending_fighters = planets.building_fighter[:n].astype(np.int16)
+    for row, queue in planets.queues.items():
+        for kind, _ in queue:
+            if kind == "station":
+                pending_stations[row] += 1
+            else:
+                pending_fighters[row] += 1
+
+    fighters = np.zeros(n, dtype=np.int32)
+    fleet_owner = np.zeros(n, dtype=np.int8)
+    docked = np.flatnonzero(planets.fleet[:n] >= 0)
+    if len(docked):
+        store = sim.fleet_store
+        slots = planets.fleet[docked]
+        fighters[docked] = store.fighters[slots]
+        store_codes = np.array([OWN if name == faction else ENEMY for name in store.owner_names],
+                               dtype=np.int8)
+        fleet_owner[docked] = store_codes[store.owner[slots]]
+    incoming = np.zeros(n, dtype=bool)
+    views = sim.fleet_store.views
+    incoming[[rows[name] for slot, name in sim.voyages.items() if views[slot].owner == faction]] = True
+    return AiSnapshot(sim.resources.get(faction, 0), sim.rules, positions, rates, owner,
+                      station_level, pending_stations, pending_fighters, fighters, fleet_owner,
+                      incoming)
+
+def plan(state: AiSnapshot, budget: float = AI_TIME_BUDGET) -> list:
+    """Orders for one decision, cut short once budget seconds have passed.
+
+    The deadline is only checked between orders, so the decision can take
+    up to one order's work longer than budget.
+
+    Orders are ("transfer", source row, target row), ("station", row) or
+    ("fighter", row).  Fleets go first, since conquest is what grows income,
+    then construction in order of the planets' resource rates.
+    """
+    deadline = time.perf_counter() + budget
+    orders = []
+    mine = np.flatnonzero(state.owner == OWN)
+    mine = mine[np.argsort(-state.resource_rates[mine], kind="stable")].tolist()
+
+    # Send strong fleets to the best unclaimed neutral planet without a fleet.
+    # Distances are straight lines; the simulation routes along the hyperlanes
+    targets = np.flatnonzero((state.owner == NOBODY) & (state.fleet_owner == NOBODY)
+                             & ~state.incoming)
+    attackers = [row for row in mine if state.fleet_owner[row] == OWN
+                 and state.fighters[row] >= AI_ATTACK_FIGHTERS]
+    if len(targets) and attackers:
+        positions = state.positions[targets]
+        value = state.resource_rates[targets].astype(np.float64)
+        for row in attackers:
+            if time.perf_counter() > deadline:
+                return orders
+            distance = np.hypot(*(positions - state.positions[row]).T)
+            best = int(np.argmax(value / (distance + TARGET_DISTANCE_BIAS)))
+            if value[best] < 0:
+                break  # Every target is claimed
+            value[best] = -1  # Claimed
+            orders.append(("transfer", row, int(targets[best])))
+
+    resources = state.resources
+    station_cost = state.rules.station_cost
+    fighter_cost = state.rules.fighter_cost
+    for row in mine:
+        if time.perf_counter() > deadline:
+            break
+        built = int(state.station_level[row])
+        pending = int(state.pending_stations[row])
+        level = built + pending
+        if level == 0:
+            if resources >= station_cost(1):
+                orders.append(("station", row))
+                resources -= station_cost(1)
+        elif built >= 1 and state.pending_fighters[row] == 0 and resources >= fighter_cost:
+            orders.append(("fighter", row))
+            resources -= fighter_cost
+        elif (level < MAX_STATION_LEVEL and pending == 0
+              and resources - station_cost(level + 1) >= AI_UPGRADE_RESERVE):
+            orders.append(("station", row))
+            resources -= station_cost(level + 1)
+    return orders
+
+def order_commands(faction: str, orders: list, names: List[str]) -> list:
+    """Commands for a plan's orders, made against planet rows of names"""
+    commands = []
+    for kind, row, *target in orders:
+        if kind == "transfer":
+            commands.append(TransferFleet(faction, names[row], names[target[0]]))
+        elif kind == "station":
+            commands.append(BuildStation(faction, names[row]))
+        else:
+            commands.append(BuildFighter(faction, names[row]))
+    return commands
+
+class AiPlayer:
+    """Plans for one faction on a worker and submits the resulting commands.
+
+    Planning runs in a separate process by default so it doesn't compete with
+    rendering for the GIL; processes=False uses a thread instead.
+    """
+
+    def __init__(self, faction: str = "ai", interval: float = AI_THINK_INTERVAL,
+                 budget: float = AI_TIME_BUDGET, processes: bool = True):
+        self.faction = faction
+        self.interval = interval
+        self.budget = budget
+        if processes:
+            context = multiprocessing.get_context("spawn")
+            self.executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai")
+        self.pending: Optional[Future] = None
+        self.pending_names: List[str] = []  # Planet names by row of the plan in progress
+        self.next_decision = 0.0  # Game time of the next decision
+        self.tables = None  # static_tables() of the current simulation
+        self.tables_version = -1  # Planet store version the tables were made from
+        self.last_error: Optional[BaseException] = None
+
+    def update(self, sim: Simulation) -> List:
+        """Submit a finished plan and start the next one when due, without waiting"""
+        commands = []
+        if self.pending is not None:
+            if not self.pending.done():
+                return commands
+            self.last_error = self.pending.exception()
+            if self.last_error is None:
+                commands = self.commands(self.pending.result(), self.pending_names)
+                for command in commands:
+                    sim.submit(command)
+            self.pending = None
+
+        if sim.current_time >= self.next_decision and self.faction in sim.resources:
+            self.next_decision = sim.current_time + self.interval
+            if self.tables is None or self.tables_version != sim.planet_store.version:
+                self.tables = static_tables(sim)
+                self.tables_version = sim.planet_store.version
+            state = snapshot(sim, self.faction, *self.tables[1:])
+            self.pending = self.executor.submit(plan, state, self.budget)
+            self.pending_names = self.tables[0]
+        return commands
+
+    def commands(self, orders: list, names: Optional[List[str]] = None) -> list:
+        """Commands for the planner's orders, made against rows of names"""
+        return order_commands(self.faction, orders, names if names is not None else self.tables[0])
+
+    def reset(self):
+        """Drop the plan in progress, for when the simulation is replaced"""
+        if self.pending is not None:
+            self.pending.cancel()
+        self.pending = None
+        self.next_decision = 0.0
+        self.tables = None
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
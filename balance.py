@@ -0,0 +1,303 @@
+"""Batch balance runs for Galaxy Conquest.
+
+Plays many headless AI-against-AI matches for every combination of the
+given rule values and resource rate changes, spread over a process pool
+with one worker per core, and streams one fixed-size record per match into
+a results file as matches finish:
+
+    python balance.py --matches 500 --fighter-cost 75 100 150 --output balance.gcb
+    python balance.py --report balance.gcb
+
+The planet table and the parameter sets are handed to each worker once when
+the pool starts; tasks are just (parameter set, seed) pairs, so nothing large
+is pickled per match.  Every parameter set plays the same seeds, and a seed
+fixes the jitter applied to the neutral planets' resource rates, so
+parameter sets are compared on the same maps.  Both factions are planned by
+ai.plan() without a time budget, so a match's result does not depend on the
+machine.  Whichever faction's orders are submitted first gets the contested
+planets, so the order is drawn anew for every decision from the seed.
+
+A results file is a small header, the parameter sets as JSON and then the
+match records back to back; a run that was cut short leaves a file that
+reads up to its last complete record.  Pure Python and NumPy, no pygame.
+"""
+from dataclasses import dataclass, asdict
+from itertools import product
+from typing import List, Optional
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+import numpy as np
+from ai import AI_THINK_INTERVAL, order_commands, plan, snapshot, static_tables
+from simulation import (
+    Simulation, Rules, DEFAULT_RULES, PLANET_DATA, SPACE_STATION_COST, FIGHTER_COST,
+    STATION_BUILD_TIME, FIGHTER_BUILD_TIME,
+)
+
+MATCH_DAYS = 60  # Matches still undecided after this many days are scored on planets
+MATCH_DT = 0.25  # Game seconds per step; coarser than the game's frame rate, same rules
+RATE_JITTER = 0.2  # Neutral resource rates vary by up to this fraction between seeds
+MATCHES_PER_VARIANT = 100
+TASKS_PER_CHUNK_DIVISOR = 32  # Chunks handed to each worker, more balances load better
+PROGRESS_INTERVAL = 5.0  # Seconds between progress lines
+
+RESULTS_MAGIC = b"GCBR"
+RESULTS_VERSION = 1
+HEADER = struct.Struct("<4sHI")  # Magic, version, length of the JSON parameter sets
+
+FACTIONS = ("player", "ai")
+DRAW = 0  # Winner codes; a faction's code is its index in FACTIONS plus one
+
+RESULT_DTYPE = np.dtype([
+    ("variant", "<u2"),
+    ("seed", "<u4"),
+    ("winner", "u1"),
+    ("day", "<u2"),  # Day the match ended on
+    ("battles", "<u4"),
+    ("planets", "<u2", 2),  # Per faction, in FACTIONS order
+    ("income", "<u4", 2),
+    ("station_levels", "<u2", 2),
+    ("resources", "<i8", 2),
+])
+
+@dataclass(frozen=True)
+class Variant:
+    """One parameter set: the match rules and changes to the planets' resource rates"""
+    rules: Rules = DEFAULT_RULES
+    rate_scale: float = 1.0  # Multiplies the resource rates of neutral planets
+    capital_rate: Optional[int] = None  # Resource rate of both capitals, None keeps PLANET_DATA's
+
+def variant_from_dict(data: dict) -> Variant:
+    return Variant(Rules(**data["rules"]), data["rate_scale"], data["capital_rate"])
+
+def planet_table(planet_data=PLANET_DATA) -> tuple:
+    """Names, (n, 2) positions, owners and resource rates of a map"""
+    names = [name for name, _, _, _ in planet_data]
+    positions = np.array([position for _, position, _, _ in planet_data], dtype=np.int32)
+    owners = [owner for _, _, owner, _ in planet_data]
+    rates = np.array([rate for _, _, _, rate in planet_data], dtype=np.int64)
+    return names, positions, owners, rates
+
+# Set once in each worker by init_worker
+_tables: tuple = ()
+_variants: List[Variant] = []
+_days = MATCH_DAYS
+_dt = MATCH_DT
+_jitter = RATE_JITTER
+
+def init_worker(tables: tuple, variants: List[Variant], days: int, dt: float, jitter: float):
+    global _tables, _variants, _days, _dt, _jitter
+    _tables, _variants, _days, _dt, _jitter = tables, variants, days, dt, jitter
+
+def match_planets(tables: tuple, variant: Variant, seed: int, jitter: float) -> list:
+    """Planet data for one match of a parameter set"""
+    names, positions, owners, rates = tables
+    neutral = np.array([owner == "neutral" for owner in owners])
+    rng = np.random.default_rng(seed)
+    scale = np.where(neutral, variant.rate_scale * (1 + rng.uniform(-jitter, jitter, len(rates))), 1.0)
+    rates = np.maximum(np.rint(rates * scale), 1).astype(np.int64)
+    if variant.capital_rate is not None:
+        rates[~neutral] = variant.capital_rate
+    return list(zip(names, map(tuple, positions.tolist()), owners, rates.tolist()))
+
+def eliminated(sim: Simulation, faction: str) -> bool:
+    """Whether a faction has no planets and no fleets left"""
+    if sim.ledger.planet_count(faction):
+        return False
+    return not any(fleet.owner == faction for fleet in sim.fleets.values())
+
+def play(planet_data: list, rules: Rules, seed: int, days: int = MATCH_DAYS,
+         dt: float = MATCH_DT) -> Simulation:
+    """Play one AI-against-AI match until a faction is eliminated or the last day starts"""
+    sim = Simulation(planet_data, seed=seed, rules=rules)
+    names, positions, rates, rows = static_tables(sim)
+    turns = random.Random(seed)  # Which faction submits first, apart from the rules' own draws
+    next_decision = 0.0
+    end = (days - 1) * sim.seconds_per_day  # Day 1 starts at time 0
+    while sim.current_time < end:
+        if sim.current_time >= next_decision:
+            # Both sides plan against the same state, their commands apply next step
+            next_decision = sim.current_time + AI_THINK_INTERVAL
+            for faction in turns.sample(FACTIONS, len(FACTIONS)):
+                orders = plan(snapshot(sim, faction, positions, rates, rows), math.inf)
+                for command in order_commands(faction, orders, names):
+                    sim.submit(command)
+        sim.step(dt)
+        if sim.tick % 64 == 0 and any(eliminated(sim, faction) for faction in FACTIONS):
+            break
+    return sim
+
+def result(sim: Simulation, variant: int, seed: int) -> np.ndarray:
+    """The record of a finished match"""
+    record = np.zeros((), dtype=RESULT_DTYPE)
+    planets = [sim.ledger.planet_count(faction) for faction in FACTIONS]
+    alive = [not eliminated(sim, faction) for faction in FACTIONS]
+    if alive[0] != alive[1]:
+        record["winner"] = alive.index(True) + 1
+    elif planets[0] != planets[1]:
+        record["winner"] = planets.index(max(planets)) + 1
+    else:
+        record["winner"] = DRAW
+    record["variant"] = variant
+    record["seed"] = seed
+    record["day"] = sim.current_day
+    record["battles"] = len(sim.battles)
+    record["planets"] = planets
+    record["income"] = [sim.ledger.income(faction) for faction in FACTIONS]
+    record["station_levels"] = [sim.ledger.get(faction).station_levels for faction in FACTIONS]
+    record["resources"] = [sim.resources.get(faction, 0) for faction in FACTIONS]
+    return record
+
+def play_match(task: tuple) -> bytes:
+    """Play the match of a (parameter set, seed) task in a worker, as a packed record"""
+    index, seed = task
+    variant = _variants[index]
+    sim = play(match_planets(_tables, variant, seed, _jitter), variant.rules, seed, _days, _dt)
+    return result(sim, index, seed).tobytes()
+
+class ResultsWriter:
+    """Appends match records to a results file as they arrive"""
+
+    def __init__(self, path: str, variants: List[Variant]):
+        table = json.dumps([asdict(variant) for variant in variants]).encode("utf-8")
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(RESULTS_MAGIC, RESULTS_VERSION, len(table)) + table)
+        self.count = 0
+
+    def write(self, record: bytes):
+        self.file.write(record)
+        self.file.flush()
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+def read_results(path: str) -> tuple:
+    """The parameter sets and the complete match records of a results file"""
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        raise ValueError("results file is truncated")
+    magic, version, length = HEADER.unpack_from(data)
+    if magic != RESULTS_MAGIC or version != RESULTS_VERSION:
+        raise ValueError("not a balance results file of this version")
+    body = HEADER.size + length
+    variants = [variant_from_dict(item) for item in json.loads(data[HEADER.size:body])]
+    count = (len(data) - body) // RESULT_DTYPE.itemsize
+    return variants, np.frombuffer(data, dtype=RESULT_DTYPE, count=count, offset=body)
+
+def summarize(variants: List[Variant], records: np.ndarray) -> List[dict]:
+    """Win rates and economy averages of every parameter set"""
+    summary = []
+    for index, variant in enumerate(variants):
+        matches = records[records["variant"] == index]
+        count = len(matches)
+        if not count:
+            continue
+        winner = matches["winner"]
+        summary.append({
+            "variant": variant,
+            "matches": count,
+            "wins": [float(np.mean(winner == code)) for code in range(1, len(FACTIONS) + 1)],
+            "draws": float(np.mean(winner == DRAW)),
+            "day": float(matches["day"].mean()),
+            "battles": float(matches["battles"].mean()),
+            "planets": matches["planets"].mean(axis=0).tolist(),
+            "income": matches["income"].mean(axis=0).tolist(),
+            "station_levels": matches["station_levels"].mean(axis=0).tolist(),
+        })
+    return summary
+
+def describe(variant: Variant) -> str:
+    rules = variant.rules
+    text = (f"station {rules.space_station_cost} fighter {rules.fighter_cost} "
+            f"build {rules.station_build_time:g}/{rules.fighter_build_time:g}s "
+            f"rates x{variant.rate_scale:g}")
+    if variant.capital_rate is not None:
+        text += f" capital {variant.capital_rate}"
+    return text
+
+def print_summary(summary: List[dict]):
+    print(f"{'parameters':<52}{'matches':>8}{'player':>8}{'ai':>6}{'draw':>6}{'day':>6}"
+          f"{'battles':>8}{'planets':>10}{'income':>12}{'stations':>10}")
+    for row in summary:
+        planets = "/".join(f"{value:.1f}" for value in row["planets"])
+        income = "/".join(f"{value:.0f}" for value in row["income"])
+        stations = "/".join(f"{value:.1f}" for value in row["station_levels"])
+        print(f"{describe(row['variant']):<52}{row['matches']:>8}{row['wins'][0]:>8.0%}"
+              f"{row['wins'][1]:>6.0%}{row['draws']:>6.0%}{row['day']:>6.1f}{row['battles']:>8.1f}"
+              f"{planets:>10}{income:>12}{stations:>10}")
+
+def run(variants: List[Variant], seeds: List[int], path: str, workers: int,
+        days: int = MATCH_DAYS, dt: float = MATCH_DT, jitter: float = RATE_JITTER) -> int:
+    """Play every parameter set on every seed across workers processes, writing to path"""
+    # Seeds outermost, so a run cut short has results for every parameter set
+    tasks = [(index, seed) for seed, index in product(seeds, range(len(variants)))]
+    chunksize = max(1, len(tasks) // (workers * TASKS_PER_CHUNK_DIVISOR))
+    writer = ResultsWriter(path, variants)
+    start = last_report = time.perf_counter()
+    initargs = (planet_table(), variants, days, dt, jitter)
+    try:
+        with multiprocessing.Pool(workers, init_worker, initargs) as pool:
+            for record in pool.imap_unordered(play_match, tasks, chunksize):
+                writer.write(record)
+                now = time.perf_counter()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    print(f"{writer.count}/{len(tasks)} matches, "
+                          f"{writer.count / (now - start):.1f} per second", flush=True)
+    finally:
+        writer.close()
+    return writer.count
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Galaxy Conquest balance runs")
+    parser.add_argument("--report", metavar="RESULTS", help="summarize a results file and exit")
+    parser.add_argument("--output", default="balance.gcb", help="results file to write")
+    parser.add_argument("--matches", type=int, default=MATCHES_PER_VARIANT,
+                        help="matches per parameter set")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first match")
+    parser.add_argument("--days", type=int, default=MATCH_DAYS, help="longest match in game days")
+    parser.add_argument("--dt", type=float, default=MATCH_DT, help="game seconds per step")
+    parser.add_argument("--jitter", type=float, default=RATE_JITTER,
+                        help="largest relative change to neutral resource rates between seeds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per core)")
+    # Every combination of the values below is one parameter set
+    parser.add_argument("--space-station-cost", type=int, nargs="+", default=[SPACE_STATION_COST])
+    parser.add_argument("--fighter-cost", type=int, nargs="+", default=[FIGHTER_COST])
+    parser.add_argument("--station-build-time", type=float, nargs="+", default=[STATION_BUILD_TIME])
+    parser.add_argument("--fighter-build-time", type=float, nargs="+", default=[FIGHTER_BUILD_TIME])
+    parser.add_argument("--rate-scale", type=float, nargs="+", default=[1.0],
+                        help="multipliers of the neutral planets' resource rates")
+    parser.add_argument("--capital-rate", type=int, nargs="+", default=[None],
+                        help="resource rates of the capitals")
+    args = parser.parse_args(argv)
+
+    if not args.report:
+        variants = [Variant(Rules(*rules), rate_scale, capital_rate)
+                    for *rules, rate_scale, capital_rate in product(
+                        args.space_station_cost, args.fighter_cost, args.station_build_time,
+                        args.fighter_build_time, args.rate_scale, args.capital_rate)]
+        seeds = list(range(args.seed, args.seed + args.matches))
+        start = time.perf_counter()
+        count = run(variants, seeds, args.output, args.workers, args.days, args.dt, args.jitter)
+        print(f"{count} matches in {time.perf_counter() - start:.1f} s "
+              f"on {args.workers} workers, written to {args.output}")
+
+    try:
+        variants, records = read_results(args.report or args.output)
+    except (OSError, ValueError) as error:
+        print(f"Could not read {args.report or args.output}: {error}")
+        return 2
+    print_summary(summarize(variants, records))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""Headless benchmark suite for Galaxy Conquest.
+
+Drives GalaxyConquest frame by frame under SDL's dummy video driver over
+parameterized scenarios (planet, fleet and star counts, galaxy or planet
+view, zoom transitions, flights across a procedural galaxy, a simulation
+thread) and reports frames and simulation steps per second, per-phase timings
+from the frame profiler and peak memory.  Results are written as JSON and can
+be compared against a baseline run:
+
+    python benchmark.py --output results.json
+    python benchmark.py --baseline results.json --threshold 0.1
+
+python benchmark.py --memory reports the bytes each planet, fleet and star
+costs in large galaxies instead.  Each scenario runs in a fresh process so
+caches and peak memory do not leak from one scenario into the next.  The
+exit status is 1 if any scenario regressed by more than the threshold.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, List
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import numpy as np
+import pygame
+from galaxy import ChunkedGalaxy
+from galaxy_conquest import GalaxyConquest, Starfield, StarTable, SIM_DT
+from planet_store import PlanetStore
+from profiler import profiler, FRAME_PHASE
+from simulation import Simulation, PLANET_DATA, WORLD_WIDTH, WORLD_HEIGHT
+
+BENCHMARK_FRAMES = 300
+WARMUP_FRAMES = 30
+ZOOM_PERIOD = 90  # Frames between zoom direction changes in the zoom scenario
+PAN_PERIOD = 600  # Frames for the camera to circle the galaxy once
+BATTLE_WAVE_PERIOD = 60  # Frames between waves of simultaneous attacks
+FLY_SPEED = (97, 41)  # World units per frame the camera crosses a procedural galaxy at
+REGRESSION_THRESHOLD = 0.10  # Allowed relative slowdown against the baseline
+MEMORY_PLANETS = 100_000
+MEMORY_FLEETS = 100_000
+MEMORY_STARS = 1_000_000
+
+@dataclass
+class Scenario:
+    name: str
+    planets: int = len(PLANET_DATA)
+    fleets: int = 0
+    stars: int = 1000
+    view: str = "galaxy"  # "galaxy", "planet", "zoom" or "fly"
+    ai: bool = False  # Run the AI opponent on its worker process
+    battles: int = 0  # Attacks that land in the same step, once every BATTLE_WAVE_PERIOD frames
+    chunks: int = 0  # Chunks per side of a procedural galaxy used instead of the planets
+    threaded: bool = False  # Step the simulation in real time on its own thread
+    frames: int = BENCHMARK_FRAMES
+    seed: int = 1
+
+SCENARIOS = {scenario.name: scenario for scenario in [
+    Scenario("galaxy-20"),
+    Scenario("galaxy-200", planets=200),
+    Scenario("galaxy-2000", planets=2000),
+    Scenario("fleets-1000", fleets=1000),
+    Scenario("fleets-10000", fleets=10000),
+    Scenario("stars-20000", stars=20000),
+    Scenario("planet-view", view="planet"),
+    Scenario("zoom", view="zoom"),
+    Scenario("ai-2000", planets=2000, ai=True),
+    Scenario("battles-2000", planets=2000, battles=300),
+    Scenario("chunked-fly", chunks=1024, view="fly"),
+    Scenario("galaxy-2000-threaded", planets=2000, threaded=True),
+    Scenario("fleets-10000-threaded", fleets=10000, threaded=True),
+]}
+
+def synthetic_planet_data(count: int, rng: random.Random) -> list:
+    """PLANET_DATA, cut down or extended with random planets to count entries"""
+    data = list(PLANET_DATA[:count])
+    margin = 100
+    for index in range(len(data), count):
+        position = (rng.randint(margin, WORLD_WIDTH - margin),
+                    rng.randint(margin, WORLD_HEIGHT - margin))
+        owner = rng.choices(("neutral", "player", "ai"), weights=(8, 1, 1))[0]
+        data.append((f"Planet {index}", position, owner, rng.randint(5, 50)))
+    return data
+
+def random_position(rng: random.Random) -> tuple[float, float]:
+    return (rng.uniform(0, WORLD_WIDTH), rng.uniform(0, WORLD_HEIGHT))
+
+def build_game(scenario: Scenario) -> GalaxyConquest:
+    """A game set up for a scenario, with its galaxy, fleets and stars"""
+    rng = random.Random(scenario.seed)
+    if scenario.chunks:
+        galaxy = ChunkedGalaxy(scenario.seed, scenario.chunks, scenario.chunks)
+        sim = Simulation((), seed=scenario.seed, galaxy=galaxy)
+    else:
+        sim = Simulation(synthetic_planet_data(scenario.planets, rng), seed=scenario.seed)
+    for _ in range(scenario.fleets):
+        owner = rng.choice(("player", "ai"))
+        sim.create_fleet(owner, random_position(rng), random_position(rng),
+                         fighters=rng.randint(1, 20))
+    game = GalaxyConquest(sim, star_count=scenario.stars, autosave_path=None,
+                         record_dir=None, ai_faction="ai" if scenario.ai else None,
+                         threaded=scenario.threaded)
+
+    if scenario.view not in ("galaxy", "fly"):
+        game.selected_planet = next(iter(sim.planets))
+        game.target_zoom = 1.0
+    return game
+
+def drive(game: GalaxyConquest, scenario: Scenario, frame: int, rng: random.Random):
+    """Apply the scripted input for one frame of a scenario"""
+    if scenario.view == "galaxy":
+        # Circle the camera around the galaxy so culling and redraws are exercised
+        angle = frame * 2 * math.pi / PAN_PERIOD
+        game.camera.center_on((WORLD_WIDTH / 2 + math.cos(angle) * WORLD_WIDTH / 3,
+                               WORLD_HEIGHT / 2 + math.sin(angle) * WORLD_HEIGHT / 3))
+    elif scenario.view == "fly":
+        # Head off in a straight line so new chunks keep streaming in
+        game.camera.x += FLY_SPEED[0]
+        game.camera.y += FLY_SPEED[1]
+    elif scenario.view == "zoom" and frame % ZOOM_PERIOD == 0:
+        game.target_zoom = 0.0 if game.target_zoom else 1.0
+
+    # The simulation is changed on whichever thread steps it
+    if scenario.battles and frame % BATTLE_WAVE_PERIOD == 0:
+        game.call(launch_attacks, scenario.battles, rng)
+    game.call(redirect_arrivals, rng)
+
+def redirect_arrivals(sim: Simulation, rng: random.Random):
+    """Keep fleets flying by sending arrivals somewhere new"""
+    for fleet in sim.arrived_fleets:
+        if fleet.slot in sim.fleets:
+            fleet.destination = random_position(rng)
+
+def launch_attacks(sim: Simulation, count: int, rng: random.Random):
+    """Send count fleets against claimed planets so they all arrive next step"""
+    claimed = [planet for planet in sim.planets.values() if planet.owner != "neutral"]
+    for planet in rng.sample(claimed, min(count, len(claimed))):
+        attacker = "ai" if planet.owner == "player" else "player"
+        x, y = planet.position
+        fleet = sim.create_fleet(attacker, (x + 1, y), planet.position, fighters=rng.randint(1, 20))
+        sim.voyages[fleet.slot] = planet.name
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process in kilobytes, or 0 if unknown"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def run_scenario(scenario: Scenario) -> dict:
+    """Run one scenario in this process and return its measurements"""
+    rng = random.Random(scenario.seed)
+    setup_start = time.perf_counter()
+    game = build_game(scenario)
+    setup_seconds = time.perf_counter() - setup_start
+
+    profiler.reset()
+    profiler.enable()
+    for frame in range(WARMUP_FRAMES):
+        drive(game, scenario, frame, rng)
+        game.frame(SIM_DT)
+    profiler.reset()
+
+    start = time.perf_counter()
+    start_tick = game.sim.tick
+    for frame in range(WARMUP_FRAMES, WARMUP_FRAMES + scenario.frames):
+        drive(game, scenario, frame, rng)
+        game.frame(SIM_DT)
+    seconds = time.perf_counter() - start
+    steps = game.sim.tick - start_tick
+    profiler.enable(False)
+
+    game.stop_sim_thread()
+    if game.ai:
+        game.ai.close()
+    phases = profiler.summary()
+    frame_stats = phases.get(FRAME_PHASE, {})
+    return {
+        "scenario": asdict(scenario),
+        "setup_seconds": setup_seconds,
+        "seconds": seconds,
+        "fps": scenario.frames / seconds,
+        "steps_per_second": steps / seconds,
+        "frame_ms": {key: frame_stats.get(key, 0.0) for key in ("p50", "p95", "p99", "max")},
+        "phases": phases,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+def traced_bytes(build) -> tuple:
+    """build() and the memory it allocated and kept, measured with tracemalloc"""
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    return result, tracemalloc.get_traced_memory()[0] - before
+
+def memory_report(planets: int = MEMORY_PLANETS, fleets: int = MEMORY_FLEETS,
+                  stars: int = MEMORY_STARS) -> Dict[str, float]:
+    """Bytes per entity of each entity table, and of a planet with the simulation's indexes"""
+    data = synthetic_planet_data(planets, random.Random(1))
+    report = {}
+    tracemalloc.start()
+    try:
+        _, size = traced_bytes(lambda: PlanetStore.from_data(data))
+        report["planet"] = size / planets
+        sim, size = traced_bytes(lambda: Simulation(data))
+        report["planet in simulation"] = size / planets
+        _, size = traced_bytes(lambda: [sim.create_fleet("player", (0.0, 0.0), fighters=1)
+                                        for _ in range(fleets)])
+        report["fleet"] = size / fleets
+        table, size = traced_bytes(lambda: StarTable.random(stars, 1))
+        report["star"] = size / stars
+        _, size = traced_bytes(lambda: Starfield(table))
+        report["star in starfield"] = size / stars
+    finally:
+        tracemalloc.stop()
+    return report
+
+def run_isolated(scenario: Scenario) -> dict:
+    """Run a scenario in a fresh process"""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_scenario, scenario).result()
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict],
+            threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Describe every scenario that got slower than the baseline by more than threshold"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["fps"] < base["fps"] * (1 - threshold):
+            regressions.append(f"{name}: {result['fps']:.1f} FPS, baseline {base['fps']:.1f}")
+        p95 = result["frame_ms"]["p95"]
+        base_p95 = base["frame_ms"]["p95"]
+        if p95 > base_p95 * (1 + threshold):
+            regressions.append(f"{name}: p95 frame {p95:.2f} ms, baseline {base_p95:.2f} ms")
+    return regressions
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def print_results(results: Dict[str, dict]):
+    print(f"{'scenario':<24}{'fps':>9}{'steps/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'peak MB':>10}")
+    for name, result in results.items():
+        frame_ms = result["frame_ms"]
+        print(f"{name:<24}{result['fps']:>9.1f}{result['steps_per_second']:>9.1f}"
+              f"{frame_ms['p50']:>9.2f}{frame_ms['p95']:>9.2f}"
+              f"{frame_ms['p99']:>9.2f}{result['peak_rss_kb'] / 1024:>10.1f}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless Galaxy Conquest benchmarks")
+    parser.add_argument("scenarios", nargs="*", help="scenarios to run (default: all)")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+    parser.add_argument("--frames", type=int, help="measured frames per scenario")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="allowed relative slowdown against the baseline")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run every scenario in this process instead of a fresh one")
+    parser.add_argument("--memory", action="store_true",
+                        help="report the memory used per planet, fleet and star and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for scenario in SCENARIOS.values():
+            print(scenario)
+        return 0
+    if args.memory:
+        print(f"{'entity':<24}{'bytes':>9}")
+        for entity, size in memory_report().items():
+            print(f"{entity:<24}{size:>9.1f}")
+        return 0
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        scenario = SCENARIOS[name]
+        if args.frames:
+            scenario = Scenario(**{**asdict(scenario), "frames": args.frames})
+        results[name] = run_scenario(scenario) if args.in_process else run_isolated(scenario)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"environment": environment(), "results": results}, file, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} of {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Player and AI commands.
+
+Every change a player or the AI makes to the game is a small command object
+handed to Simulation.submit().  The simulation applies submitted commands at
+the start of its next step, so the same commands at the same ticks always
+produce the same game, which is what the command log and replays rely on.
+
+Each command names the faction issuing it and does nothing unless that
+faction still owns what it acts on, since the game may have moved on between
+issuing a command and applying it.  In a procedural galaxy the planet may not
+even be loaded any more; loading and unloading chunks are commands too.
+
+Commands are registered with @command and encoded as a one-byte type code
+followed by their string fields.  Codes are assigned in registration order,
+so new commands must be appended below the existing ones.  Pure Python, no
+pygame.
+"""
+from dataclasses import dataclass, fields
+from typing import List
+import struct
+from galaxy import parse_chunk
+
+COMMAND_TYPE = struct.Struct("<B")
+FIELD_LENGTH = struct.Struct("<H")
+
+COMMAND_TYPES: List[type] = []
+
+def command(cls):
+    """Register a command class and give it the next type code"""
+    cls.code = len(COMMAND_TYPES)
+    COMMAND_TYPES.append(cls)
+    return cls
+
+def owns(sim, faction: str, planet: str) -> bool:
+    planet = sim.planets.get(planet)
+    return planet is not None and planet.owner == faction
+
+@command
+@dataclass(frozen=True)
+class TransferFleet:
+    """Send the fleet stationed at one planet to another"""
+    faction: str
+    source: str
+    target: str
+
+    def apply(self, sim) -> bool:
+        source = sim.planets.get(self.source)
+        fleet = source.fleet if source is not None else None
+        if fleet is None or fleet.owner != self.faction:
+            return False
+        return sim.transfer_fleet(self.source, self.target)
+
+@command
+@dataclass(frozen=True)
+class BuildStation:
+    """Order the next space station level at a planet"""
+    faction: str
+    planet: str
+
+    def apply(self, sim) -> bool:
+        return owns(sim, self.faction, self.planet) and sim.build_station(self.planet)
+
+@command
+@dataclass(frozen=True)
+class BuildFighter:
+    """Order a fighter at a planet"""
+    faction: str
+    planet: str
+
+    def apply(self, sim) -> bool:
+        return owns(sim, self.faction, self.planet) and sim.build_fighter(self.planet)
+
+@command
+@dataclass(frozen=True)
+class CancelBuild:
+    """Cancel the newest station or fighter order at a planet"""
+    faction: str
+    planet: str
+    kind: str
+
+    def apply(self, sim) -> bool:
+        return owns(sim, self.faction, self.planet) and sim.cancel_build(self.planet, self.kind)
+
+@command
+@dataclass(frozen=True)
+class LoadChunk:
+    """Load a chunk of a procedural galaxy, given as "x,y" chunk coordinates"""
+    faction: str
+    chunk: str
+
+    def apply(self, sim) -> bool:
+        return sim.load_chunk(parse_chunk(self.chunk))
+
+@command
+@dataclass(frozen=True)
+class UnloadChunk:
+    """Unload a chunk of a procedural galaxy the game hasn't changed"""
+    faction: str
+    chunk: str
+
+    def apply(self, sim) -> bool:
+        return sim.unload_chunk(parse_chunk(self.chunk))
+
+def encode_command(cmd) -> bytes:
+    """Type code followed by each field as length-prefixed UTF-8"""
+    parts = [COMMAND_TYPE.pack(cmd.code)]
+    for field in fields(cmd):
+        value = getattr(cmd, field.name).encode("utf-8")
+        parts.append(FIELD_LENGTH.pack(len(value)) + value)
+    return b"".join(parts)
+
+def decode_command(data, offset: int = 0) -> tuple:
+    """The command encoded at offset in data, and the offset just past it.
+
+    Raises struct.error, IndexError or ValueError if the data is damaged.
+    """
+    (code,) = COMMAND_TYPE.unpack_from(data, offset)
+    offset += COMMAND_TYPE.size
+    cls = COMMAND_TYPES[code]
+    values = []
+    for _ in fields(cls):
+        (length,) = FIELD_LENGTH.unpack_from(data, offset)
+        offset += FIELD_LENGTH.size
+        if offset + length > len(data):
+            raise ValueError("command is truncated")
+        values.append(bytes(data[offset:offset + length]).decode("utf-8"))
+        offset += length
+    return cls(*values), offset
@@ -0,0 +1,58 @@
+"""Per-faction economy totals maintained incrementally.
+
+The ledger is updated whenever a planet changes owner or gains a station
+level, so the HUD, the day rollover and the AI can read planet counts,
+income and station levels per faction in O(1) instead of scanning every
+planet.  Pure Python, no pygame.
+"""
+from dataclasses import dataclass
+from typing import Dict
+
+@dataclass
+class FactionTotals:
+    planets: int = 0
+    income: int = 0  # Resources generated per day
+    station_levels: int = 0
+
+class EconomyLedger:
+    """Running totals of planets, income and station levels per owner"""
+
+    def __init__(self):
+        self.totals: Dict[str, FactionTotals] = {}
+
+    def get(self, owner: str) -> FactionTotals:
+        totals = self.totals.get(owner)
+        if totals is None:
+            totals = self.totals[owner] = FactionTotals()
+        return totals
+
+    def add_planet(self, owner: str, resource_rate: int, station_level: int = 0):
+        totals = self.get(owner)
+        totals.planets += 1
+        totals.income += resource_rate
+        totals.station_levels += station_level
+
+    def remove_planet(self, owner: str, resource_rate: int, station_level: int = 0):
+        totals = self.get(owner)
+        totals.planets -= 1
+        totals.income -= resource_rate
+        totals.station_levels -= station_level
+
+    def transfer(self, old_owner: str, new_owner: str, resource_rate: int, station_level: int = 0):
+        """Move a planet's contribution from one owner to another"""
+        self.remove_planet(old_owner, resource_rate, station_level)
+        self.add_planet(new_owner, resource_rate, station_level)
+
+    def add_station_level(self, owner: str):
+        self.get(owner).station_levels += 1
+
+    def remove_station_levels(self, owner: str, levels: int):
+        self.get(owner).station_levels -= levels
+
+    def income(self, owner: str) -> int:
+        totals = self.totals.get(owner)
+        return totals.income if totals else 0
+
+    def planet_count(self, owner: str) -> int:
+        totals = self.totals.get(owner)
+        return totals.planets if totals else 0
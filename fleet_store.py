@@ -0,0 +1,338 @@
+"""Struct-of-arrays fleet storage with vectorized movement.
+
+Every fleet lives in a slot of a FleetStore, whose NumPy columns hold the
+positions, destinations, speeds, owners and fighter counts of all fleets.
+FleetStore.advance moves every fleet in flight and reports arrivals in one
+vectorized pass; Fleet objects are thin views onto a single slot.
+
+A fleet following a multi-hop route keeps its remaining waypoints in
+FleetStore.routes; on reaching a waypoint it heads straight for the next one
+and only counts as arrived at the last.
+"""
+from typing import Dict, List, Optional
+import numpy as np
+
+FLEET_SPEED = 100
+INITIAL_FLEET_CAPACITY = 64
+SNAPSHOT_COLUMNS = ("position", "destination", "speed", "owner", "size", "fighters", "moving")
+
+class FleetStore:
+    """Columnar storage for all fleets of one simulation"""
+
+    def __init__(self, capacity: int = INITIAL_FLEET_CAPACITY):
+        self.capacity = 0
+        self.count = 0  # High-water mark of used slots
+        self.free_slots: List[int] = []
+        self.views: List[Optional["Fleet"]] = []
+        self.owner_ids: Dict[str, int] = {}
+        self.owner_names: List[str] = []
+        self.routes: Dict[int, List[tuple]] = {}  # Slot -> waypoints after the destination, last first
+
+        self.position = np.zeros((0, 2), dtype=np.float64)
+        self.previous_position = np.zeros((0, 2), dtype=np.float64)  # Before the last advance
+        self.destination = np.zeros((0, 2), dtype=np.float64)
+        self.speed = np.zeros(0, dtype=np.float64)
+        self.owner = np.zeros(0, dtype=np.int16)
+        self.size = np.zeros(0, dtype=np.int32)
+        self.fighters = np.zeros(0, dtype=np.int32)
+        self.moving = np.zeros(0, dtype=bool)
+        self.alive = np.zeros(0, dtype=bool)
+        self.settling = False  # previous_position still differs from position
+        self.grow(capacity)
+
+    def __len__(self):
+        return self.count - len(self.free_slots)
+
+    def grow(self, capacity: int):
+        """Resize every column to hold at least capacity fleets"""
+        if capacity <= self.capacity:
+            return
+        for name in ("position", "previous_position", "destination", "speed", "owner",
+                     "size", "fighters", "moving", "alive"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+        self.views.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+
+    def intern_owner(self, owner: str) -> int:
+        """Small integer id for an owner name"""
+        owner_id = self.owner_ids.get(owner)
+        if owner_id is None:
+            owner_id = len(self.owner_names)
+            self.owner_ids[owner] = owner_id
+            self.owner_names.append(owner)
+        return owner_id
+
+    def allocate(self) -> int:
+        """Reserve a slot for a new fleet"""
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            if self.count == self.capacity:
+                self.grow(max(INITIAL_FLEET_CAPACITY, self.capacity * 2))
+            slot = self.count
+            self.count += 1
+        self.alive[slot] = True
+        self.moving[slot] = False
+        self.speed[slot] = FLEET_SPEED
+        return slot
+
+    def release(self, slot: int):
+        """Free a slot once its fleet has been destroyed or merged"""
+        if not self.alive[slot]:
+            return
+        self.alive[slot] = False
+        self.moving[slot] = False
+        self.views[slot] = None
+        self.routes.pop(slot, None)
+        self.free_slots.append(slot)
+
+    def advance(self, dt: float) -> np.ndarray:
+        """Move every fleet in flight by dt and return the slots that arrived"""
+        n = self.count
+        moving = self.moving[:n]
+        if not moving.any():
+            if self.settling:
+                # Fleets that arrived last step must stop interpolating
+                self.previous_position[:n] = self.position[:n]
+                self.settling = False
+            return np.zeros(0, dtype=np.intp)
+        self.settling = True
+
+        # Work on whole contiguous columns; fleets that are not moving get a
+        # zero step, which is cheaper than gathering the moving subset
+        position = self.position[:n]
+        self.previous_position[:n] = position
+        destination = self.destination[:n]
+        offset = destination - position
+        distance = np.sqrt(np.einsum("ij,ij->i", offset, offset))
+        step = self.speed[:n] * dt
+        arrived = moving & (distance <= step)
+
+        scale = np.divide(step, distance, out=np.zeros(n), where=moving & ~arrived)
+        offset *= scale[:, None]
+        position += offset
+
+        done = np.flatnonzero(arrived)
+        position[done] = destination[done]
+        moving[done] = False
+        if self.routes:
+            done = self.next_waypoints(done)
+        return done
+
+    def next_waypoints(self, reached: np.ndarray) -> np.ndarray:
+        """Send fleets on from the waypoints they reached; returns the ones that arrived"""
+        arrived = []
+        for slot in reached.tolist():
+            route = self.routes.get(slot)
+            if route:
+                self.destination[slot] = route.pop()
+                self.moving[slot] = True
+                if not route:
+                    del self.routes[slot]
+            else:
+                arrived.append(slot)
+        return np.array(arrived, dtype=np.intp)
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Copies of the columns of every live fleet, packed in slot order"""
+        slots = self.live_slots()
+        columns = {name: getattr(self, name)[slots] for name in SNAPSHOT_COLUMNS}
+        columns["slot"] = slots
+        return columns
+
+    @classmethod
+    def restore(cls, columns: Dict[str, np.ndarray], owner_names: List[str],
+                count: Optional[int] = None, free_slots: List[int] = ()) -> "FleetStore":
+        """A store holding the fleets of a snapshot in their original slots, with views.
+
+        With the count and free slots of the original store, fleets created
+        afterwards get the same slots they would have had in the original.
+        """
+        slots = columns["slot"]
+        if count is None:
+            count = int(slots.max()) + 1 if len(slots) else 0
+            free_slots = sorted(set(range(count)) - set(slots.tolist()), reverse=True)
+        store = cls(max(INITIAL_FLEET_CAPACITY, count))
+        for name in SNAPSHOT_COLUMNS:
+            getattr(store, name)[slots] = columns[name]
+        store.previous_position[slots] = columns["position"]
+        store.alive[slots] = True
+        store.count = count
+        store.free_slots = list(free_slots)
+        for owner in owner_names:
+            store.intern_owner(owner)
+        for slot in slots.tolist():
+            Fleet.attach(store, slot)
+        return store
+
+    def live_slots(self) -> np.ndarray:
+        return np.flatnonzero(self.alive[:self.count])
+
+    def query_rect(self, x: float, y: float, width: float, height: float,
+                   moving_only: bool = False) -> np.ndarray:
+        """Slots of live fleets positioned inside a world-space rectangle"""
+        position = self.position[:self.count]
+        mask = self.moving[:self.count] if moving_only else self.alive[:self.count]
+        mask = mask & (position[:, 0] >= x) & (position[:, 0] <= x + width)
+        mask &= (position[:, 1] >= y) & (position[:, 1] <= y + height)
+        return np.flatnonzero(mask)
+
+    def query_radius(self, pos, radius: float, moving_only: bool = False) -> np.ndarray:
+        """Slots of live fleets within radius of a world position"""
+        position = self.position[:self.count]
+        mask = self.moving[:self.count] if moving_only else self.alive[:self.count]
+        dx = position[:, 0] - pos[0]
+        dy = position[:, 1] - pos[1]
+        mask = mask & (dx * dx + dy * dy <= radius * radius)
+        return np.flatnonzero(mask)
+
+class Fleet:
+    """A single fleet, viewed through its slot in a FleetStore"""
+
+    __slots__ = ("store", "slot")
+
+    def __init__(self, owner: str, size: int, position: tuple[int, int],
+                 destination: tuple[int, int] = None, fighters: int = 0,
+                 store: FleetStore = None):
+        self.store = store if store is not None else FleetStore(1)
+        self.slot = self.store.allocate()
+        self.store.views[self.slot] = self
+        self.owner = owner
+        self.size = size
+        self.position = position
+        self.destination = destination
+        self.fighters = fighters
+
+    @classmethod
+    def attach(cls, store: FleetStore, slot: int) -> "Fleet":
+        """A view onto a slot that already holds a fleet"""
+        fleet = cls.__new__(cls)
+        fleet.store = store
+        fleet.slot = slot
+        store.views[slot] = fleet
+        return fleet
+
+    def __repr__(self):
+        return (f"Fleet(owner={self.owner!r}, size={self.size}, position={self.position}, "
+                f"destination={self.destination}, fighters={self.fighters})")
+
+    @property
+    def owner(self) -> str:
+        return self.store.owner_names[self.store.owner[self.slot]]
+
+    @owner.setter
+    def owner(self, value: str):
+        self.store.owner[self.slot] = self.store.intern_owner(value)
+
+    @property
+    def size(self) -> int:
+        return int(self.store.size[self.slot])
+
+    @size.setter
+    def size(self, value: int):
+        self.store.size[self.slot] = value
+
+    @property
+    def fighters(self) -> int:
+        return int(self.store.fighters[self.slot])
+
+    @fighters.setter
+    def fighters(self, value: int):
+        self.store.fighters[self.slot] = value
+
+    @property
+    def speed(self) -> float:
+        return float(self.store.speed[self.slot])
+
+    @speed.setter
+    def speed(self, value: float):
+        self.store.speed[self.slot] = value
+
+    @property
+    def position(self) -> tuple[float, float]:
+        x, y = self.store.position[self.slot]
+        return (float(x), float(y))
+
+    @position.setter
+    def position(self, value: tuple[float, float]):
+        self.store.position[self.slot] = value
+        self.store.previous_position[self.slot] = value
+
+    @property
+    def route(self) -> List[tuple[float, float]]:
+        """Waypoints still to reach, the current destination first"""
+        destination = self.destination
+        if destination is None:
+            return []
+        return [destination] + [(float(x), float(y))
+                                for x, y in reversed(self.store.routes.get(self.slot, ()))]
+
+    def follow(self, waypoints):
+        """Travel through waypoints in order"""
+        waypoints = list(waypoints)
+        self.store.routes.pop(self.slot, None)
+        if not waypoints:
+            self.destination = None
+            return
+        self.destination = waypoints[0]
+        if len(waypoints) > 1:
+            self.store.routes[self.slot] = waypoints[:0:-1]
+
+    def interpolated_position(self, alpha: float) -> tuple[float, float]:
+        """Position alpha of the way from before the last advance to now"""
+        px, py = self.store.previous_position[self.slot]
+        x, y = self.store.position[self.slot]
+        return (float(px + (x - px) * alpha), float(py + (y - py) * alpha))
+
+    @property
+    def destination(self) -> Optional[tuple[float, float]]:
+        if not self.store.moving[self.slot]:
+            return None
+        x, y = self.store.destination[self.slot]
+        return (float(x), float(y))
+
+    @destination.setter
+    def destination(self, value: Optional[tuple[float, float]]):
+        if value is None:
+            self.store.moving[self.slot] = False
+        else:
+            self.store.destination[self.slot] = value
+            self.store.moving[self.slot] = True
+
+    def move(self, dt):
+        """Move just this fleet; the simulation moves all fleets via FleetStore.advance.
+
+        Works on the store's columns in place rather than through position tuples.
+        """
+        store, slot = self.store, self.slot
+        if not store.moving[slot]:
+            return
+        position = store.position[slot]
+        # Interpolated drawing glides from where the fleet was, as after advance()
+        store.previous_position[slot] = position
+        store.settling = True
+        destination = store.destination[slot]
+        dx = destination[0] - position[0]
+        dy = destination[1] - position[1]
+        distance = (dx * dx + dy * dy) ** 0.5
+        step = store.speed[slot] * dt
+
+        if distance <= step:
+            position[:] = destination
+            route = store.routes.get(slot)
+            if route:
+                destination[:] = route.pop()
+                if not route:
+                    del store.routes[slot]
+            else:
+                store.moving[slot] = False
+        else:
+            position[0] += dx / distance * step
+            position[1] += dy / distance * step
+
+    def release(self):
+        """Return this fleet's slot to its store"""
+        self.store.release(self.slot)
@@ -0,0 +1,247 @@
+"""Procedural galaxies loaded a chunk at a time.
+
+A ChunkedGalaxy divides a world of width x height chunks into squares of
+CHUNK_SIZE world units.  The star systems of a chunk and the hyperlanes
+inside it are a pure function of the galaxy seed and the chunk's
+coordinates, so a chunk can be generated whenever it is needed, dropped, and
+generated again identically later.  Neighbouring chunks are joined by a
+gate lane between their closest systems, so the lanes of any set of loaded
+chunks are exactly the part of one fixed galaxy-wide network that lies in
+them.  Loading or unloading a chunk adds or removes only its own planets and
+lanes in the simulation's network, so the routes cached there stay valid.
+
+The simulation only holds the planets of loaded chunks.  Loading and
+unloading are commands (see commands.py), so replays and other players see
+the same chunks appear at the same ticks; a ChunkStreamer issues them as the
+camera moves, keeping the chunks around the view loaded and evicting the
+least recently viewed ones beyond CHUNK_CACHE_SIZE.  A chunk where a planet
+has changed owner is modified and stays loaded for good; chunks with other
+activity, such as fleets on their way, stay loaded while it lasts.
+Pure Python and NumPy, no pygame.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+import numpy as np
+from hyperlanes import LANES_PER_PLANET
+
+CHUNK_SIZE = 2048  # World units per chunk side
+GALAXY_CHUNKS = 1024  # Default chunks per side, about 12 million systems
+SYSTEMS_PER_CHUNK = 12  # Average star systems per chunk
+CHUNK_MARGIN = 100  # Systems keep this far from chunk edges
+CHUNK_CACHE_SIZE = 64  # Unmodified chunks kept loaded once out of view
+LOAD_MARGIN = 1  # Chunks loaded ahead around the view
+GENERATED_CHUNK_CACHE = 256  # Generated chunk contents kept for reuse
+HOME_DISTANCE = 2  # Chunks between the player's and the AI's home chunks
+
+NAME_SYLLABLES = ("ka", "ron", "thi", "vel", "dor", "an", "is", "mar",
+                  "zu", "sel", "qua", "tor", "ven", "li", "os", "ra")
+
+# Stream ids mixed into chunk seeds so each kind of content has its own draws
+SYSTEMS_STREAM = 0
+
+def chunk_rng(seed: int, chunk: tuple, stream: int = SYSTEMS_STREAM) -> np.random.Generator:
+    """Random generator for one chunk, the same for the same seed and coordinates"""
+    return np.random.default_rng([seed & 0xFFFFFFFF, chunk[0], chunk[1], stream])
+
+def format_chunk(chunk: tuple) -> str:
+    return f"{chunk[0]},{chunk[1]}"
+
+def parse_chunk(text: str) -> tuple:
+    x, y = text.split(",")
+    return (int(x), int(y))
+
+def system_name(rng: np.random.Generator, chunk: tuple, index: int) -> str:
+    syllables = rng.integers(0, len(NAME_SYLLABLES), int(rng.integers(2, 4)))
+    base = "".join(NAME_SYLLABLES[syllable] for syllable in syllables.tolist())
+    return f"{base.capitalize()} {chunk[0]}:{chunk[1]}:{index}"
+
+def chunk_lanes(positions: np.ndarray, lanes_per_planet: int = LANES_PER_PLANET) -> List[tuple]:
+    """(row, row) lanes joining each system to its nearest neighbours, plus a spanning tree.
+
+    Chunks hold few systems, so distances are computed between every pair
+    and Prim's algorithm makes sure the chunk's network is connected.
+    """
+    n = len(positions)
+    offset = positions[:, None, :] - positions[None, :, :]
+    distance = np.einsum("ijk,ijk->ij", offset, offset).astype(np.float64)
+    np.fill_diagonal(distance, np.inf)
+    lanes = set()
+    nearest = np.argsort(distance, axis=1, kind="stable")[:, :min(lanes_per_planet, n - 1)]
+    for row, others in enumerate(nearest.tolist()):
+        for other in others:
+            lanes.add((min(row, other), max(row, other)))
+
+    # Prim's minimum spanning tree
+    joined = np.zeros(n, dtype=bool)
+    joined[0] = True
+    best = distance[0].copy()
+    parent = np.zeros(n, dtype=np.int64)
+    for _ in range(n - 1):
+        candidate = np.where(joined, np.inf, best)
+        row = int(np.argmin(candidate))
+        lanes.add((min(row, int(parent[row])), max(row, int(parent[row]))))
+        joined[row] = True
+        closer = distance[row] < best
+        best[closer] = distance[row][closer]
+        parent[closer] = row
+    return sorted(lanes)
+
+class ChunkSystems:
+    """The generated star systems of one chunk"""
+
+    __slots__ = ("names", "positions", "rates", "lanes")
+
+    def __init__(self, names: List[str], positions: np.ndarray, rates: np.ndarray, lanes: List[tuple]):
+        self.names = names
+        self.positions = positions  # (n, 2) int32 world positions
+        self.rates = rates  # Resources generated per day
+        self.lanes = lanes  # (row, row) lanes inside the chunk
+
+def generate_systems(seed: int, chunk: tuple) -> ChunkSystems:
+    """The star systems of a chunk, at least two of them"""
+    rng = chunk_rng(seed, chunk)
+    count = 2 + int(rng.poisson(SYSTEMS_PER_CHUNK - 2))
+    low = np.array(chunk) * CHUNK_SIZE + CHUNK_MARGIN
+    positions = (low + rng.integers(0, CHUNK_SIZE - 2 * CHUNK_MARGIN, (count, 2))).astype(np.int32)
+    rates = rng.integers(5, 51, count).astype(np.int32)
+    names = [system_name(rng, chunk, index) for index in range(count)]
+    return ChunkSystems(names, positions, rates, chunk_lanes(positions))
+
+class ChunkedGalaxy:
+    """A procedural galaxy of width x height chunks and which of them are loaded"""
+
+    def __init__(self, seed: int, width: int = GALAXY_CHUNKS, height: int = GALAXY_CHUNKS,
+                 cache_size: int = GENERATED_CHUNK_CACHE):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.loaded: Dict[tuple, List[str]] = {}  # Chunk -> its planet names, in load order
+        self.modified: Set[tuple] = set()  # Chunks where planets changed owner, never unloaded
+        self.version = 0  # Bumped whenever chunks are loaded or unloaded
+        self.cache_size = cache_size
+        self.generated: OrderedDict = OrderedDict()  # Chunk -> ChunkSystems, least recent first
+
+    @property
+    def size(self) -> tuple:
+        """World width and height"""
+        return (self.width * CHUNK_SIZE, self.height * CHUNK_SIZE)
+
+    def contains(self, chunk: tuple) -> bool:
+        return 0 <= chunk[0] < self.width and 0 <= chunk[1] < self.height
+
+    def chunk_of(self, position) -> tuple:
+        return (int(position[0] // CHUNK_SIZE), int(position[1] // CHUNK_SIZE))
+
+    def chunks_in_rect(self, x: float, y: float, width: float, height: float,
+                       margin: int = 0) -> List[tuple]:
+        """Chunks of the galaxy overlapping a world rectangle, plus margin chunks around it"""
+        first_x, first_y = self.chunk_of((x, y))
+        last_x, last_y = self.chunk_of((x + width, y + height))
+        return [(cx, cy)
+                for cy in range(max(0, first_y - margin), min(self.height, last_y + margin + 1))
+                for cx in range(max(0, first_x - margin), min(self.width, last_x + margin + 1))]
+
+    def systems(self, chunk: tuple) -> ChunkSystems:
+        """The generated contents of a chunk, from the cache if possible"""
+        systems = self.generated.get(chunk)
+        if systems is None:
+            systems = self.generated[chunk] = generate_systems(self.seed, chunk)
+            if len(self.generated) > self.cache_size:
+                self.generated.popitem(last=False)
+        else:
+            self.generated.move_to_end(chunk)
+        return systems
+
+    def gate(self, a: tuple, b: tuple) -> tuple:
+        """(name, name) lane between the closest systems of two neighbouring chunks"""
+        first, second = self.systems(a), self.systems(b)
+        offset = first.positions[:, None, :] - second.positions[None, :, :]
+        distance = np.einsum("ijk,ijk->ij", offset, offset.astype(np.int64))
+        i, j = np.unravel_index(np.argmin(distance), distance.shape)
+        return first.names[i], second.names[j]
+
+    def loaded_lanes(self) -> List[tuple]:
+        """(name, name) lanes of every loaded chunk and between loaded neighbours.
+
+        The order depends only on which chunks are loaded, not on the order
+        they were loaded in.
+        """
+        lanes = []
+        for chunk in sorted(self.loaded):
+            systems = self.systems(chunk)
+            names = systems.names
+            lanes.extend((names[a], names[b]) for a, b in systems.lanes)
+            for neighbour in ((chunk[0] + 1, chunk[1]), (chunk[0], chunk[1] + 1)):
+                if neighbour in self.loaded:
+                    lanes.append(self.gate(chunk, neighbour))
+        return lanes
+
+    def lanes_of(self, chunk: tuple) -> List[tuple]:
+        """(name, name) lanes inside a loaded chunk and to its loaded neighbours, as loaded_lanes has them"""
+        systems = self.systems(chunk)
+        names = systems.names
+        lanes = [(names[a], names[b]) for a, b in systems.lanes]
+        x, y = chunk
+        for neighbour in ((x - 1, y), (x, y - 1)):
+            if neighbour in self.loaded:
+                lanes.append(self.gate(neighbour, chunk))
+        for neighbour in ((x + 1, y), (x, y + 1)):
+            if neighbour in self.loaded:
+                lanes.append(self.gate(chunk, neighbour))
+        return lanes
+
+    def homes(self) -> List[tuple]:
+        """(chunk, system index, owner) of each faction's capital"""
+        player = (max(0, self.width // 2 - HOME_DISTANCE // 2), self.height // 2)
+        ai = (min(self.width - 1, player[0] + HOME_DISTANCE), player[1])
+        return [(player, 0, "player"), (ai, 1 if ai == player else 0, "ai")]
+
+class ChunkStreamer:
+    """Asks the simulation to load the chunks around a view and unload stale ones.
+
+    Loading and unloading go through commands, issued on behalf of faction.
+    """
+
+    def __init__(self, faction: str = "player", cache_size: int = CHUNK_CACHE_SIZE,
+                 margin: int = LOAD_MARGIN):
+        self.faction = faction
+        self.cache_size = cache_size
+        self.margin = margin
+        self.recent: OrderedDict = OrderedDict()  # Loaded chunks, least recently in view first
+        self.requested: Set[tuple] = set()  # Chunks asked for and not loaded yet
+
+    def update(self, sim, x: float, y: float, width: float, height: float) -> list:
+        """Submit the commands a view over a world rectangle needs, and return them"""
+        from commands import LoadChunk, UnloadChunk
+        galaxy: Optional[ChunkedGalaxy] = sim.galaxy
+        commands = []
+        wanted = galaxy.chunks_in_rect(x, y, width, height, self.margin)
+        self.requested.intersection_update(set(wanted) - galaxy.loaded.keys())
+        for chunk in wanted:
+            if chunk in galaxy.loaded:
+                self.recent[chunk] = None
+                self.recent.move_to_end(chunk)
+            elif chunk not in self.requested:
+                self.requested.add(chunk)
+                commands.append(LoadChunk(self.faction, format_chunk(chunk)))
+
+        # Chunks loaded by anyone else count as the least recently viewed
+        for chunk in galaxy.loaded:
+            if chunk not in self.recent:
+                self.recent[chunk] = None
+                self.recent.move_to_end(chunk, last=False)
+        for chunk in [chunk for chunk in self.recent if chunk not in galaxy.loaded]:
+            del self.recent[chunk]
+
+        wanted = set(wanted)
+        spare = len(galaxy.loaded) - len(galaxy.modified) - self.cache_size
+        for chunk in list(self.recent):
+            if spare <= 0:
+                break
+            if chunk not in wanted and not sim.chunk_modified(chunk):
+                commands.append(UnloadChunk(self.faction, format_chunk(chunk)))
+                del self.recent[chunk]
+                spare -= 1
+        for command in commands:
+            sim.submit(command)
+        return commands
@@ -1,40 +1,81 @@
+import os
+if __name__ == "__mp_main__":
+    # Spawned AI workers import this module again before their first plan; keep them quiet
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
 import pygame
 import sys
-from dataclasses import dataclass
+import argparse
+import asyncio
 from typing import List, Dict, Optional
 from enum import Enum, auto
+from collections import OrderedDict
+from itertools import repeat
 import random
 import math
 import time
-
-# Initialize Pygame
-pygame.init()
+import numpy as np
+import combat
+from combat import Battle
+from commands import TransferFleet
+from galaxy import ChunkedGalaxy, ChunkStreamer
+from netplay import LockstepClient, LockstepThread, NetplayError
+from planet_textures import planet_surface, planet_seed
+from profiler import profiler
+import savegame
+from ai import AiPlayer
+from replay import CommandLog
+from sim_thread import SimThread
+from simulation import (
+    Simulation, Planet, Fleet, WORLD_WIDTH, WORLD_HEIGHT,
+)
 
 # Constants
 SCREEN_WIDTH = 1024
 SCREEN_HEIGHT = 768
-WORLD_WIDTH = 4096
-WORLD_HEIGHT = 3072
 FPS = 60
+SIM_DT = 1 / FPS  # Fixed simulation step in game seconds
+MAX_FRAME_TIME = 0.25  # Longest real frame fed to the simulation, avoids a spiral of death
+MAX_SIM_STEPS_PER_FRAME = 256
+GAME_SPEEDS = (1, 2, 4, 8, 16, 32, 64)
 CAMERA_SPEED = 10
 PLANET_RADIUS = 40  # Restored to original size
 ZOOMED_PLANET_RADIUS = 300
 ZOOMED_STATION_SIZE = 60
+PLANET_LOD_RADII = (PLANET_RADIUS, 80, 160, ZOOMED_PLANET_RADIUS)  # Zoomed view texture levels
+PLANET_LOD_CACHE_SIZE = 16  # Planets whose zoomed textures are kept
 STAR_COUNT = 1000
+STAR_TILE_WIDTH = SCREEN_WIDTH
+STAR_TILE_HEIGHT = SCREEN_HEIGHT
+STAR_PARALLAX = (1.0,)  # Scroll factor per starfield layer, farthest first
+STAR_DENSITY = STAR_COUNT / (WORLD_WIDTH * WORLD_HEIGHT)  # Stars per square world unit
+STAR_TILE_CACHE_SIZE = 8  # Baked tiles per layer kept by the procedural starfield, twice what fits on screen
 COMMAND_BAR_HEIGHT = 150
 BUTTON_WIDTH = 200
 BUTTON_HEIGHT = 30
 ICON_SIZE = 40
-SPACE_STATION_COST = 500
-FIGHTER_COST = 100
 LORE_BUTTON_WIDTH = 100
 LORE_BUTTON_HEIGHT = 30
 LORE_SCREEN_PADDING = 50
 ZOOM_SPEED = 0.2
 MAX_ZOOM = 1.0
 MIN_ZOOM = 0.0
-FLEET_SPEED = 100
 FLEET_RADIUS = 10
+FONT_SIZE = 36
+SMALL_FONT_SIZE = 24
+LARGE_FONT_SIZE = 48
+BADGE_FONT_SIZE = 20
+TEXT_CACHE_SIZE = 512  # Max rendered text surfaces kept by the LRU cache
+PROFILE_OVERLAY_INTERVAL = 15  # Frames between profiler overlay refreshes
+PROFILE_GRAPH_MS = 33  # Frame time at the top of the profiler graph
+PROFILE_OVERLAY_WIDTH = 420
+PROFILE_GRAPH_HEIGHT = 60
+AUTOSAVE_PATH = "autosave.gcs"
+QUICKSAVE_PATH = "quicksave.gcs"
+REPLAY_DIR = "replays"  # Every match is recorded to a command log here
+BATTLE_ANIMATION_SECONDS = 3.0  # Game seconds each battle is played back for
+MAX_BATTLE_ANIMATIONS = 256  # Only the newest battles are animated after a burst
+BATTLE_BAR_WIDTH = 60
+BATTLE_BAR_HEIGHT = 5
 
 # Colors
 BLACK = (0, 0, 0)
@@ -48,6 +89,7 @@ YELLOW = (255, 255, 0)
 DARK_GRAY = (50, 50, 50)
 LIGHT_BLUE = (100, 200, 255)
 PLAYER_GREEN = (40, 200, 40)  # Softer green for player ownership
+LANE_COLOR = (40, 50, 80)  # Hyperlanes between planets
 
 # Planet appearance data - Colors based on Star Wars planet characteristics
 PLANET_APPEARANCES = {
@@ -277,248 +319,662 @@ PLANET_LORE = {
     ]
 }
 
-# Planet Data - Fixed positions for 20 planets with Star Wars names
-PLANET_DATA = [
-    # Core worlds (Player start) - Highest resource generation
-    ("Coruscant", (800, 1536), "player", 50),    # Player's capital - major industrial center
-    ("Bastion", (3296, 1536), "ai", 50),         # AI's capital - major industrial center
-    
-    # Inner Ring - High resource generation
-    ("Corellia", (1248, 800), "neutral", 30),    # Major shipyard world
-    ("Alderaan", (2048, 600), "neutral", 35),    # Wealthy core world
-    ("Kuat", (2848, 800), "neutral", 40),        # Major shipyard world
-    ("Naboo", (1248, 2272), "neutral", 25),      # Rich in plasma energy
-    ("Kashyyyk", (2048, 2472), "neutral", 30),   # Rich in natural resources
-    ("Mon Calamari", (2848, 2272), "neutral", 35), # Major shipyard world
-    
-    # Middle Ring - Medium resource generation
-    ("Mandalore", (1000, 1200), "neutral", 20),  # Mining world
-    ("Bothawui", (1600, 1000), "neutral", 15),   # Trade hub
-    ("Fondor", (2496, 1000), "neutral", 25),     # Industrial world
-    ("Bilbringi", (3096, 1200), "neutral", 20),  # Shipyard world
-    ("Ord Mantell", (1000, 1872), "neutral", 15), # Trade hub
-    ("Bestine", (1600, 2072), "neutral", 20),    # Mining colony
-    ("Anaxes", (2496, 2072), "neutral", 25),     # Fortress world
-    ("Rhinnal", (3096, 1872), "neutral", 15),    # Medical world
-    
-    # Outer Systems - Lower resource generation
-    ("Hoth", (2048, 200), "neutral", 10),        # Ice world
-    ("Tatooine", (400, 1536), "neutral", 5),     # Desert world
-    ("Endor", (3696, 1536), "neutral", 10),      # Forest moon
-    ("Mustafar", (2048, 2872), "neutral", 15),   # Mining world
-]
+def planet_appearance(name: str) -> dict:
+    """Appearance of a planet; generated planets reuse a template picked by name"""
+    appearance = PLANET_APPEARANCES.get(name)
+    if appearance is None:
+        templates = list(PLANET_APPEARANCES.values())
+        appearance = templates[planet_seed(name) % len(templates)]
+    return appearance
+
+class TextCache:
+    """Central font registry plus an LRU cache of rendered text surfaces.
+
+    Fonts are created once per (name, size).  Rendered surfaces are keyed by
+    (font name, size, text, color, antialias), so HUD strings that have not
+    changed since the last frame are blitted without re-rendering.
+    """
+
+    def __init__(self, max_entries: int = TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.fonts: Dict[tuple, pygame.font.Font] = {}
+        self.surfaces: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, size: int, name: Optional[str] = None) -> pygame.font.Font:
+        """Return the shared font for (name, size), loading it on first use"""
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.Font(name, size)
+            self.fonts[key] = font
+        return font
+
+    def render(self, text: str, size: int, color, antialias: bool = True,
+               name: Optional[str] = None) -> pygame.Surface:
+        """Return a rendered surface for text, reusing a cached one if possible"""
+        key = (name, size, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.font(size, name).render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        """Drop all rendered surfaces and reset the counters"""
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self.surfaces),
+            "fonts": len(self.fonts),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+# Shared by the game and the entity draw methods
+text_cache = TextCache()
 
 class GameMode(Enum):
     GALACTIC_OVERVIEW = auto()
     PLANET_VIEW = auto()
     PLANET_LORE = auto()
 
-@dataclass
+class StarTable:
+    """Columnar star storage: float32 positions and sizes, uint8 brightness"""
+
+    def __init__(self, x, y, brightness, size):
+        self.x = np.asarray(x, dtype=np.float32)
+        self.y = np.asarray(y, dtype=np.float32)
+        self.brightness = np.asarray(brightness, dtype=np.uint8)
+        self.size = np.asarray(size, dtype=np.float32)
+
+    @classmethod
+    def random(cls, count: int, seed: int) -> "StarTable":
+        """count stars scattered over the world, the same for the same seed"""
+        rng = np.random.default_rng(seed)
+        return cls(rng.uniform(0, WORLD_WIDTH, count), rng.uniform(0, WORLD_HEIGHT, count),
+                   rng.integers(50, 256, count), rng.uniform(0.5, 2, count))
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, index: int) -> "Star":
+        return Star(self, range(len(self))[index])
+
+    def __iter__(self):
+        return map(Star, repeat(self), range(len(self)))
+
+    def take(self, indices) -> "StarTable":
+        """A table of the stars at indices"""
+        return StarTable(self.x[indices], self.y[indices], self.brightness[indices], self.size[indices])
+
 class Star:
-    x: float
-    y: float
-    brightness: int
-    size: float
-
-@dataclass
-class Fleet:
-    owner: str
-    size: int
-    position: tuple[int, int]
-    destination: tuple[int, int] = None
-    fighters: int = 0  # Number of fighters in the fleet
-
-    def move(self, dt):
-        if self.destination:
-            dx = self.destination[0] - self.position[0]
-            dy = self.destination[1] - self.position[1]
-            distance = math.sqrt(dx * dx + dy * dy)
-            
-            if distance < FLEET_SPEED * dt:
-                self.position = self.destination
-                self.destination = None
-            else:
-                move_x = (dx / distance) * FLEET_SPEED * dt
-                move_y = (dy / distance) * FLEET_SPEED * dt
-                self.position = (self.position[0] + move_x, self.position[1] + move_y)
-
-    def draw(self, screen, camera_pos, zoom):
-        # Calculate screen position
-        screen_x = (self.position[0] - camera_pos[0]) * zoom + SCREEN_WIDTH // 2
-        screen_y = (self.position[1] - camera_pos[1]) * zoom + SCREEN_HEIGHT // 2
-        
-        # Draw fleet circle
-        color = PLAYER_GREEN if self.owner == "player" else RED
-        pygame.draw.circle(screen, color, (int(screen_x), int(screen_y)), int(FLEET_RADIUS * zoom))
-        
-        # Draw fighter count if there are fighters
-        if self.fighters > 0:
-            fighter_text = pygame.font.SysFont(None, 20).render(str(self.fighters), True, WHITE)
-            text_x = screen_x - fighter_text.get_width() // 2
-            text_y = screen_y - fighter_text.get_height() // 2
-            screen.blit(fighter_text, (text_x, text_y))
-
-@dataclass
-class Planet:
-    name: str
-    position: tuple[int, int]
-    owner: str  # "player" or "ai"
-    resources: int
-    fleet_size: int
-    resource_rate: int  # Resources generated per day
-    has_space_station: bool = False
-    building_station: bool = False
-    station_build_start: float = 0
-    station_level: int = 0  # Current station level (0-5)
-    fleet: Fleet = None  # Reference to the planet's fleet
-    building_fighter: bool = False
-    fighter_build_start: float = 0
-    
-    def update_station_construction(self, current_time):
-        """Update space station construction progress"""
-        if self.building_station:
-            time_elapsed = current_time - self.station_build_start
-            if time_elapsed >= 20:  # 20 seconds build time
-                self.building_station = False
-                self.has_space_station = True
-                self.station_level += 1  # Increment station level
+    """A single star, viewed through its row in a StarTable"""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: StarTable, index: int):
+        self.table = table
+        self.index = index
+
+    def __repr__(self):
+        return f"Star(x={self.x}, y={self.y}, brightness={self.brightness}, size={self.size})"
+
+    @property
+    def x(self) -> float:
+        return float(self.table.x[self.index])
+
+    @property
+    def y(self) -> float:
+        return float(self.table.y[self.index])
+
+    @property
+    def brightness(self) -> int:
+        return int(self.table.brightness[self.index])
+
+    @property
+    def size(self) -> float:
+        return float(self.table.size[self.index])
+
+def draw_fleet(screen, fleet: Fleet, camera: "Camera", alpha: float = 1.0):
+    """Draw a fleet in flight, interpolated alpha of the way through the last step"""
+    # Calculate screen position
+    screen_x, screen_y = camera.world_to_screen(fleet.interpolated_position(alpha))
     
-    def update_fighter_construction(self, current_time):
-        """Update fighter construction progress"""
-        if self.building_fighter:
-            time_elapsed = current_time - self.fighter_build_start
-            if time_elapsed >= 10:  # 10 seconds build time
-                self.building_fighter = False
-                if not self.fleet:
-                    # Create new fleet only when ship is complete
-                    self.fleet = Fleet(owner=self.owner, size=0, position=self.position, fighters=1)
-                else:
-                    self.fleet.fighters += 1
+    # Draw fleet circle
+    color = PLAYER_GREEN if fleet.owner == "player" else RED
+    pygame.draw.circle(screen, color, (int(screen_x), int(screen_y)), FLEET_RADIUS)
     
-    def add_fighter(self, current_time):
-        """Start fighter construction"""
-        self.building_fighter = True
-        self.fighter_build_start = current_time
-
-    def draw(self, screen, pos):
-        """Draw the planet with its unique appearance and ownership ring"""
-        appearance = PLANET_APPEARANCES[self.name]
-        colors = appearance["colors"]
-        pattern = appearance["pattern"]
-        
-        # Draw base planet
-        pygame.draw.circle(screen, colors[0], pos, PLANET_RADIUS)
-        
-        # Draw pattern based on planet type
-        if pattern == "grid":  # Coruscant-style city grid
-            # Draw darker base with lights
-            for y in range(-PLANET_RADIUS, PLANET_RADIUS + 1, 4):
-                for x in range(-PLANET_RADIUS, PLANET_RADIUS + 1, 4):
-                    # Check if point is within planet circle
-                    if x*x + y*y <= PLANET_RADIUS * PLANET_RADIUS:
-                        point_x = pos[0] + x
-                        point_y = pos[1] + y
-                        # Randomly place lights
-                        if random.random() < 0.3:  # 30% chance of a light
-                            pygame.draw.circle(screen, colors[1], (point_x, point_y), 1)
-            
-            # Draw main sectors - divide into 6 sections
-            for i in range(6):
-                angle = i * math.pi / 3
-                end_x = pos[0] + math.cos(angle) * PLANET_RADIUS
-                end_y = pos[1] + math.sin(angle) * PLANET_RADIUS
-                pygame.draw.line(screen, colors[2], pos, (end_x, end_y), 2)
-        
-        elif pattern == "desert":  # Tatooine-style sand dunes
-            # Draw three layers of dunes
-            for i in range(3):
-                y_offset = -PLANET_RADIUS//2 + i * PLANET_RADIUS//3
-                rect = pygame.Rect(
-                    pos[0] - PLANET_RADIUS, 
-                    pos[1] + y_offset,
-                    PLANET_RADIUS * 2,
-                    PLANET_RADIUS//2
-                )
-                pygame.draw.arc(screen, colors[1], rect, 0, math.pi, 3)
-            
-            # Draw two simple circles for the binary suns
-            sun_color = (255, 220, 120)  # Bright yellow-orange
-            pygame.draw.circle(screen, sun_color, 
-                            (pos[0] - PLANET_RADIUS//3, pos[1] - PLANET_RADIUS//3), 4)
-            pygame.draw.circle(screen, sun_color, 
-                            (pos[0] - PLANET_RADIUS//4, pos[1] - PLANET_RADIUS//3), 3)
-
-        elif pattern == "lava": # Mustafar-style lava flows
-            for i in range(4):
-                angle = i * math.pi/2
-                pygame.draw.arc(screen, colors[1],
-                              (pos[0] - PLANET_RADIUS/2, pos[1] - PLANET_RADIUS/2,
-                               PLANET_RADIUS, PLANET_RADIUS),
-                               angle, angle + math.pi/4, 3)
-        
-        elif pattern == "ice":  # Hoth-style ice caps
-            pygame.draw.circle(screen, colors[1], 
-                             (pos[0], pos[1] - PLANET_RADIUS/2), PLANET_RADIUS/3)
-            pygame.draw.circle(screen, colors[1],
-                             (pos[0], pos[1] + PLANET_RADIUS/2), PLANET_RADIUS/3)
-        
-        elif pattern == "forest":  # Endor/Kashyyyk-style forests
-            for i in range(8):
-                angle = i * math.pi/4
-                x = pos[0] + math.cos(angle) * PLANET_RADIUS * 0.7
-                y = pos[1] + math.sin(angle) * PLANET_RADIUS * 0.7
-                pygame.draw.circle(screen, colors[1], (int(x), int(y)), PLANET_RADIUS//4)
-        
-        elif pattern == "waves":  # Mon Calamari-style oceans
-            for i in range(3):
-                offset = i * 6 - 6
-                pygame.draw.arc(screen, colors[1],
-                              (pos[0] - PLANET_RADIUS, pos[1] - PLANET_RADIUS/2 + offset,
-                               PLANET_RADIUS * 2, PLANET_RADIUS),
-                               0, math.pi, 2)
-        
+    # Draw fighter count if there are fighters
+    if fleet.fighters > 0:
+        fighter_text = text_cache.render(str(fleet.fighters), BADGE_FONT_SIZE, WHITE)
+        text_x = screen_x - fighter_text.get_width() // 2
+        text_y = screen_y - fighter_text.get_height() // 2
+        screen.blit(fighter_text, (text_x, text_y))
+
+class PlanetSpriteCache:
+    """Pre-rendered planet sprites so the galaxy view only blits each frame.
+
+    Planet bodies are keyed by (name, pattern, radius) and generated once by
+    planet_textures with a per-planet seed, so patterns no longer flicker.  The
+    composited sprite (body, ownership ring, station ring and fleet badge) is
+    kept per planet and re-rendered only when its overlay state changes.
+    """
+
+    def __init__(self, radius: int = PLANET_RADIUS):
+        self.radius = radius
+        # Leave room above the planet for the fleet badge
+        self.half_size = radius + 34
+        self.bodies: Dict[tuple, pygame.Surface] = {}
+        self.sprites: Dict[str, tuple] = {}
+
+    def draw(self, screen, planet: Planet, pos):
+        """Draw the planet by blitting its cached sprite centered on pos"""
+        sprite = self.get(planet)
+        screen.blit(sprite, sprite.get_rect(center=pos))
+
+    def get(self, planet: Planet) -> pygame.Surface:
+        """Return the sprite for planet, re-rendering it if its state changed"""
+        appearance = planet_appearance(planet.name)
+        ring_color = None
+        if planet.owner != "neutral":
+            ring_color = PLAYER_GREEN if planet.owner == "player" else RED
+        fighters = planet.fleet.fighters if planet.fleet else 0
+        key = (planet.name, appearance["pattern"], self.radius, ring_color,
+               planet.has_space_station, planet.station_level, fighters)
+
+        cached = self.sprites.get(planet.name)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        sprite = self.render_sprite(planet, appearance, ring_color, fighters)
+        self.sprites[planet.name] = (key, sprite)
+        return sprite
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop the composited sprite for one planet, or all of them"""
+        if name is None:
+            self.sprites.clear()
+        else:
+            self.sprites.pop(name, None)
+
+    def retain(self, planets: Dict[str, Planet]):
+        """Drop the sprites and bodies of planets no longer in the game"""
+        for name in [name for name in self.sprites if name not in planets]:
+            del self.sprites[name]
+        for key in [key for key in self.bodies if key[0] not in planets]:
+            del self.bodies[key]
+
+    def get_body(self, name: str, appearance: dict) -> pygame.Surface:
+        """Return the planet body with its pattern, rendering it on first use"""
+        key = (name, appearance["pattern"], self.radius)
+        body = self.bodies.get(key)
+        if body is None:
+            body = planet_surface(appearance, self.radius, planet_seed(name))
+            self.bodies[key] = body
+        return body
+
+    def render_sprite(self, planet, appearance, ring_color, fighters) -> pygame.Surface:
+        """Composite the body and ownership overlays into a fresh sprite"""
+        size = self.half_size * 2
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        pos = (self.half_size, self.half_size)
+
+        body = self.get_body(planet.name, appearance)
+        sprite.blit(body, body.get_rect(center=pos))
+
         # Draw ownership ring if planet is owned
-        if self.owner != "neutral":
-            ring_color = PLAYER_GREEN if self.owner == "player" else RED
-            pygame.draw.circle(screen, ring_color, pos, PLANET_RADIUS + 4, 2)
-            
+        if ring_color:
+            pygame.draw.circle(sprite, ring_color, pos, self.radius + 4, 2)
+
         # Draw space station if present
-        if self.has_space_station:
-            station_radius = PLANET_RADIUS + 8
-            pygame.draw.circle(screen, WHITE, pos, station_radius, 1)
-        
+        if planet.has_space_station:
+            station_radius = self.radius + 8
+            pygame.draw.circle(sprite, WHITE, pos, station_radius, 1)
+
         # Draw fleet above planet if it exists and has ships
-        if self.fleet and self.fleet.fighters > 0:
-            fleet_y_offset = -PLANET_RADIUS - 20  # Position above planet
+        if fighters > 0:
+            fleet_y_offset = -self.radius - 20  # Position above planet
             fleet_pos = (pos[0], pos[1] + fleet_y_offset)
-            
+
             # Draw fleet circle
-            fleet_color = PLAYER_GREEN if self.owner == "player" else RED
+            fleet_color = PLAYER_GREEN if planet.owner == "player" else RED
             fleet_radius = 12
-            pygame.draw.circle(screen, fleet_color, fleet_pos, fleet_radius, 2)
-            
+            pygame.draw.circle(sprite, fleet_color, fleet_pos, fleet_radius, 2)
+
             # Draw ship count
-            count_text = str(self.fleet.fighters)
-            text_surface = pygame.font.SysFont(None, 20).render(count_text, True, WHITE)
+            text_surface = text_cache.render(str(fighters), BADGE_FONT_SIZE, WHITE)
             text_rect = text_surface.get_rect(center=fleet_pos)
-            screen.blit(text_surface, text_rect)
+            sprite.blit(text_surface, text_rect)
+
+        return sprite
+
+class PlanetTexturePyramid:
+    """Mip-style levels of pre-rendered planet textures for the zoomed view.
+
+    Each planet is generated once per radius in PLANET_LOD_RADII, with the
+    same seed so every level shows the same planet.  A zoom transition picks
+    the closest level at or above the requested radius and scales it down,
+    reusing the scaled result while the radius stays the same.
+    """
+
+    def __init__(self, radii: tuple[int, ...] = PLANET_LOD_RADII,
+                 max_planets: int = PLANET_LOD_CACHE_SIZE):
+        self.radii = sorted(radii)
+        self.max_planets = max_planets
+        self.levels: OrderedDict = OrderedDict()  # name -> {radius: surface}
+        self.scaled: Dict[str, tuple[int, pygame.Surface]] = {}
+
+    def level(self, name: str, radius: int) -> pygame.Surface:
+        """The pre-rendered texture of a planet at one of the pyramid radii"""
+        levels = self.levels.get(name)
+        if levels is None:
+            levels = self.levels[name] = {}
+            if len(self.levels) > self.max_planets:
+                evicted, _ = self.levels.popitem(last=False)
+                self.scaled.pop(evicted, None)
+        else:
+            self.levels.move_to_end(name)
+
+        surface = levels.get(radius)
+        if surface is None:
+            # Fine detail grows with the level like the old zoom animation
+            zoom = (radius - PLANET_RADIUS) / (ZOOMED_PLANET_RADIUS - PLANET_RADIUS)
+            surface = planet_surface(planet_appearance(name), radius, planet_seed(name),
+                                     detail=1 + zoom * 2)
+            levels[radius] = surface
+        return surface
+
+    def get(self, name: str, radius: int) -> pygame.Surface:
+        """A texture of the planet with the given radius"""
+        source_radius = next((r for r in self.radii if r >= radius), self.radii[-1])
+        source = self.level(name, source_radius)
+        if radius == source_radius:
+            return source
+        cached = self.scaled.get(name)
+        if cached and cached[0] == radius:
+            return cached[1]
+        size = radius * 2 + 2
+        surface = pygame.transform.smoothscale(source, (size, size))
+        self.scaled[name] = (radius, surface)
+        return surface
+
+def bake_star_tile(size: tuple[int, int], x, y, brightness, radius) -> pygame.Surface:
+    """A transparent tile with stars drawn at tile-relative positions"""
+    tile = pygame.Surface(size)
+    if pygame.display.get_surface() is not None:
+        tile = tile.convert()
+    tile.fill(BLACK)
+    tile.set_colorkey(BLACK)
+    for x, y, brightness, radius in zip(x.tolist(), y.tolist(), brightness.tolist(), radius.tolist()):
+        point = (int(x), int(y))
+        color = (brightness,) * 3
+        if radius < 1:
+            if 0 <= point[0] < size[0] and 0 <= point[1] < size[1]:
+                tile.set_at(point, color)
+        else:
+            pygame.draw.circle(tile, color, point, radius)
+    return tile
+
+def visible_tiles(offset_x: float, offset_y: float, tile_width: int, tile_height: int):
+    """(tx, ty) of the tiles a screen at a scrolled offset overlaps"""
+    first_tx = int(offset_x // tile_width)
+    last_tx = int((offset_x + SCREEN_WIDTH - 1) // tile_width)
+    first_ty = int(offset_y // tile_height)
+    last_ty = int((offset_y + SCREEN_HEIGHT - 1) // tile_height)
+    for tx in range(first_tx, last_tx + 1):
+        for ty in range(first_ty, last_ty + 1):
+            yield tx, ty
+
+class StarfieldLayer:
+    """One parallax layer of the starfield, baked lazily into tiles.
+
+    Stars are sorted by the tiles their disc touches when the layer is
+    built, so each tile's stars are one slice of a few compact arrays; a tile
+    surface is only rendered the first time it scrolls into view and is
+    reused afterwards.
+    """
+
+    def __init__(self, stars: StarTable, factor: float,
+                 tile_size: tuple[int, int] = (STAR_TILE_WIDTH, STAR_TILE_HEIGHT)):
+        self.factor = factor
+        self.tile_width, self.tile_height = tile_size
+        # A layer scrolling slower than the camera only needs to cover the
+        # part of the world the camera can actually pan across
+        self.width = (WORLD_WIDTH - SCREEN_WIDTH) * factor + SCREEN_WIDTH
+        self.height = (WORLD_HEIGHT - SCREEN_HEIGHT) * factor + SCREEN_HEIGHT
+        self.buckets: Dict[tuple[int, int], slice] = {}  # Tile -> its stars in the columns below
+        self.tiles: Dict[tuple[int, int], pygame.Surface] = {}
+
+        x = stars.x * np.float32(self.width / WORLD_WIDTH)
+        y = stars.y * np.float32(self.height / WORLD_HEIGHT)
+        radius = stars.size.astype(np.int32)
+        # Star discs are far smaller than a tile, so each touches at most two tiles per axis
+        tx = [np.floor_divide(x - radius, self.tile_width).astype(np.int32),
+              np.floor_divide(x + radius, self.tile_width).astype(np.int32)]
+        ty = [np.floor_divide(y - radius, self.tile_height).astype(np.int32),
+              np.floor_divide(y + radius, self.tile_height).astype(np.int32)]
+        index, keys_x, keys_y = [], [], []
+        every = np.ones(len(x), dtype=bool)
+        for first_x, keep_x in ((tx[0], every), (tx[1], tx[1] != tx[0])):
+            for first_y, keep_y in ((ty[0], every), (ty[1], ty[1] != ty[0])):
+                touched = np.flatnonzero(keep_x & keep_y)
+                index.append(touched)
+                keys_x.append(first_x[touched])
+                keys_y.append(first_y[touched])
+        index, keys_x, keys_y = np.concatenate(index), np.concatenate(keys_x), np.concatenate(keys_y)
+        order = np.lexsort((keys_y, keys_x))
+        index, keys_x, keys_y = index[order], keys_x[order], keys_y[order]
+        self.x, self.y = x[index], y[index]
+        self.brightness, self.radius = stars.brightness[index], radius[index].astype(np.uint8)
+        starts = np.flatnonzero(np.r_[len(index) > 0, (keys_x[1:] != keys_x[:-1])
+                                      | (keys_y[1:] != keys_y[:-1])])
+        ends = np.r_[starts[1:], len(index)]
+        for key_x, key_y, start, end in zip(keys_x[starts].tolist(), keys_y[starts].tolist(),
+                                            starts.tolist(), ends.tolist()):
+            self.buckets[(key_x, key_y)] = slice(start, end)
+
+    def get_tile(self, key: tuple[int, int]) -> Optional[pygame.Surface]:
+        """Return the baked surface for a tile, or None if it has no stars"""
+        tile = self.tiles.get(key)
+        if tile is None:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                return None
+            tile = bake_star_tile((self.tile_width, self.tile_height),
+                                  self.x[bucket] - key[0] * self.tile_width,
+                                  self.y[bucket] - key[1] * self.tile_height,
+                                  self.brightness[bucket], self.radius[bucket])
+            self.tiles[key] = tile
+        return tile
+
+    def draw(self, screen, camera: "Camera"):
+        """Blit the tiles that intersect the camera viewport"""
+        offset_x = camera.x * self.factor
+        offset_y = camera.y * self.factor
+        for tx, ty in visible_tiles(offset_x, offset_y, self.tile_width, self.tile_height):
+            tile = self.get_tile((tx, ty))
+            if tile is not None:
+                screen.blit(tile, (tx * self.tile_width - offset_x,
+                                   ty * self.tile_height - offset_y))
+
+class Starfield:
+    """Camera-aware starfield split into parallax layers by brightness"""
+
+    def __init__(self, stars: StarTable, parallax: tuple[float, ...] = STAR_PARALLAX):
+        # Dim stars go to the far (slow) layers, bright stars to the near ones
+        layer = np.clip((stars.brightness.astype(np.int32) - 50) * len(parallax) // 206,
+                        0, len(parallax) - 1)
+        self.layers = [StarfieldLayer(stars.take(np.flatnonzero(layer == index)), factor)
+                       for index, factor in enumerate(parallax)]
+
+    def draw(self, screen, camera: "Camera"):
+        for layer in self.layers:
+            layer.draw(screen, camera)
+
+class ProceduralStarfield:
+    """Starfield for procedural galaxies, too large to scatter stars over up front.
+
+    Each tile of each parallax layer draws its own stars from a generator
+    seeded by the match, the layer and the tile, so a tile is only made when
+    it scrolls into view and comes back the same after being dropped.  The
+    most recently drawn tiles are kept baked.
+    """
+
+    def __init__(self, seed: int, parallax: tuple[float, ...] = STAR_PARALLAX,
+                 density: float = STAR_DENSITY,
+                 tile_size: tuple[int, int] = (STAR_TILE_WIDTH, STAR_TILE_HEIGHT),
+                 cache_size: int = STAR_TILE_CACHE_SIZE):
+        self.seed = seed
+        self.parallax = parallax
+        self.tile_width, self.tile_height = tile_size
+        self.stars_per_tile = max(1, round(density * self.tile_width * self.tile_height / len(parallax)))
+        self.cache_size = cache_size * len(parallax)
+        self.tiles: OrderedDict = OrderedDict()  # (layer, tx, ty) -> surface, least recent first
+
+    def get_tile(self, layer: int, tx: int, ty: int) -> pygame.Surface:
+        key = (layer, tx, ty)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+            return tile
+        # Dim stars go to the far layers like in Starfield; tiles left of or
+        # above the world are never visible, so the coordinates are never negative
+        rng = np.random.default_rng([self.seed & 0xFFFFFFFF, layer, tx, ty])
+        count = self.stars_per_tile
+        low = 50 + 206 * layer // len(self.parallax)
+        high = 50 + 206 * (layer + 1) // len(self.parallax)
+        tile = bake_star_tile((self.tile_width, self.tile_height),
+                              rng.uniform(0, self.tile_width, count),
+                              rng.uniform(0, self.tile_height, count),
+                              rng.integers(low, high, count),
+                              rng.uniform(0.5, 2, count).astype(np.int32))
+        self.tiles[key] = tile
+        if len(self.tiles) > self.cache_size:
+            self.tiles.popitem(last=False)
+        return tile
+
+    def draw(self, screen, camera: "Camera"):
+        for layer, factor in enumerate(self.parallax):
+            offset_x = camera.x * factor
+            offset_y = camera.y * factor
+            for tx, ty in visible_tiles(offset_x, offset_y, self.tile_width, self.tile_height):
+                screen.blit(self.get_tile(layer, tx, ty),
+                            (tx * self.tile_width - offset_x, ty * self.tile_height - offset_y))
+
+class HudPanel:
+    """A retained HUD surface, re-rendered only when its inputs change.
+
+    render() returns (surface, screen position) or None when the panel is
+    hidden.  refresh() compares a key built from the panel's inputs with the
+    last one and reports the screen rects that need repainting.
+    """
+
+    def __init__(self, render):
+        self.render = render
+        self.key = object()  # Never equal to a real key, forces the first render
+        self.surface: Optional[pygame.Surface] = None
+        self.rect: Optional[pygame.Rect] = None
+
+    def refresh(self, key) -> List[pygame.Rect]:
+        if key == self.key:
+            return []
+        self.key = key
+        old_rect = self.rect
+        result = self.render()
+        if result is None:
+            self.surface = None
+            self.rect = None
+        else:
+            self.surface, pos = result
+            self.rect = self.surface.get_rect(topleft=pos)
+        return [rect for rect in (old_rect, self.rect) if rect]
+
+    def draw(self, screen, area: Optional[pygame.Rect] = None):
+        """Blit the panel, or only the part of it inside area"""
+        if self.surface is None:
+            return
+        if area is None:
+            screen.blit(self.surface, self.rect)
+            return
+        overlap = self.rect.clip(area)
+        if overlap.width and overlap.height:
+            screen.blit(self.surface, overlap, overlap.move(-self.rect.x, -self.rect.y))
+
+class Hud:
+    """HUD panels in drawing order, composited over a cached world layer"""
+
+    def __init__(self, panels: Dict[str, HudPanel]):
+        self.panels = panels
+
+    def __getitem__(self, name: str) -> HudPanel:
+        return self.panels[name]
+
+    def draw(self, screen):
+        for panel in self.panels.values():
+            panel.draw(screen)
+
+    def repair(self, screen, world_layer, rects: List[pygame.Rect]):
+        """Repaint dirty rects from the world layer and the panels above it"""
+        for rect in rects:
+            screen.blit(world_layer, rect, rect)
+            for panel in self.panels.values():
+                panel.draw(screen, rect)
+
+class Minimap:
+    """Persistent minimap layer with a cached world-to-minimap mapping.
+
+    Planet dots are drawn once onto a base surface and only redrawn for
+    planets that changed owner; each frame just copies the base and draws
+    the viewport rectangle.  The same mapping converts minimap clicks back
+    to world coordinates.
+    """
+
+    def __init__(self, planet_index, rect: pygame.Rect,
+                 world_size: tuple[int, int] = (WORLD_WIDTH, WORLD_HEIGHT)):
+        self.rect = rect
+        self.planet_index = planet_index
+        self.world_size = world_size
+        self.scale_x = rect.width / world_size[0]
+        self.scale_y = rect.height / world_size[1]
+        self.dot_radius = 2
+        self.base = pygame.Surface(rect.size, pygame.SRCALPHA)
+        self.base.fill((30, 30, 30, 180))  # DARK_GRAY with alpha
+        self.changes_seen = 0
+        for planet in planet_index.query_rect(0, 0, *world_size):
+            self.draw_dot(planet)
+
+    def to_minimap(self, pos) -> tuple[int, int]:
+        return (int(pos[0] * self.scale_x), int(pos[1] * self.scale_y))
+
+    def to_world(self, screen_pos) -> tuple[float, float]:
+        """World position under a screen position inside the minimap"""
+        return ((screen_pos[0] - self.rect.x) / self.scale_x,
+                (screen_pos[1] - self.rect.y) / self.scale_y)
+
+    def draw_dot(self, planet):
+        color = BLUE if planet.owner == "player" else RED if planet.owner == "ai" else WHITE
+        pygame.draw.circle(self.base, color, self.to_minimap(planet.position), self.dot_radius)
+
+    def sync(self, planets: Dict[str, Planet], ownership_changes: List[str]):
+        """Redraw the dots of planets that changed owner since the last sync"""
+        changed = ownership_changes[self.changes_seen:]
+        self.changes_seen = len(ownership_changes)
+        for name in set(changed):
+            if name not in planets:
+                continue  # Unloaded since
+            x, y = self.to_minimap(planets[name].position)
+            area = pygame.Rect(x - self.dot_radius, y - self.dot_radius,
+                               self.dot_radius * 2 + 1, self.dot_radius * 2 + 1)
+            self.base.fill((30, 30, 30, 180), area)
+            # Repaint every dot overlapping the cleared area, not just this one
+            margin = self.dot_radius * 2 + 1
+            self.base.set_clip(area)
+            for planet in self.planet_index.query_rect(
+                    (area.x - margin) / self.scale_x, (area.y - margin) / self.scale_y,
+                    (area.width + margin * 2) / self.scale_x, (area.height + margin * 2) / self.scale_y):
+                self.draw_dot(planet)
+            self.base.set_clip(None)
+
+    def render(self, camera: "Camera") -> pygame.Surface:
+        """The minimap with the current view rectangle on top"""
+        surface = self.base.copy()
+        viewport_x, viewport_y = self.to_minimap((camera.x, camera.y))
+        viewport_w = int(SCREEN_WIDTH * self.scale_x)
+        viewport_h = int((SCREEN_HEIGHT - COMMAND_BAR_HEIGHT) * self.scale_y)
+        pygame.draw.rect(surface, WHITE, (viewport_x, viewport_y, viewport_w, viewport_h), 1)
+        return surface
+
+def faction_color(owner: str):
+    return PLAYER_GREEN if owner == "player" else RED if owner == "ai" else GRAY
+
+class BattleView:
+    """Animated playback of recent battles in the galaxy view.
+
+    Battles are picked up from the simulation's battle list as they are
+    fought; the strength curves of each new batch are computed in one
+    vectorized call and each battle is played back at its planet for
+    BATTLE_ANIMATION_SECONDS of game time.
+    """
+
+    def __init__(self):
+        self.battles_seen = 0
+        self.active: List[tuple] = []  # (battle, attack curve, defence curve), oldest first
+
+    def sync(self, battles: List[Battle], now: float):
+        """Start animating new battles and drop the finished ones"""
+        new = battles[self.battles_seen:][-MAX_BATTLE_ANIMATIONS:]
+        self.battles_seen = len(battles)
+        if new:
+            attack, defence = combat.strength_curves([battle.attack for battle in new],
+                                                     [battle.defence for battle in new])
+            self.active.extend(zip(new, attack.tolist(), defence.tolist()))
+            del self.active[:-MAX_BATTLE_ANIMATIONS]
+        while self.active and now - self.active[0][0].time >= BATTLE_ANIMATION_SECONDS:
+            self.active.pop(0)
+
+    def draw(self, screen, camera: "Camera", planets: Dict[str, Planet], now: float):
+        """Draw the battles at planets inside the screen"""
+        for battle, attack, defence in self.active:
+            x, y = camera.world_to_screen(planets[battle.planet].position)
+            if not (-PLANET_RADIUS * 2 <= x <= SCREEN_WIDTH + PLANET_RADIUS * 2
+                    and -PLANET_RADIUS * 2 <= y <= SCREEN_HEIGHT + PLANET_RADIUS * 2):
+                continue
+            progress = min(max((now - battle.time) / BATTLE_ANIMATION_SECONDS, 0.0), 1.0)
+            sample = min(int(progress * len(attack)), len(attack) - 1)
+            scale = max(attack[0], defence[0], 1.0)
+
+            # Pulsing ring around the contested planet, then the victor's color
+            if sample < len(attack) - 1:
+                radius = PLANET_RADIUS + 6 + int(6 * math.sin(progress * math.pi * 8) ** 2)
+                pygame.draw.circle(screen, YELLOW, (x, y), radius, 2)
+            else:
+                winner = battle.attacker if battle.conquered else battle.defender
+                pygame.draw.circle(screen, faction_color(winner), (x, y), PLANET_RADIUS + 8, 3)
+
+            # Each side's remaining strength as a bar above the planet
+            left = x - BATTLE_BAR_WIDTH // 2
+            for row, (owner, curve) in enumerate(((battle.attacker, attack),
+                                                  (battle.defender, defence))):
+                top = y - PLANET_RADIUS - 50 + row * (BATTLE_BAR_HEIGHT + 2)
+                pygame.draw.rect(screen, DARK_GRAY, (left, top, BATTLE_BAR_WIDTH, BATTLE_BAR_HEIGHT))
+                width = int(BATTLE_BAR_WIDTH * curve[sample] / scale)
+                if width:
+                    pygame.draw.rect(screen, faction_color(owner), (left, top, width, BATTLE_BAR_HEIGHT))
 
 class Camera:
-    def __init__(self, x: int, y: int):
+    def __init__(self, x: int, y: int, world_size: tuple[int, int] = (WORLD_WIDTH, WORLD_HEIGHT)):
         self.x = x
         self.y = y
         self.speed = CAMERA_SPEED
+        self.world_width, self.world_height = world_size
 
     def move(self, keys):
         if keys[pygame.K_LEFT] and self.x > 0:
             self.x -= self.speed
-        if keys[pygame.K_RIGHT] and self.x < WORLD_WIDTH - SCREEN_WIDTH:
+        if keys[pygame.K_RIGHT] and self.x < self.world_width - SCREEN_WIDTH:
             self.x += self.speed
         if keys[pygame.K_UP] and self.y > 0:
             self.y -= self.speed
-        if keys[pygame.K_DOWN] and self.y < WORLD_HEIGHT - SCREEN_HEIGHT:
+        if keys[pygame.K_DOWN] and self.y < self.world_height - SCREEN_HEIGHT:
             self.y += self.speed
 
+    def center_on(self, pos: tuple[float, float]):
+        """Center the view on a world position, kept inside the world"""
+        self.x = int(max(0, min(self.world_width - SCREEN_WIDTH, pos[0] - SCREEN_WIDTH // 2)))
+        self.y = int(max(0, min(self.world_height - SCREEN_HEIGHT, pos[1] - SCREEN_HEIGHT // 2)))
+
     def world_to_screen(self, pos: tuple[int, int]) -> tuple[int, int]:
         """Convert world coordinates to screen coordinates"""
         return (pos[0] - self.x, pos[1] - self.y)
@@ -528,33 +984,43 @@ class Camera:
         return (pos[0] + self.x, pos[1] + self.y)
 
 class GalaxyConquest:
-    def __init__(self):
+    def __init__(self, sim: Optional[Simulation] = None, star_count: int = STAR_COUNT,
+                 autosave_path: Optional[str] = AUTOSAVE_PATH, record_dir: Optional[str] = REPLAY_DIR,
+                 ai_faction: Optional[str] = "ai", threaded: bool = False, faction: str = "player"):
+        # Initialized here rather than on import, so processes that only import this module don't start SDL
+        pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Galaxy Conquest")
         self.clock = pygame.time.Clock()
         self.current_mode = GameMode.GALACTIC_OVERVIEW
         
+        # Game state lives in the headless simulation
+        self.sim = sim if sim is not None else Simulation(seed=random.randrange(2 ** 32))
+        self.world = self.sim  # What the renderer reads: the simulation, or its latest snapshot
+        self.sim_thread = None
+        self.faction = faction  # Whose orders the player gives
+        self.opponent = "ai" if faction == "player" else "player"
+        
         # Initialize camera at the center of the player's capital
-        start_x = PLANET_DATA[0][1][0] - SCREEN_WIDTH // 2
-        start_y = PLANET_DATA[0][1][1] - SCREEN_HEIGHT // 2
-        self.camera = Camera(start_x, start_y)
+        capital = next((planet for planet in self.sim.planets.values() if planet.owner == faction),
+                       next(iter(self.sim.planets.values())))
+        start_x = capital.position[0] - SCREEN_WIDTH // 2
+        start_y = capital.position[1] - SCREEN_HEIGHT // 2
+        self.camera = Camera(start_x, start_y, self.sim.world_size)
         
-        # Game state
-        self.planets: Dict[str, Planet] = {}
-        self.fleets: List[Fleet] = []
-        self.player_resources = 100_000
-        self.ai_resources = 100_000
+        # View state
         self.selected_planet = None
         self.current_zoom = 0.0  # 0.0 = galaxy view, 1.0 = planet view
         self.target_zoom = 0.0   # For smooth zoom transitions
-        self.current_day = 1
-        self.day_timer = 0
-        self.seconds_per_day = 30
         self.mouse_pos = (0, 0)  # Track mouse position
         self.hovering_station_icon = False
         self.hovering_fighter_icon = False
         self.last_time = time.time()
-        self.current_time = time.time()
+        self.game_speed = 1  # Game seconds per real second, one of GAME_SPEEDS
+        self.accumulator = 0.0  # Real time owed to the simulation, in game seconds
+        self.interpolation = 1.0  # How far the frame lies between the last two sim steps
+        self.profiler_overlay = False
+        self.profile_session = False  # Record frames for the whole session, even with the overlay hidden
         
         # Fleet movement
         self.dragging_fleet = None
@@ -562,54 +1028,105 @@ class GalaxyConquest:
         self.fleet_drag_start = None
         
         # Initialize fonts
-        self.font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 24)
-        self.large_font = pygame.font.Font(None, 48)
+        self.font = text_cache.font(FONT_SIZE)
+        self.small_font = text_cache.font(SMALL_FONT_SIZE)
+        self.large_font = text_cache.font(LARGE_FONT_SIZE)
+        
+        # Pre-rendered planet sprites for the galaxy view
+        self.planet_sprites = PlanetSpriteCache()
+        self.planet_textures = PlanetTexturePyramid()
+        
+        # Retained HUD panels over a copy of the last rendered world view
+        self.hud = Hud({
+            "command_bar": HudPanel(self.render_command_bar),
+            "station_icon": HudPanel(self.render_station_icon),
+            "fighter_icon": HudPanel(self.render_fighter_icon),
+            "status": HudPanel(self.render_status_bar),
+            "minimap": HudPanel(self.render_minimap),
+            "tooltip": HudPanel(self.render_tooltip),
+            "profiler": HudPanel(self.render_profiler_overlay),
+        })
+        self.minimap = Minimap(self.sim.planet_index, pygame.Rect(SCREEN_WIDTH - 200 - 20, 20, 200, 200),
+                               self.sim.world_size)
+        self.battle_view = BattleView()
+        self.world_layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.world_key = None
         
         # Initialize background stars
-        self.stars = self.generate_stars()
+        self.star_count = star_count
+        self.create_starfield()
+
+        # Procedural galaxies load the chunks around the camera as it moves
+        self.chunk_streamer = ChunkStreamer(self.faction) if self.sim.galaxy is not None else None
+        self.streamed_view = None  # (camera chunk, galaxy version) of the last streaming pass
+        
+        # Snapshots are written on a background thread
+        self.autosaver = savegame.Autosaver(autosave_path) if autosave_path else None
+        
+        # The computer opponent plans on a worker process
+        self.ai = AiPlayer(ai_faction) if ai_faction else None
         
-        self.initialize_game()
+        # Commands and keyframes for replaying the match
+        self.record_dir = record_dir
+        self.command_log = None
+        self.start_recording()
+
+        # Optionally step the simulation on its own thread, drawing from snapshots
+        if threaded:
+            self.start_sim_thread()
+        
+    @property
+    def planets(self) -> Dict[str, Planet]:
+        return self.world.planets
+
+    @property
+    def fleets(self) -> List[Fleet]:
+        return list(self.world.fleets.values())
+
+    @property
+    def player_resources(self) -> int:
+        return self.world.resources[self.faction]
+
+    @property
+    def ai_resources(self) -> int:
+        return self.world.resources[self.opponent]
+
+    @property
+    def current_day(self) -> int:
+        return self.world.current_day
+
+    @property
+    def day_timer(self) -> float:
+        return self.world.day_timer
+
+    @property
+    def seconds_per_day(self) -> float:
+        return self.world.seconds_per_day
+
+    @property
+    def current_time(self) -> float:
+        return self.world.current_time
         
-    def generate_stars(self) -> List[Star]:
-        stars = []
-        for _ in range(STAR_COUNT):
-            x = random.uniform(0, WORLD_WIDTH)
-            y = random.uniform(0, WORLD_HEIGHT)
-            brightness = random.randint(50, 255)
-            size = random.uniform(0.5, 2)
-            stars.append(Star(x, y, brightness, size))
-        return stars
-
-    def initialize_game(self):
-        """Initialize the game state with planets"""
-        # Create planets from the planet data
-        for name, position, owner, resource_rate in PLANET_DATA:
-            # Set initial resources based on owner
-            self.planets[name] = Planet(
-                name=name,
-                position=position,
-                owner=owner,
-                resources=0,  # Planets don't store resources
-                fleet_size=0,
-                resource_rate=resource_rate  # Each planet gives 500 per day
-            )
+    def generate_stars(self, count: int = STAR_COUNT) -> StarTable:
+        # Seeded from the match so a replayed or reloaded game looks the same
+        return StarTable.random(count, self.sim.seed)
+
+    def create_starfield(self):
+        """Scatter stars over a fixed map, or generate them tile by tile over a galaxy"""
+        if self.sim.galaxy is not None:
+            self.stars = None
+            self.starfield = ProceduralStarfield(self.sim.seed)
+        else:
+            self.stars = self.generate_stars(self.star_count)
+            self.starfield = Starfield(self.stars)
 
     def calculate_daily_resource_income(self):
         """Calculate total daily resource income from all owned planets"""
-        total_income = 0
-        for planet in self.planets.values():
-            if planet.owner == "player":
-                total_income += planet.resource_rate
-        return total_income
+        return self.world.daily_income(self.faction)
 
     def calculate_ai_daily_income(self):
         """Calculate total daily resource income for AI from all owned planets"""
-        total_income = 0
-        for planet in self.planets.values():
-            if planet.owner == "ai":
-                total_income += planet.resource_rate
-        return total_income
+        return self.world.daily_income(self.opponent)
 
     def handle_events(self):
         """Handle game events"""
@@ -628,33 +1145,187 @@ class GalaxyConquest:
             elif event.type == pygame.MOUSEMOTION:
                 self.mouse_pos = event.pos
                 
+            elif event.type == pygame.KEYDOWN:
+                if event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                    self.change_game_speed(1)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    self.change_game_speed(-1)
+                elif event.key == pygame.K_F3:
+                    self.show_profiler_overlay(not self.profiler_overlay)
+                elif event.key == pygame.K_F4:
+                    self.export_profile()
+                elif event.key == pygame.K_F5:
+                    self.save_game(QUICKSAVE_PATH)
+                elif event.key == pygame.K_F9:
+                    self.load_game(QUICKSAVE_PATH)
+                
         return True
+
+    def change_game_speed(self, direction):
+        """Step the game speed up or down through GAME_SPEEDS"""
+        if self.sim_thread and self.sim_thread.networked:
+            return  # Every player steps in lockstep at the match's pace
+        index = GAME_SPEEDS.index(self.game_speed) + direction
+        self.game_speed = GAME_SPEEDS[max(0, min(len(GAME_SPEEDS) - 1, index))]
+        if self.sim_thread:
+            self.sim_thread.game_speed = self.game_speed
         
+    def show_profiler_overlay(self, visible):
+        """Toggle the profiler overlay; profiling runs while it is shown"""
+        self.profiler_overlay = visible
+        if visible and not profiler.enabled:
+            profiler.enable()
+        elif not visible and not self.profile_session:
+            profiler.enable(False)
+
+    def export_profile(self, basename=None):
+        """Write the recorded frame samples to CSV and JSON files"""
+        basename = basename or time.strftime("profile-%Y%m%d-%H%M%S")
+        profiler.export_csv(basename + ".csv")
+        profiler.export_json(basename + ".json")
+        return basename
+
+    def save_game(self, path):
+        """Save in the background, after any autosave being written, or synchronously without an autosaver"""
+        if self.sim_thread:
+            # Captured between steps on the simulation thread
+            if self.autosaver:
+                self.call(self.autosaver.save, path, True)
+            else:
+                self.call(savegame.save, path)
+            return True
+        if self.autosaver:
+            return self.autosaver.save(self.sim, path, queue=True)
+        savegame.save(self.sim, path)
+        return True
+
+    def start_recording(self):
+        """Record the current simulation to a new command log in record_dir"""
+        if not self.record_dir:
+            return
+        os.makedirs(self.record_dir, exist_ok=True)
+        name = time.strftime("match-%Y%m%d-%H%M%S") + f"-day{self.sim.current_day}.gclog"
+        self.command_log = CommandLog(os.path.join(self.record_dir, name), self.sim, SIM_DT)
+
+    def stop_recording(self):
+        """Close the command log with a final keyframe of the current simulation"""
+        if self.command_log:
+            self.command_log.close(self.sim)
+            self.command_log = None
+
+    def start_sim_thread(self, sim_thread: Optional[SimThread] = None):
+        """Hand the simulation, the AI and autosaves over to a thread of their own.
+
+        sim_thread replaces the default one, such as a networked match's.
+        """
+        hooks = [self.ai.update] if self.ai else []
+        if self.autosaver:
+            hooks.append(self.autosaver.update)
+        if sim_thread is None:
+            sim_thread = SimThread(self.sim, SIM_DT, MAX_SIM_STEPS_PER_FRAME, MAX_FRAME_TIME, hooks)
+        else:
+            sim_thread.hooks.extend(hooks)
+        self.sim_thread = sim_thread
+        self.sim_thread.game_speed = self.game_speed
+        self.world = self.sim_thread.latest()
+        self.minimap = Minimap(self.world.planet_index, self.minimap.rect, self.world.world_size)
+        self.world_key = None
+        self.sim_thread.start()
+
+    def stop_sim_thread(self):
+        """Stop the simulation thread and go back to stepping the simulation every frame"""
+        if self.sim_thread:
+            self.sim_thread.stop()
+            # A networked match may have replaced the simulation while resyncing
+            self.sim = self.sim_thread.sim
+            self.sim_thread = None
+            self.world = self.sim
+            self.minimap = Minimap(self.sim.planet_index, self.minimap.rect, self.sim.world_size)
+            self.world_key = None
+
+    def submit(self, command):
+        """Queue a command for the simulation's next step"""
+        if self.sim_thread:
+            self.sim_thread.submit(command)
+        else:
+            self.sim.submit(command)
+
+    def call(self, function, *args):
+        """Run function(sim, *args) on whichever thread owns the simulation"""
+        if self.sim_thread:
+            self.sim_thread.call(function, *args)
+        else:
+            function(self.sim, *args)
+
+    def load_game(self, path):
+        """Replace the simulation with a saved one and reset the view state"""
+        if self.sim_thread and self.sim_thread.networked:
+            print("Cannot load a save during a network match")
+            return False
+        try:
+            sim = savegame.load(path)
+        except (OSError, savegame.SaveError) as error:
+            print(f"Could not load {path}: {error}")
+            return False
+        threaded = self.sim_thread is not None
+        self.stop_sim_thread()
+        self.stop_recording()
+        self.sim = self.world = sim
+        self.selected_planet = None
+        self.current_zoom = self.target_zoom = 0.0
+        self.current_mode = GameMode.GALACTIC_OVERVIEW
+        self.dragging_fleet = None
+        self.dragging_from_planet = None
+        self.fleet_drag_start = None
+        self.accumulator = 0.0
+        self.planet_sprites.invalidate()
+        self.create_starfield()
+        self.minimap = Minimap(self.sim.planet_index, self.minimap.rect, self.sim.world_size)
+        self.camera.world_width, self.camera.world_height = self.sim.world_size
+        self.chunk_streamer = ChunkStreamer(self.faction) if self.sim.galaxy is not None else None
+        self.streamed_view = None
+        self.battle_view = BattleView()
+        self.world_key = None
+        for panel in self.hud.panels.values():
+            panel.key = object()
+        if self.autosaver:
+            self.autosaver.last_save_time = sim.current_time
+        if self.ai:
+            self.ai.reset()
+        self.start_recording()
+        if threaded:
+            self.start_sim_thread()
+        return True
+
     def handle_mouse_click(self, pos):
         """Handle mouse clicks in the game"""
         if self.current_mode == GameMode.GALACTIC_OVERVIEW:
-            # Check for clicks on planets
-            for planet_name, planet in self.planets.items():
-                screen_pos = self.camera.world_to_screen(planet.position)
-                distance = math.sqrt((pos[0] - screen_pos[0])**2 + 
-                                  (pos[1] - screen_pos[1])**2)
-                
-                # Check if clicking on fleet
+            # Jump the camera to a point clicked on the minimap
+            if self.minimap.rect.collidepoint(pos):
+                self.camera.center_on(self.minimap.to_world(pos))
+                return True
+            
+            world_pos = self.camera.screen_to_world(pos)
+            
+            # Check for clicks on fleets, which sit above their planet
+            nearby = self.world.planet_index.query_radius(world_pos, PLANET_RADIUS + 20 + 12)
+            for planet in nearby:
                 if planet.fleet and planet.fleet.fighters > 0:
-                    fleet_pos = (screen_pos[0], screen_pos[1] - PLANET_RADIUS - 20)
-                    fleet_distance = math.sqrt((pos[0] - fleet_pos[0])**2 + 
-                                            (pos[1] - fleet_pos[1])**2)
+                    fleet_pos = (planet.position[0], planet.position[1] - PLANET_RADIUS - 20)
+                    fleet_distance = math.sqrt((world_pos[0] - fleet_pos[0])**2 + 
+                                            (world_pos[1] - fleet_pos[1])**2)
                     if fleet_distance <= 12:  # Fleet circle radius
                         self.dragging_fleet = planet.fleet
                         self.dragging_from_planet = planet
                         self.fleet_drag_start = pos
                         return True
-                
-                if distance <= PLANET_RADIUS:
-                    if self.current_mode == GameMode.GALACTIC_OVERVIEW:
-                        self.selected_planet = planet_name
-                        self.target_zoom = 1.0
-                        return True
+            
+            # Check for clicks on planets
+            planet = self.world.planet_index.query_point(world_pos, PLANET_RADIUS)
+            if planet:
+                self.selected_planet = planet.name
+                self.target_zoom = 1.0
+                return True
                         
         return False
         
@@ -662,23 +1333,12 @@ class GalaxyConquest:
         """Handle mouse button release"""
         if self.dragging_fleet:
             # Check if released over a planet
-            for planet_name, planet in self.planets.items():
-                screen_pos = self.camera.world_to_screen(planet.position)
-                distance = math.sqrt((pos[0] - screen_pos[0])**2 + 
-                                  (pos[1] - screen_pos[1])**2)
-                
-                if distance <= PLANET_RADIUS:
-                    # Move fleet to this planet
-                    if planet != self.dragging_from_planet:
-                        # If target is neutral, conquer it
-                        if planet.owner == "neutral":
-                            planet.owner = self.dragging_fleet.owner
-                        
-                        # Transfer fleet to new planet
-                        self.dragging_from_planet.fleet = None
-                        planet.fleet = self.dragging_fleet
-                        planet.fleet.position = planet.position
-                    break
+            world_pos = self.camera.screen_to_world(pos)
+            planet = self.world.planet_index.query_point(world_pos, PLANET_RADIUS)
+            if planet:
+                # Move fleet to this planet on the next tick
+                self.submit(TransferFleet(self.faction, self.dragging_from_planet.name,
+                                          planet.name))
             
             self.dragging_fleet = None
             self.dragging_from_planet = None
@@ -688,17 +1348,14 @@ class GalaxyConquest:
         return False
         
     def update(self, dt):
-        self.current_time += dt
-        self.day_timer += dt
-        
-        # Update planets
-        for planet in self.planets.values():
-            # Update space station construction
-            planet.update_station_construction(self.current_time)
-            
-            # Update fighter construction
-            planet.update_fighter_construction(self.current_time)
-        
+        """Advance the simulation by one step of dt and the view by one frame"""
+        self.sim.step(dt)
+        self.update_view()
+
+    def update_view(self):
+        """Advance zoom, camera and battle animations, once per rendered frame"""
+        self.battle_view.sync(self.world.battles, self.world.current_time)
+
         # Update zoom level with smooth transition
         if abs(self.current_zoom - self.target_zoom) > 0.01:
             self.current_zoom += (self.target_zoom - self.current_zoom) * 0.1
@@ -711,33 +1368,71 @@ class GalaxyConquest:
         if self.current_mode == GameMode.GALACTIC_OVERVIEW:
             keys = pygame.key.get_pressed()
             self.camera.move(keys)
-        
-        # Update day timer
-        if self.day_timer >= self.seconds_per_day:
-            self.day_timer = 0
-            self.current_day += 1
-            
-            # Add resources once per day
-            for planet in self.planets.values():
-                if planet.owner == "player":
-                    self.player_resources += planet.resource_rate
-                elif planet.owner == "ai":
-                    self.ai_resources += planet.resource_rate
+
+        if self.chunk_streamer is not None:
+            self.stream_chunks()
+
+    def stream_chunks(self):
+        """Load the chunks around the camera, once it enters a new chunk or the chunks change"""
+        galaxy = self.world.galaxy
+        view = (galaxy.chunk_of((self.camera.x, self.camera.y)),
+                galaxy.chunk_of((self.camera.x + SCREEN_WIDTH, self.camera.y + SCREEN_HEIGHT)),
+                galaxy.version)
+        if view == self.streamed_view:
+            return
+        if self.streamed_view is not None and self.streamed_view[2] != galaxy.version:
+            self.minimap = Minimap(self.world.planet_index, self.minimap.rect, galaxy.size)
+            self.minimap.changes_seen = len(self.world.ownership_changes)
+            self.hud["minimap"].key = object()
+            self.planet_sprites.retain(self.world.planets)
+            if self.selected_planet not in self.world.planets:
+                self.selected_planet = None
+        self.streamed_view = view
+        self.call(self.chunk_streamer.update, self.camera.x, self.camera.y, SCREEN_WIDTH, SCREEN_HEIGHT)
 
     def draw(self):
-        """Draw the game state"""
+        """Draw the game state, updating only the dirty parts of the display"""
+        world_key = self.world_state_key()
+        world_changed = world_key != self.world_key
+        if world_changed:
+            with profiler.section("world"):
+                self.draw_world()
+                self.world_layer.blit(self.screen, (0, 0))
+            self.world_key = world_key
+        
+        with profiler.section("hud"):
+            dirty = self.refresh_hud()
+        with profiler.section("present"):
+            if world_changed:
+                self.hud.draw(self.screen)
+                pygame.display.flip()
+            elif dirty:
+                self.hud.repair(self.screen, self.world_layer, dirty)
+                pygame.display.update(dirty)
+
+    def world_state_key(self):
+        """Everything the world view (stars, planets, fleets) depends on"""
+        key = (self.current_mode, self.camera.x, self.camera.y, self.current_zoom,
+               self.selected_planet, self.world.revision)
+        if self.dragging_fleet:
+            key += (self.mouse_pos,)
+        if self.world.fleets:
+            key += (self.interpolation,)
+        if self.battle_view.active:
+            key += (self.world.current_time,)
+        return key
+
+    def draw_world(self):
+        """Draw stars, planets and fleets for the current mode"""
         self.screen.fill(BLACK)
         
         # Draw stars in the background
-        for star in self.stars:
-            color = (star.brightness,) * 3
-            pygame.draw.circle(self.screen, color, 
-                             (int(star.x), int(star.y)), 
-                             int(star.size))
+        self.starfield.draw(self.screen, self.camera)
         
         if self.current_mode == GameMode.GALACTIC_OVERVIEW:
             # Draw planets
             self.draw_planets()
+            self.draw_battle()
             
             # Draw dragging fleet if any
             if self.dragging_fleet:
@@ -747,21 +1442,29 @@ class GalaxyConquest:
                 fleet_color = PLAYER_GREEN if self.dragging_fleet.owner == "player" else RED
                 pygame.draw.line(self.screen, fleet_color, start_pos, self.mouse_pos, 2)
                 
+                # Draw the hyperlane route to the planet under the mouse
+                target = self.world.planet_index.query_point(
+                    self.camera.screen_to_world(self.mouse_pos), PLANET_RADIUS)
+                if target and target is not self.dragging_from_planet:
+                    route = self.world.hyperlanes.route(self.dragging_from_planet.name, target.name)
+                    if route:
+                        points = [self.camera.world_to_screen(self.planets[name].position)
+                                  for name in route]
+                        pygame.draw.lines(self.screen, fleet_color, False, points, 3)
+                
                 # Draw fleet circle at mouse position
                 pygame.draw.circle(self.screen, fleet_color, self.mouse_pos, 12, 2)
                 
                 # Draw ship count
                 count_text = str(self.dragging_fleet.fighters)
-                text_surface = pygame.font.SysFont(None, 20).render(count_text, True, WHITE)
+                text_surface = text_cache.render(count_text, BADGE_FONT_SIZE, WHITE)
                 text_rect = text_surface.get_rect(center=self.mouse_pos)
                 self.screen.blit(text_surface, text_rect)
                 
         elif self.current_mode == GameMode.PLANET_VIEW and self.selected_planet:
             # Draw zoomed planet view
             planet = self.planets[self.selected_planet]
-            appearance = PLANET_APPEARANCES[planet.name]
-            colors = appearance["colors"]
-            pattern = appearance["pattern"]
+            colors = planet_appearance(planet.name)["colors"]
             
             # Calculate zoomed planet size based on current zoom level
             zoom_radius = int(PLANET_RADIUS + (ZOOMED_PLANET_RADIUS - PLANET_RADIUS) * self.current_zoom)
@@ -769,21 +1472,9 @@ class GalaxyConquest:
             # Draw the planet at the center-bottom of the screen
             planet_pos = (SCREEN_WIDTH // 2, SCREEN_HEIGHT - zoom_radius // 2)
             
-            # Draw the semicircle planet surface
-            pygame.draw.circle(self.screen, colors[0], planet_pos, zoom_radius)
-            
-            # Draw planet pattern scaled up
-            if pattern == "grid":
-                # Draw grid pattern scaled with zoom
-                grid_spacing = int(4 * (1 + self.current_zoom * 2))
-                for y in range(-zoom_radius, zoom_radius + 1, grid_spacing):
-                    for x in range(-zoom_radius, zoom_radius + 1, grid_spacing):
-                        if x*x + y*y <= zoom_radius * zoom_radius:
-                            point_x = planet_pos[0] + x
-                            point_y = planet_pos[1] + y
-                            if point_y > SCREEN_HEIGHT - zoom_radius:  # Only draw on visible part
-                                if random.random() < 0.3:
-                                    pygame.draw.circle(self.screen, colors[1], (point_x, point_y), 1 + self.current_zoom)
+            # Draw the planet surface from the closest pre-rendered level
+            texture = self.planet_textures.get(planet.name, zoom_radius)
+            self.screen.blit(texture, texture.get_rect(center=planet_pos))
             
             # Draw the horizon line
             pygame.draw.line(self.screen, colors[0], 
@@ -825,8 +1516,7 @@ class GalaxyConquest:
                 
                 # Draw ship count with larger font and background
                 count_text = str(planet.fleet.fighters)
-                count_font = pygame.font.SysFont(None, 48)
-                text_surface = count_font.render(count_text, True, WHITE)
+                text_surface = text_cache.render(count_text, LARGE_FONT_SIZE, WHITE)
                 text_rect = text_surface.get_rect(midleft=(ship_x + ship_size//2 + 20, ship_y))
                 
                 # Draw background circle for count
@@ -880,97 +1570,142 @@ class GalaxyConquest:
                     end_y = start_y + arm_length * math.sin(angle)
                     pygame.draw.line(self.screen, WHITE, (start_x, start_y), (end_x, end_y), arm_width)
 
-        # Draw UI elements
-        self.draw_command_bar()
-        self.draw_status_bar()
-        self.draw_minimap()
-        
-        pygame.display.flip()
-
+    @profiler.timed()
     def draw_planets(self):
         """Draw all planets and fleets in galaxy view"""
-        # Draw all planets
-        for planet in self.planets.values():
+        # Only draw what the spatial index reports inside the viewport,
+        # padded so sprites straddling the edge are still drawn
+        margin = self.planet_sprites.half_size
+        view = (self.camera.x - margin, self.camera.y - margin,
+                SCREEN_WIDTH + margin * 2, SCREEN_HEIGHT + margin * 2)
+        
+        self.draw_hyperlanes(view)
+        
+        # Draw planets
+        for planet in self.world.planet_index.query_rect(*view):
             screen_pos = self.camera.world_to_screen(planet.position)
-            if (0 <= screen_pos[0] <= SCREEN_WIDTH and 
-                0 <= screen_pos[1] <= SCREEN_HEIGHT):
-                planet.draw(self.screen, screen_pos)
+            self.planet_sprites.draw(self.screen, planet, screen_pos)
 
         # Draw fleets
-        for fleet in self.fleets:
-            screen_pos = self.camera.world_to_screen(fleet.position)
-            if (0 <= screen_pos[0] <= SCREEN_WIDTH and 
-                0 <= screen_pos[1] <= SCREEN_HEIGHT):
-                fleet.draw(self.screen, self.camera.position, self.current_zoom)
-
-    def draw_command_bar(self):
-        """Draw the command bar at the bottom of the screen"""
+        for fleet in self.world.fleets_in_rect(*view):
+            draw_fleet(self.screen, fleet, self.camera, self.interpolation)
+
+    @profiler.timed()
+    def draw_hyperlanes(self, view):
+        """Draw the lanes crossing a world-space rectangle"""
+        x, y, width, height = view
+        segments = self.world.hyperlanes.segments()
+        xs, ys = segments[:, 0::2], segments[:, 1::2]
+        visible = ((xs.max(axis=1) >= x) & (xs.min(axis=1) <= x + width)
+                   & (ys.max(axis=1) >= y) & (ys.min(axis=1) <= y + height))
+        offset = np.array([self.camera.x, self.camera.y] * 2, dtype=np.float64)
+        for x1, y1, x2, y2 in (segments[visible] - offset).tolist():
+            pygame.draw.line(self.screen, LANE_COLOR, (x1, y1), (x2, y2), 1)
+
+    def refresh_hud(self) -> List[pygame.Rect]:
+        """Re-render the HUD panels whose inputs changed, returning dirty rects"""
+        planet = self.planets[self.selected_planet] if self.selected_planet else None
+        dirty = []
+        dirty += self.hud["status"].refresh(self.status_bar_key())
+        dirty += self.hud["minimap"].refresh(self.minimap_key())
+        dirty += self.hud["command_bar"].refresh(self.command_bar_key(planet))
+        dirty += self.hud["station_icon"].refresh(self.station_icon_key(planet))
+        dirty += self.hud["fighter_icon"].refresh(self.fighter_icon_key(planet))
+        dirty += self.hud["tooltip"].refresh(self.tooltip_key(planet))
+        dirty += self.hud["profiler"].refresh(self.profiler_overlay_key())
+        return dirty
+
+    def command_bar_key(self, planet):
+        if not planet:
+            return None
+        return (planet.name, planet.owner, planet.resources, planet.resource_rate)
+
+    @profiler.timed()
+    def render_command_bar(self):
+        """Render the command bar at the bottom of the screen"""
         if not self.selected_planet:
-            return
+            return None
             
         # Create a surface for the command bar with transparency
         command_bar_surface = pygame.Surface((SCREEN_WIDTH, COMMAND_BAR_HEIGHT), pygame.SRCALPHA)
         command_bar_surface.fill((30, 30, 30, 180))  # DARK_GRAY with alpha
-        self.screen.blit(command_bar_surface, (0, SCREEN_HEIGHT - COMMAND_BAR_HEIGHT))
         
         # Draw horizontal separator line at top
         separator_surface = pygame.Surface((SCREEN_WIDTH, 2), pygame.SRCALPHA)
         separator_surface.fill((50, 50, 50, 180))  # GRAY with alpha
-        self.screen.blit(separator_surface, (0, SCREEN_HEIGHT - COMMAND_BAR_HEIGHT))
+        command_bar_surface.blit(separator_surface, (0, 0))
         
         # Draw vertical separator lines to divide into thirds
         section_width = SCREEN_WIDTH // 3
+        vertical_separator = pygame.Surface((2, COMMAND_BAR_HEIGHT), pygame.SRCALPHA)
+        vertical_separator.fill((50, 50, 50, 180))  # Same color as horizontal separator
         for x in [section_width, section_width * 2]:
-            vertical_separator = pygame.Surface((2, COMMAND_BAR_HEIGHT), pygame.SRCALPHA)
-            vertical_separator.fill((50, 50, 50, 180))  # Same color as horizontal separator
-            self.screen.blit(vertical_separator, (x, SCREEN_HEIGHT - COMMAND_BAR_HEIGHT))
+            command_bar_surface.blit(vertical_separator, (x, 0))
         
         # Draw section headings
-        section2_text = self.font.render("Space Stations", True, WHITE)
-        section3_text = self.font.render("Ships", True, WHITE)
+        section2_text = text_cache.render("Space Stations", FONT_SIZE, WHITE)
+        section3_text = text_cache.render("Ships", FONT_SIZE, WHITE)
         
         # Center the headings in their sections
         section2_x = section_width + (section_width - section2_text.get_width()) // 2
         section3_x = (section_width * 2) + (section_width - section3_text.get_width()) // 2
-        heading_y = SCREEN_HEIGHT - COMMAND_BAR_HEIGHT + 10
+        heading_y = 10
         
-        self.screen.blit(section2_text, (section2_x, heading_y))
-        self.screen.blit(section3_text, (section3_x, heading_y))
+        command_bar_surface.blit(section2_text, (section2_x, heading_y))
+        command_bar_surface.blit(section3_text, (section3_x, heading_y))
         
         planet = self.planets[self.selected_planet]
         # Draw planet info in first section
-        name_text = self.font.render(f"Planet: {planet.name}", True, WHITE)
-        owner_text = self.font.render(f"Owner: {planet.owner.capitalize()}", True, WHITE)
-        resources_text = self.font.render(f"Resources: {planet.resources}", True, WHITE)
-        income_text = self.font.render(f"Daily Income: +{planet.resource_rate}", True, YELLOW)
+        name_text = text_cache.render(f"Planet: {planet.name}", FONT_SIZE, WHITE)
+        owner_text = text_cache.render(f"Owner: {planet.owner.capitalize()}", FONT_SIZE, WHITE)
+        resources_text = text_cache.render(f"Resources: {planet.resources}", FONT_SIZE, WHITE)
+        income_text = text_cache.render(f"Daily Income: +{planet.resource_rate}", FONT_SIZE, YELLOW)
         
-        self.screen.blit(name_text, (20, SCREEN_HEIGHT - COMMAND_BAR_HEIGHT + 20))
-        self.screen.blit(owner_text, (20, SCREEN_HEIGHT - COMMAND_BAR_HEIGHT + 50))
-        self.screen.blit(resources_text, (20, SCREEN_HEIGHT - COMMAND_BAR_HEIGHT + 80))
-        self.screen.blit(income_text, (20, SCREEN_HEIGHT - COMMAND_BAR_HEIGHT + 110))
+        command_bar_surface.blit(name_text, (20, 20))
+        command_bar_surface.blit(owner_text, (20, 50))
+        command_bar_surface.blit(resources_text, (20, 80))
+        command_bar_surface.blit(income_text, (20, 110))
         
-        # Draw space station icon if player owned and not at max level
-        if planet.owner == "player" and (not planet.has_space_station or planet.station_level < 5):
-            self.draw_station_icon(planet)
-            
-        # Draw fighter production icon if player owned and has at least level 1 station
-        if planet.owner == "player" and planet.has_space_station and planet.station_level >= 1:
-            self.draw_fighter_icon(planet)
+        return command_bar_surface, (0, SCREEN_HEIGHT - COMMAND_BAR_HEIGHT)
+
+    def shows_station_icon(self, planet) -> bool:
+        # Player owned and not at max level
+        return bool(planet) and planet.owner == self.faction and (
+            not planet.has_space_station or planet.station_level < 5)
+
+    def shows_fighter_icon(self, planet) -> bool:
+        # Player owned and has at least level 1 station
+        return bool(planet) and planet.owner == self.faction and (
+            planet.has_space_station and planet.station_level >= 1)
+
+    def fighter_icon_key(self, planet):
+        if not self.shows_fighter_icon(planet):
+            return None
+        rules = self.world.rules
+        if planet.building_fighter:
+            return (planet.name, int(rules.fighter_build_time - (self.current_time - planet.fighter_build_start)))
+        return (planet.name, self.player_resources >= rules.fighter_cost)
+
+    def render_fighter_icon(self):
+        """Render the fighter production icon in the ships section"""
+        planet = self.planets[self.selected_planet] if self.selected_planet else None
+        if not self.shows_fighter_icon(planet):
+            return None
             
-    def draw_fighter_icon(self, planet):
-        """Draw the fighter production icon in the ships section"""
         section_width = SCREEN_WIDTH // 3
-        icon_x = (section_width * 2) + 60
-        icon_y = SCREEN_HEIGHT - COMMAND_BAR_HEIGHT + 50
+        surface = pygame.Surface((section_width, COMMAND_BAR_HEIGHT), pygame.SRCALPHA)
+        origin = (section_width * 2, SCREEN_HEIGHT - COMMAND_BAR_HEIGHT)
+        icon_x = 60
+        icon_y = 50
         
         if planet.building_fighter:
             # Draw construction timer if fighter is being built
-            time_left = 10 - (self.current_time - planet.fighter_build_start)
-            timer_text = self.font.render(f"Building: {int(time_left)}s", True, WHITE)
-            timer_x = (section_width * 2) + (section_width - timer_text.get_width()) // 2
-            timer_y = SCREEN_HEIGHT - COMMAND_BAR_HEIGHT + 35
-            self.screen.blit(timer_text, (timer_x, timer_y))
-            return
+            time_left = self.world.rules.fighter_build_time - (self.current_time - planet.fighter_build_start)
+            timer_text = text_cache.render(f"Building: {int(time_left)}s", FONT_SIZE, WHITE)
+            timer_x = (section_width - timer_text.get_width()) // 2
+            timer_y = 35
+            surface.blit(timer_text, (timer_x, timer_y))
+            return surface, origin
         
         # Draw fighter icon (triangle)
         radius = ICON_SIZE // 2
@@ -983,46 +1718,54 @@ class GalaxyConquest:
         ]
         
         # Determine if player can afford fighter
-        can_afford = self.player_resources >= FIGHTER_COST and not planet.building_fighter
+        can_afford = self.player_resources >= self.world.rules.fighter_cost and not planet.building_fighter
         icon_color = LIGHT_BLUE if can_afford else GRAY
         
-        pygame.draw.polygon(self.screen, icon_color, points)
-        pygame.draw.polygon(self.screen, WHITE, points, 2)
+        pygame.draw.polygon(surface, icon_color, points)
+        pygame.draw.polygon(surface, WHITE, points, 2)
         
         # Draw cost and text
-        cost_text = self.small_font.render(f"{FIGHTER_COST}", True, WHITE)
-        type_text = self.small_font.render("Fighter", True, WHITE)
+        cost_text = text_cache.render(f"{self.world.rules.fighter_cost}", SMALL_FONT_SIZE, WHITE)
+        type_text = text_cache.render("Fighter", SMALL_FONT_SIZE, WHITE)
         
         cost_x = icon_x - cost_text.get_width() - 10
         cost_y = icon_y - cost_text.get_height() // 2
         type_x = icon_x + radius + 10
         type_y = icon_y - type_text.get_height() // 2
         
-        self.screen.blit(cost_text, (cost_x, cost_y))
-        self.screen.blit(type_text, (type_x, type_y))
-        
-        # Draw hover text
-        if self.hovering_fighter_icon:
-            hover_text = f"Build Fighter ({FIGHTER_COST})"
-            text_surface = self.small_font.render(hover_text, True, WHITE)
-            text_x = self.mouse_pos[0] + 10
-            text_y = self.mouse_pos[1] - 20
-            self.screen.blit(text_surface, (text_x, text_y))
+        surface.blit(cost_text, (cost_x, cost_y))
+        surface.blit(type_text, (type_x, type_y))
+        return surface, origin
+            
+    def station_icon_key(self, planet):
+        if not self.shows_station_icon(planet):
+            return None
+        rules = self.world.rules
+        if planet.building_station:
+            return (planet.name, int(rules.station_build_time - (self.current_time - planet.station_build_start)))
+        cost = rules.station_cost(planet.station_level + 1)
+        return (planet.name, planet.station_level, self.player_resources >= cost)
+
+    def render_station_icon(self):
+        """Render the space station icon in the space stations section"""
+        planet = self.planets[self.selected_planet] if self.selected_planet else None
+        if not self.shows_station_icon(planet):
+            return None
             
-    def draw_station_icon(self, planet):
-        """Draw the space station icon in the space stations section"""
         section_width = SCREEN_WIDTH // 3
-        icon_x = section_width + 60
-        icon_y = SCREEN_HEIGHT - COMMAND_BAR_HEIGHT + 50
+        surface = pygame.Surface((section_width, COMMAND_BAR_HEIGHT), pygame.SRCALPHA)
+        origin = (section_width, SCREEN_HEIGHT - COMMAND_BAR_HEIGHT)
+        icon_x = 60
+        icon_y = 50
         
         if planet.building_station:
             # Draw construction timer if station is being built
-            time_left = 20 - (self.current_time - planet.station_build_start)
-            timer_text = self.font.render(f"Building: {int(time_left)}s", True, WHITE)
-            timer_x = section_width + (section_width - timer_text.get_width()) // 2
-            timer_y = SCREEN_HEIGHT - COMMAND_BAR_HEIGHT + 35
-            self.screen.blit(timer_text, (timer_x, timer_y))
-            return
+            time_left = self.world.rules.station_build_time - (self.current_time - planet.station_build_start)
+            timer_text = text_cache.render(f"Building: {int(time_left)}s", FONT_SIZE, WHITE)
+            timer_x = (section_width - timer_text.get_width()) // 2
+            timer_y = 35
+            surface.blit(timer_text, (timer_x, timer_y))
+            return surface, origin
         
         # Draw pentagon base
         points = []
@@ -1035,11 +1778,11 @@ class GalaxyConquest:
         
         # Draw base pentagon
         next_level = planet.station_level + 1
-        cost = 500 * next_level  # Each level costs 500 more
+        cost = self.world.rules.station_cost(next_level)  # Each level costs the same amount more
         can_afford = self.player_resources >= cost
         icon_color = LIGHT_BLUE if can_afford else GRAY
-        pygame.draw.polygon(self.screen, icon_color, points)
-        pygame.draw.polygon(self.screen, WHITE, points, 2)
+        pygame.draw.polygon(surface, icon_color, points)
+        pygame.draw.polygon(surface, WHITE, points, 2)
         
         # Draw arms for current level
         if planet.has_space_station:
@@ -1051,102 +1794,280 @@ class GalaxyConquest:
                 start_y = icon_y + radius * math.sin(angle)
                 end_x = start_x + arm_length * math.cos(angle)
                 end_y = start_y + arm_length * math.sin(angle)
-                pygame.draw.line(self.screen, WHITE, (start_x, start_y), (end_x, end_y), arm_width)
+                pygame.draw.line(surface, WHITE, (start_x, start_y), (end_x, end_y), arm_width)
         
         # Draw cost and level text
-        cost_text = self.small_font.render(f"{cost}", True, WHITE)
-        level_text = self.small_font.render(f"Lv{next_level}", True, WHITE)
+        cost_text = text_cache.render(f"{cost}", SMALL_FONT_SIZE, WHITE)
+        level_text = text_cache.render(f"Lv{next_level}", SMALL_FONT_SIZE, WHITE)
         
         cost_x = icon_x - cost_text.get_width() - 10
         cost_y = icon_y - cost_text.get_height() // 2
         level_x = icon_x + radius + 10
         level_y = icon_y - level_text.get_height() // 2
         
-        self.screen.blit(cost_text, (cost_x, cost_y))
-        self.screen.blit(level_text, (level_x, level_y))
-        
-        # Draw hover text
-        if self.hovering_station_icon:
+        surface.blit(cost_text, (cost_x, cost_y))
+        surface.blit(level_text, (level_x, level_y))
+        return surface, origin
+
+    def tooltip_text(self, planet) -> Optional[str]:
+        """Hover text for the command bar icon under the mouse, if any"""
+        if self.hovering_station_icon and self.shows_station_icon(planet) and not planet.building_station:
+            next_level = planet.station_level + 1
+            cost = self.world.rules.station_cost(next_level)
             if planet.has_space_station:
-                hover_text = f"Upgrade to Level {next_level} Space Station ({cost})"
-            else:
-                hover_text = f"Build Level 1 Space Station ({cost})"
-            text_surface = self.small_font.render(hover_text, True, WHITE)
-            text_x = self.mouse_pos[0] + 10
-            text_y = self.mouse_pos[1] - 20
-            self.screen.blit(text_surface, (text_x, text_y))
-
-    def draw_status_bar(self):
-        """Draw the status bar at the top of the screen"""
+                return f"Upgrade to Level {next_level} Space Station ({cost})"
+            return f"Build Level 1 Space Station ({cost})"
+        if self.hovering_fighter_icon and self.shows_fighter_icon(planet) and not planet.building_fighter:
+            return f"Build Fighter ({self.world.rules.fighter_cost})"
+        return None
+
+    def tooltip_key(self, planet):
+        text = self.tooltip_text(planet)
+        return (text, self.mouse_pos) if text else None
+
+    def render_tooltip(self):
+        """Render the hover text next to the mouse"""
+        planet = self.planets[self.selected_planet] if self.selected_planet else None
+        text = self.tooltip_text(planet)
+        if not text:
+            return None
+        text_surface = text_cache.render(text, SMALL_FONT_SIZE, WHITE)
+        return text_surface, (self.mouse_pos[0] + 10, self.mouse_pos[1] - 20)
+
+    def status_bar_key(self):
+        seconds_left = max(0, self.seconds_per_day - self.day_timer)
+        return (self.current_day, int(seconds_left), self.game_speed,
+                int(self.player_resources), self.calculate_daily_resource_income(),
+                self.world.ledger.planet_count(self.faction),
+                int(self.ai_resources), self.calculate_ai_daily_income(),
+                self.world.ledger.planet_count(self.opponent))
+
+    @profiler.timed()
+    def render_status_bar(self):
+        """Render the status bar at the top of the screen"""
         # Draw day counter and countdown
-        day_text = self.large_font.render(f"Day {self.current_day}", True, LIGHT_BLUE)
+        day_text = text_cache.render(f"Day {self.current_day}", LARGE_FONT_SIZE, LIGHT_BLUE)
         seconds_left = max(0, self.seconds_per_day - self.day_timer)  # Use day_timer instead of get_ticks
-        countdown_text = self.font.render(f"Next Day: {int(seconds_left)}s", True, YELLOW)
-        
-        self.screen.blit(day_text, (20, 20))
-        self.screen.blit(countdown_text, 
-                        (day_text.get_width() + 20, 
-                         20 + 8))  # Align with day text
+        countdown = f"Next Day: {int(seconds_left)}s"
+        if self.game_speed != 1:
+            countdown += f"  ({self.game_speed}x)"
+        countdown_text = text_cache.render(countdown, FONT_SIZE, YELLOW)
         
         # Draw player resources and income
-        resources_text = self.font.render(f"Player Resources: {int(self.player_resources)}", True, BLUE)
+        resources_text = text_cache.render(f"Player Resources: {int(self.player_resources)}", FONT_SIZE, BLUE)
         daily_income = self.calculate_daily_resource_income()
-        income_text = self.font.render(f"Daily Income: +{daily_income}", True, YELLOW)
+        planet_count = self.world.ledger.planet_count(self.faction)
+        income_text = text_cache.render(f"Daily Income: +{daily_income}  Planets: {planet_count}", FONT_SIZE, YELLOW)
         
-        self.screen.blit(resources_text, (20, 65))
-        self.screen.blit(income_text, (20, 95))
-
         # Draw AI resources and income (temporarily)
-        ai_resources_text = self.font.render(f"AI Resources: {int(self.ai_resources)}", True, RED)
+        ai_resources_text = text_cache.render(f"AI Resources: {int(self.ai_resources)}", FONT_SIZE, RED)
         ai_income = self.calculate_ai_daily_income()
-        ai_income_text = self.font.render(f"Daily Income: +{ai_income}", True, YELLOW)
-        
-        self.screen.blit(ai_resources_text, (20, 125))
-        self.screen.blit(ai_income_text, (20, 155))
-
-    def draw_minimap(self):
-        """Draw a small minimap in the top-right corner"""
-        minimap_rect = pygame.Rect(SCREEN_WIDTH - 200 - 20, 
-                                 20,  
-                                 200, 200)
+        ai_planet_count = self.world.ledger.planet_count(self.opponent)
+        ai_income_text = text_cache.render(f"Daily Income: +{ai_income}  Planets: {ai_planet_count}", FONT_SIZE, YELLOW)
         
-        # Draw minimap background with slight transparency
-        minimap_surface = pygame.Surface((200, 200), pygame.SRCALPHA)
-        minimap_surface.fill((30, 30, 30, 180))  # DARK_GRAY with alpha
-        self.screen.blit(minimap_surface, minimap_rect)
+        placed = [
+            (day_text, (20, 20)),
+            (countdown_text, (day_text.get_width() + 20, 20 + 8)),  # Align with day text
+            (resources_text, (20, 65)),
+            (income_text, (20, 95)),
+            (ai_resources_text, (20, 125)),
+            (ai_income_text, (20, 155)),
+        ]
+        width = max(pos[0] + text.get_width() for text, pos in placed)
+        height = max(pos[1] + text.get_height() for text, pos in placed)
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        for text, pos in placed:
+            surface.blit(text, pos)
+        return surface, (0, 0)
+
+    def minimap_key(self):
+        return (self.camera.x, self.camera.y, len(self.world.ownership_changes))
+
+    @profiler.timed()
+    def render_minimap(self):
+        """Render the minimap for the top-right corner"""
+        self.minimap.sync(self.planets, self.world.ownership_changes)
+        return self.minimap.render(self.camera), self.minimap.rect.topleft
+
+    def profiler_overlay_key(self):
+        if not self.profiler_overlay:
+            return None
+        return profiler.frame_index // PROFILE_OVERLAY_INTERVAL
+
+    def render_profiler_overlay(self):
+        """Render the frame time graph and per-phase percentiles"""
+        if not self.profiler_overlay:
+            return None
+        summary = profiler.summary()
+        line_height = BADGE_FONT_SIZE
+        height = PROFILE_GRAPH_HEIGHT + 10 + line_height * (len(summary) + 1) + 10
+        surface = pygame.Surface((PROFILE_OVERLAY_WIDTH, height), pygame.SRCALPHA)
+        surface.fill((30, 30, 30, 200))
         
-        # Draw planets on minimap
-        for planet in self.planets.values():
-            mini_x = minimap_rect.x + (planet.position[0] * 200 // WORLD_WIDTH)
-            mini_y = minimap_rect.y + (planet.position[1] * 200 // WORLD_HEIGHT)
-            color = BLUE if planet.owner == "player" else RED if planet.owner == "ai" else WHITE
-            pygame.draw.circle(self.screen, color, (mini_x, mini_y), 2)
+        # Draw the frame time graph, newest frame on the right
+        graph_top = 5
+        scale = PROFILE_GRAPH_HEIGHT / PROFILE_GRAPH_MS
+        times = profiler.frame_times()[-(PROFILE_OVERLAY_WIDTH - 10):]
+        left = PROFILE_OVERLAY_WIDTH - 5 - len(times)
+        budget = 1000 / FPS
+        for x, ms in enumerate(times, left):
+            bar = min(PROFILE_GRAPH_HEIGHT, int(ms * scale))
+            color = PLAYER_GREEN if ms <= budget else YELLOW if ms <= budget * 2 else RED
+            pygame.draw.line(surface, color, (x, graph_top + PROFILE_GRAPH_HEIGHT),
+                             (x, graph_top + PROFILE_GRAPH_HEIGHT - bar))
+        budget_y = graph_top + PROFILE_GRAPH_HEIGHT - int(budget * scale)
+        pygame.draw.line(surface, GRAY, (5, budget_y), (PROFILE_OVERLAY_WIDTH - 5, budget_y))
         
-        # Draw current view rectangle on minimap
-        viewport_x = minimap_rect.x + (self.camera.x * 200 // WORLD_WIDTH)
-        viewport_y = minimap_rect.y + (self.camera.y * 200 // WORLD_HEIGHT)
-        viewport_w = SCREEN_WIDTH * 200 // WORLD_WIDTH
-        viewport_h = (SCREEN_HEIGHT - COMMAND_BAR_HEIGHT) * 200 // WORLD_HEIGHT
-        pygame.draw.rect(self.screen, WHITE, (viewport_x, viewport_y, viewport_w, viewport_h), 1)
+        # Draw a row of percentiles per phase, indented by nesting depth
+        y = graph_top + PROFILE_GRAPH_HEIGHT + 10
+        header = text_cache.render("phase (ms)", BADGE_FONT_SIZE, LIGHT_BLUE)
+        surface.blit(header, (5, y))
+        columns = text_cache.render("  p50     p95     p99", BADGE_FONT_SIZE, LIGHT_BLUE)
+        surface.blit(columns, (PROFILE_OVERLAY_WIDTH - 5 - columns.get_width(), y))
+        for path, stats in summary.items():
+            y += line_height
+            depth = path.count("/")
+            name = text_cache.render(path.rsplit("/", 1)[-1], BADGE_FONT_SIZE, WHITE)
+            surface.blit(name, (5 + depth * 10, y))
+            values = f"{stats['p50']:7.2f} {stats['p95']:7.2f} {stats['p99']:7.2f}"
+            values_text = text_cache.render(values, BADGE_FONT_SIZE, WHITE)
+            surface.blit(values_text, (PROFILE_OVERLAY_WIDTH - 5 - values_text.get_width(), y))
+        return surface, (SCREEN_WIDTH - PROFILE_OVERLAY_WIDTH - 20, 240)
 
+    @profiler.timed()
     def draw_battle(self):
-        # TODO: Implement battle view
-        pass
+        """Draw the battles being played back in galaxy view"""
+        self.battle_view.draw(self.screen, self.camera, self.planets, self.world.current_time)
 
     def draw_text(self, surface, text, pos, color):
-        text_surface = self.font.render(text, True, color)
+        text_surface = text_cache.render(text, FONT_SIZE, color)
         surface.blit(text_surface, pos)
 
+    def advance(self, frame_time):
+        """Run as many fixed simulation steps as frame_time of real time requires.
+
+        The leftover fraction of a step carries over to the next frame and is
+        exposed as self.interpolation for smooth rendering.
+        """
+        self.accumulator += min(frame_time, MAX_FRAME_TIME) * self.game_speed
+        steps = 0
+        while self.accumulator >= SIM_DT:
+            if steps == MAX_SIM_STEPS_PER_FRAME:
+                # Too slow to keep up, drop the backlog rather than stall
+                self.accumulator = 0.0
+                break
+            self.sim.step(SIM_DT)
+            self.accumulator -= SIM_DT
+            steps += 1
+        self.interpolation = self.accumulator / SIM_DT
+        return steps
+
+    def take_snapshot(self):
+        """Draw from the simulation thread's newest snapshot, interpolated to the present"""
+        world = self.world = self.sim_thread.latest()
+        owed = world.interpolation + (time.perf_counter() - world.captured_at) * world.game_speed / SIM_DT
+        self.interpolation = min(1.0, owed)
+
+    def frame(self, frame_time):
+        """Handle input, advance the game by frame_time of real time and draw"""
+        profiler.begin_frame()
+        with profiler.section("handle_events"):
+            running = self.handle_events()
+        with profiler.section("update"):
+            if self.sim_thread:
+                self.take_snapshot()
+            else:
+                self.advance(frame_time)
+            self.update_view()
+        # With a simulation thread, the AI and autosaves run there instead
+        if self.ai and not self.sim_thread:
+            with profiler.section("ai"):
+                self.ai.update(self.sim)
+        if self.autosaver and not self.sim_thread:
+            with profiler.section("autosave"):
+                self.autosaver.update(self.sim)
+        with profiler.section("draw"):
+            self.draw()
+        profiler.end_frame()
+        return running
+
     def run(self):
         running = True
+        previous = time.perf_counter()
         while running:
-            running = self.handle_events()
-            self.update(1 / FPS)
-            self.draw()
+            now = time.perf_counter()
+            running = self.frame(now - previous)
+            previous = now
             self.clock.tick(FPS)
+        self.stop_sim_thread()
+        if self.autosaver:
+            self.autosaver.close()
+        if self.ai:
+            self.ai.close()
+        self.stop_recording()
+        if self.profile_session:
+            self.export_profile()
 
-if __name__ == "__main__":
-    game = GalaxyConquest()
+def join_address(text: str) -> tuple:
+    """(host, port) of a HOST:PORT command line argument"""
+    host, _, port = text.rpartition(":")
+    if not host or not port.isdigit():
+        raise argparse.ArgumentTypeError(f"expected HOST:PORT, got {text!r}")
+    return host, int(port)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Galaxy Conquest")
+    parser.add_argument("--galaxy", type=int, metavar="N",
+                        help="play a procedural galaxy of N x N chunks instead of the fixed map")
+    parser.add_argument("--threaded", action="store_true",
+                        help="step the simulation on its own thread and render from snapshots of it")
+    parser.add_argument("--load", metavar="SAVE",
+                        help="continue from a save, such as one written by replay.py")
+    parser.add_argument("--join", type=join_address, metavar="HOST:PORT",
+                        help="play a network match relayed by netplay.py serve")
+    parser.add_argument("--profile", action="store_true",
+                        help="record every frame and export the samples on exit")
+    args = parser.parse_args(argv)
+    if args.galaxy is not None and args.galaxy < 1:
+        parser.error("--galaxy needs at least 1 chunk per side")
+    if args.join and (args.galaxy is not None or args.load):
+        parser.error("a network match is played on the server's map; drop --galaxy and --load")
+    if args.galaxy is not None and args.load:
+        parser.error("a save brings its own map; drop --galaxy or --load")
+
+    if args.join:
+        host, port = args.join
+        loop = asyncio.new_event_loop()
+        client = LockstepClient()
+        print(f"Joining {host}:{port}, waiting for the other players")
+        try:
+            loop.run_until_complete(client.connect(host, port))
+        except (OSError, NetplayError) as error:
+            print(f"Could not join the match: {error}")
+            return 1
+        game = GalaxyConquest(client.sim, autosave_path=None, record_dir=None, ai_faction=None,
+                              faction=client.faction)
+        game.start_sim_thread(LockstepThread(client, loop))
+    else:
+        sim = None
+        if args.load:
+            try:
+                sim = savegame.load(args.load)
+            except (OSError, savegame.SaveError) as error:
+                print(f"Could not load {args.load}: {error}")
+                return 2
+        elif args.galaxy is not None:
+            seed = random.randrange(2 ** 32)
+            sim = Simulation((), seed=seed, galaxy=ChunkedGalaxy(seed, args.galaxy, args.galaxy))
+        game = GalaxyConquest(sim, threaded=args.threaded)
+        if game.autosaver:
+            game.autosaver.last_save_time = game.sim.current_time
+    if args.profile:
+        game.profile_session = True
+        profiler.enable()
     game.run()
     pygame.quit()
-    sys.exit()
\ No newline at end of file
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+"""Hyperlane network between planets, with cached shortest routes.
+
+Each planet is joined to its LANES_PER_PLANET nearest neighbours, plus
+whatever extra lanes it takes to link separate clusters into one network.
+Lanes are weighted by their length, so route lengths are travel distances.
+A graph can also be given its lanes explicitly, as procedural galaxies do.
+
+Routes are answered from shortest-path trees: the first query from a planet
+runs one Dijkstra search for every destination at once and later queries
+from the same planet only walk the stored predecessors.  Trees are kept in
+an LRU cache, or all computed up front on small maps.  Procedural galaxies
+add and remove planets and their lanes a chunk at a time, and the cached
+trees are kept up to date rather than thrown away: a new lane lowers the
+distances it shortens in place, carrying the improvement on only to the
+planets beyond it, and removing planets clears them from the trees, dropping
+only the trees that route through them to planets that remain.  Rows of
+removed planets are reused by the next planets added.
+Pure Python and NumPy, no pygame.
+"""
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+import heapq
+import math
+import numpy as np
+
+LANES_PER_PLANET = 3
+NEIGHBOUR_CELL_PLANETS = 4  # Average planets per grid cell when looking for neighbours
+ROUTE_CACHE_SIZE = 64  # Shortest-path trees kept
+PRECOMPUTE_LIMIT = 200  # Maps up to this many planets compute every tree up front
+
+def candidate_pairs(positions: np.ndarray) -> tuple:
+    """(point, candidate, squared distance) for every pair of points in adjacent cells.
+
+    The grid cells are sized to hold a few points each, so the number of
+    pairs grows linearly with the number of points.  Pairs are grouped by
+    point.
+    """
+    n = len(positions)
+    if n < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float64)
+    low = positions.min(axis=0)
+    extent = np.maximum(positions.max(axis=0) - low, 1.0)
+    size = math.sqrt(extent[0] * extent[1] * NEIGHBOUR_CELL_PLANETS / n)
+    cells = ((positions - low) // size).astype(np.int64)
+    columns = int(cells[:, 0].max()) + 3
+    key = (cells[:, 1] + 1) * columns + cells[:, 0] + 1  # Padded so neighbour keys stay in range
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+
+    points, candidates = [], []
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            neighbour = key + dy * columns + dx
+            start = np.searchsorted(sorted_key, neighbour, "left")
+            count = np.searchsorted(sorted_key, neighbour, "right") - start
+            # Expand every point into one entry per point of the neighbouring cell
+            point = np.repeat(np.arange(n), count)
+            first = np.repeat(start - np.cumsum(count) + count, count)
+            candidates.append(order[first + np.arange(len(point))])
+            points.append(point)
+    point = np.concatenate(points)
+    candidate = np.concatenate(candidates)
+    grouped = np.argsort(point, kind="stable")
+    point, candidate = point[grouped], candidate[grouped]
+    keep = point != candidate
+    point, candidate = point[keep], candidate[keep]
+    offset = positions[candidate] - positions[point]
+    return point, candidate, np.einsum("ij,ij->i", offset, offset)
+
+def nearest_neighbours(n: int, pairs: tuple, k: int) -> np.ndarray:
+    """(n, k) rows of each point's k nearest candidates, -1 where there are fewer.
+
+    Neighbours outside the adjacent cells are missed, which only matters for
+    sparse outliers and is made up for by the connecting lanes.
+    """
+    result = np.full((n, k), -1, dtype=np.int64)
+    point, candidate, distance = pairs
+    if not len(point):
+        return result
+    distance = distance.copy()
+    starts = np.flatnonzero(np.r_[True, point[1:] != point[:-1]])
+    sizes = np.diff(np.r_[starts, len(point)])
+    index = np.arange(len(point))
+    for rank in range(k):
+        # Take the closest remaining candidate of every point, lowest index on ties
+        best = np.minimum.reduceat(distance, starts)
+        at_best = distance == np.repeat(best, sizes)
+        first = np.minimum.reduceat(np.where(at_best, index, len(point)), starts)
+        found = np.isfinite(best)
+        result[point[starts[found]], rank] = candidate[first[found]]
+        distance[first[found]] = np.inf
+    return result
+
+class HyperlaneGraph:
+    """Undirected lanes between planets, identified by name"""
+
+    def __init__(self, names: List[str], positions, lanes_per_planet: int = LANES_PER_PLANET,
+                 cache_size: int = ROUTE_CACHE_SIZE, lanes: Optional[List[tuple]] = None):
+        """Join planets to their nearest neighbours, or by the (name, name) lanes given"""
+        self.names: List[Optional[str]] = list(names)  # None in the rows of removed planets
+        self.rows: Dict[str, int] = {name: row for row, name in enumerate(self.names)}
+        self.positions: List[tuple] = [tuple(position) for position in positions]
+        self.neighbours: List[Dict[int, float]] = [{} for _ in self.names]  # Row -> {row: length}
+        self.free: List[int] = []  # Rows of removed planets, reused by add_planet
+        self.cache_size = cache_size
+        self.trees: OrderedDict = OrderedDict()  # Source row -> (distances, predecessors)
+        self.version = 0  # Bumped whenever the lanes change
+        self.searches = 0  # Dijkstra searches run, for profiling the cache
+        self._segments = None  # (version, lane end points) for drawing
+
+        points = np.array(self.positions, dtype=np.float64).reshape(-1, 2)
+        if lanes is not None:
+            a = np.array([self.rows[name] for name, _ in lanes], dtype=np.int64)
+            b = np.array([self.rows[name] for _, name in lanes], dtype=np.int64)
+            self.link_many(points, a, b)
+        else:
+            pairs = candidate_pairs(points)
+            neighbours = nearest_neighbours(len(points), pairs, lanes_per_planet)
+            rows = np.repeat(np.arange(len(points)), lanes_per_planet)
+            others = neighbours.ravel()
+            self.link_many(points, rows[others >= 0], others[others >= 0])
+            self.connect(points, pairs)
+        if len(self.names) <= PRECOMPUTE_LIMIT:
+            self.cache_size = max(cache_size, len(self.names))
+            for row in range(len(self.names)):
+                self.tree(row)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def copy(self) -> "HyperlaneGraph":
+        """The same planets and lanes without the cached trees"""
+        graph = HyperlaneGraph([], [], cache_size=self.cache_size, lanes=[])
+        graph.names = list(self.names)
+        graph.rows = dict(self.rows)
+        graph.positions = list(self.positions)
+        graph.neighbours = [dict(neighbours) for neighbours in self.neighbours]
+        graph.free = list(self.free)
+        graph.version = self.version
+        return graph
+
+    def link_many(self, points: np.ndarray, a: np.ndarray, b: np.ndarray):
+        lengths = np.hypot(*(points[b] - points[a]).T)
+        neighbours = self.neighbours
+        for ra, rb, length in zip(a.tolist(), b.tolist(), lengths.tolist()):
+            neighbours[ra][rb] = length
+            neighbours[rb][ra] = length
+
+    def link(self, a: int, b: int) -> float:
+        pa, pb = self.positions[a], self.positions[b]
+        length = math.hypot(pb[0] - pa[0], pb[1] - pa[1])
+        self.neighbours[a][b] = length
+        self.neighbours[b][a] = length
+        return length
+
+    def components(self) -> List[int]:
+        """Component label of every row"""
+        label = [-1] * len(self.names)
+        for root in range(len(self.names)):
+            if label[root] >= 0:
+                continue
+            label[root] = root
+            stack = [root]
+            while stack:
+                row = stack.pop()
+                for other in self.neighbours[row]:
+                    if label[other] < 0:
+                        label[other] = root
+                        stack.append(other)
+        return label
+
+    def connect(self, points: np.ndarray, pairs: tuple):
+        """Join separate clusters into one network with the shortest extra lanes.
+
+        Candidate pairs between clusters are added shortest first whenever
+        they join two clusters that are still apart; clusters with no
+        candidates nearby are then linked to their nearest planet in the
+        main network.
+        """
+        label = np.array(self.components())
+        point, candidate, distance = pairs
+        between = np.flatnonzero((label[point] != label[candidate]) & (point < candidate))
+        if len(between):
+            parent = {}
+            def find(x):
+                root = x
+                while root in parent:
+                    root = parent[root]
+                while x != root:
+                    parent[x], x = root, parent[x]
+                return root
+            joins = []
+            for index in between[np.argsort(distance[between], kind="stable")].tolist():
+                a, b = int(point[index]), int(candidate[index])
+                ca, cb = find(int(label[a])), find(int(label[b]))
+                if ca != cb:
+                    parent[ca] = cb
+                    joins.append((a, b))
+            if joins:
+                a, b = np.array(joins).T
+                self.link_many(points, a, b)
+                label = np.array(self.components())
+
+        while len(label) and (label != label[0]).any():
+            main = np.flatnonzero(label == label[0])
+            other = np.flatnonzero(label != label[0])
+            # Shortest lane from the first detached cluster into the main network
+            cluster = other[label[other] == label[other[0]]]
+            offset = points[cluster][:, None, :] - points[main][None, :, :]
+            distance = np.einsum("ijk,ijk->ij", offset, offset)
+            i, j = np.unravel_index(np.argmin(distance), distance.shape)
+            self.link(int(cluster[i]), int(main[j]))
+            label[label == label[cluster[0]]] = label[0]
+
+    def lanes(self, name: Optional[str] = None) -> Iterator[tuple]:
+        """(name, name) pairs of every lane, or of the lanes at one planet"""
+        rows = [self.rows[name]] if name is not None else range(len(self.names))
+        for row in rows:
+            for other in self.neighbours[row]:
+                if name is not None or row < other:
+                    yield self.names[row], self.names[other]
+
+    def segments(self) -> np.ndarray:
+        """(lanes, 4) float array of x1, y1, x2, y2 for every lane, cached until lanes change"""
+        if self._segments is None or self._segments[0] != self.version:
+            ends = [self.positions[row] + self.positions[other]
+                    for row in range(len(self.names)) for other in self.neighbours[row] if row < other]
+            self._segments = (self.version, np.array(ends, dtype=np.float64).reshape(-1, 4))
+        return self._segments[1]
+
+    def add_planet(self, name: str, position) -> int:
+        """Add a planet with no lanes yet, in the row of a removed one if there is any"""
+        position = tuple(position)
+        if self.free:
+            row = self.free.pop()
+            self.names[row] = name
+            self.positions[row] = position
+        else:
+            row = len(self.names)
+            self.names.append(name)
+            self.positions.append(position)
+            self.neighbours.append({})
+        self.rows[name] = row
+        return row
+
+    def add_lanes(self, lanes: List[tuple]):
+        """Add (name, name) lanes, lowering the distances they shorten in the cached trees"""
+        added = []
+        for a, b in lanes:
+            ra, rb = self.rows[a], self.rows[b]
+            if rb in self.neighbours[ra] or ra == rb:
+                continue
+            pa, pb = self.positions[ra], self.positions[rb]
+            # Measured as in link_many, so a graph built from the same lanes agrees to the bit
+            length = float(np.hypot(float(pb[0]) - float(pa[0]), float(pb[1]) - float(pa[1])))
+            self.neighbours[ra][rb] = length
+            self.neighbours[rb][ra] = length
+            added.append((ra, rb, length))
+        if not added:
+            return
+        self.version += 1
+        for source in self.trees:
+            distances, predecessors = self.padded(source)
+            heap = []
+            for ra, rb, length in added:
+                for near, far in ((ra, rb), (rb, ra)):
+                    if distances[near] + length < distances[far]:
+                        distances[far] = distances[near] + length
+                        predecessors[far] = near
+                        heap.append((distances[far], far))
+            if heap:
+                heapq.heapify(heap)
+                self.settle(distances, predecessors, heap)
+
+    def remove_planets(self, names: List[str]):
+        """Remove planets with all their lanes.
+
+        A cached tree survives unless it routes through the removed planets
+        to one that remains, which can only happen over a lane between them.
+        """
+        removed = {self.rows.pop(name) for name in names}
+        crossing = [(row, other) for row in removed for other in self.neighbours[row] if other not in removed]
+        for row in removed:
+            for other in self.neighbours[row]:
+                self.neighbours[other].pop(row, None)
+            self.neighbours[row] = {}
+            self.names[row] = None
+        self.free.extend(sorted(removed, reverse=True))
+        self.version += 1
+        for source in list(self.trees):
+            distances, predecessors = self.padded(source)
+            if source in removed or any(predecessors[other] == row for row, other in crossing):
+                del self.trees[source]
+                continue
+            for row in removed:
+                distances[row] = math.inf
+                predecessors[row] = -1
+
+    def tree(self, source: int) -> tuple:
+        """Distances and predecessors of every row from source, from the cache if possible"""
+        if source in self.trees:
+            self.trees.move_to_end(source)
+            return self.padded(source)
+        tree = self.search(source)
+        self.trees[source] = tree
+        if len(self.trees) > self.cache_size:
+            self.trees.popitem(last=False)
+        return tree
+
+    def padded(self, source: int) -> tuple:
+        """A cached tree, extended to rows added since as unreachable"""
+        distances, predecessors = self.trees[source]
+        missing = len(self.names) - len(distances)
+        if missing:
+            distances.extend([math.inf] * missing)
+            predecessors.extend([-1] * missing)
+        return distances, predecessors
+
+    def search(self, source: int) -> tuple:
+        """Dijkstra's shortest-path tree from source over the whole network"""
+        self.searches += 1
+        n = len(self.names)
+        distances = [math.inf] * n
+        predecessors = [-1] * n
+        distances[source] = 0.0
+        self.settle(distances, predecessors, [(0.0, source)])
+        return distances, predecessors
+
+    def settle(self, distances: List[float], predecessors: List[int], heap: List[tuple]):
+        """Run Dijkstra's search on from the (distance, row) entries of heap, improving the tree in place"""
+        neighbours = self.neighbours
+        while heap:
+            distance, row = heapq.heappop(heap)
+            if distance > distances[row]:
+                continue
+            for other, length in neighbours[row].items():
+                candidate = distance + length
+                if candidate < distances[other]:
+                    distances[other] = candidate
+                    predecessors[other] = row
+                    heapq.heappush(heap, (candidate, other))
+
+    def distance(self, source: str, target: str) -> float:
+        """Length of the shortest route, infinite if there is none"""
+        distances, _ = self.tree(self.rows[source])
+        return distances[self.rows[target]]
+
+    def route(self, source: str, target: str) -> Optional[List[str]]:
+        """Planet names along the shortest route, both ends included, or None"""
+        ra, rb = self.rows[source], self.rows[target]
+        distances, predecessors = self.tree(ra)
+        if distances[rb] == math.inf:
+            return None
+        rows = [rb]
+        while rows[-1] != ra:
+            rows.append(predecessors[rows[-1]])
+        return [self.names[row] for row in reversed(rows)]
@@ -0,0 +1,651 @@
+"""Lockstep network multiplayer over asyncio streams.
+
+Two or more players share one deterministic simulation.  A LockstepServer
+relays their input: every client sends one turn per tick holding the
+commands its player issued, INPUT_DELAY ticks ahead of the tick they are
+for, and once every player's turn for a tick is in, the server sends them
+all back in player order as that tick's step.  Clients only run ticks whose
+step has arrived, so every client applies the same commands at the same
+ticks and stays in the same state, while the traffic is a few bytes per
+tick however large the galaxy is.  Players are given the factions in turn,
+so with more than two players some share a faction.
+
+Every CHECKSUM_TICKS ticks each client captures its state as save columns
+(see savegame.py) and reports the CRC-32 of the rows that changed since its
+previous checkpoint, chained onto that checkpoint's CRC, so a divergence
+stays visible until it is repaired.  When the clients disagree, the server
+asks one client of the majority for a resync: the rows of each column that
+changed since the last checkpoint everyone agreed on, which the others apply
+to their own copy of that checkpoint before running the ticks since again.
+
+Every message is a kind byte and payload length followed by the payload:
+
+    HELLO           protocol version, player name
+    WELCOME         player, players, input delay, checksum interval, step, faction, save
+    TURN, STEP      tick, command count, encoded commands
+    CHECKSUM        tick, CRC-32
+    AGREED          tick
+    RESYNC_REQUEST  tick
+    RESYNC          tick, base tick, CRC-32, save of the changed rows
+
+Play bots against each other on localhost, desynchronizing one of them on
+purpose, and compare the traffic per client across galaxy sizes with:
+
+    python netplay.py local --players 3 --galaxy 0 16 256 1024 --desync 600
+
+or relay a match for the pygame front end with ``python netplay.py serve``
+and ``python galaxy_conquest.py --join localhost:7777`` once per player.
+Pure Python and NumPy, no pygame.
+"""
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+import argparse
+import asyncio
+import random
+import struct
+import sys
+import time
+import zlib
+import numpy as np
+import savegame
+from commands import BuildFighter, BuildStation, TransferFleet, decode_command, encode_command
+from galaxy import CHUNK_SIZE, ChunkedGalaxy, ChunkStreamer
+from sim_thread import SimThread
+from simulation import Simulation
+
+PROTOCOL_VERSION = 1
+DEFAULT_PORT = 7777
+NET_DT = 1 / 60  # Game seconds per tick, the front end's fixed step
+INPUT_DELAY = 6  # Ticks between issuing a command and applying it, covers the round trip
+CHECKSUM_TICKS = 60  # Ticks between state checkpoints
+FACTIONS = ("player", "ai")
+LOCAL_TICKS = 3600  # Ticks a local bot match lasts
+BOT_ORDER_TICKS = 30  # Ticks between a bot's orders
+BOT_CAMERA_SPEED = (5, 2)  # World units per tick a bot's view drifts across a galaxy
+SETTLE_SECONDS = 0.5  # Time left for the last checksums and resyncs after a local match
+
+MESSAGE = struct.Struct("<BI")  # Kind, payload length
+HELLO_HEADER = struct.Struct("<H")  # Protocol version
+WELCOME_HEADER = struct.Struct("<BBHHdB")  # Player, players, input delay, checksum ticks, step, faction length
+BATCH_HEADER = struct.Struct("<IH")  # Tick, command count
+CHECKSUM = struct.Struct("<II")  # Tick, CRC-32
+TICK = struct.Struct("<I")
+RESYNC_HEADER = struct.Struct("<III")  # Tick, base tick, CRC-32
+
+# Message kinds
+HELLO = 1
+WELCOME = 2
+TURN = 3
+STEP = 4
+CHECKSUM_MESSAGE = 5
+AGREED = 6
+RESYNC_REQUEST = 7
+RESYNC = 8
+
+# Suffixes of the save columns holding the changed rows of a column
+ROWS = "#rows"
+VALUES = "#values"
+
+class NetplayError(Exception):
+    """A peer broke the protocol or speaks a different version of it"""
+
+def message(kind: int, payload: bytes = b"") -> bytes:
+    return MESSAGE.pack(kind, len(payload)) + payload
+
+async def read_message(reader: asyncio.StreamReader) -> tuple:
+    """(kind, payload) of the next message; raises IncompleteReadError when the peer is gone"""
+    kind, length = MESSAGE.unpack(await reader.readexactly(MESSAGE.size))
+    return kind, await reader.readexactly(length)
+
+def encode_batch(tick: int, commands: list) -> bytes:
+    return BATCH_HEADER.pack(tick, len(commands)) + b"".join(encode_command(cmd) for cmd in commands)
+
+def decode_batch(payload: bytes) -> tuple:
+    """The tick and commands of a turn or step"""
+    try:
+        tick, count = BATCH_HEADER.unpack_from(payload)
+        offset = BATCH_HEADER.size
+        commands = []
+        for _ in range(count):
+            cmd, offset = decode_command(payload, offset)
+            commands.append(cmd)
+    except (IndexError, ValueError, struct.error) as error:
+        raise NetplayError(f"damaged command batch: {error}") from None
+    return tick, commands
+
+def state_delta(old: Dict[str, np.ndarray], new: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Save columns holding what changed from old to new.
+
+    A column that kept its shape is reduced to the rows that changed, as
+    name#rows and name#values; other changed columns are kept whole.
+    """
+    delta = {}
+    for name, column in new.items():
+        base = old.get(name)
+        if base is None or base.shape != column.shape or base.dtype != column.dtype:
+            delta[name] = column
+            continue
+        changed = base != column
+        if changed.ndim > 1:
+            changed = changed.any(axis=tuple(range(1, changed.ndim)))
+        rows = np.flatnonzero(changed)
+        if len(rows):
+            delta[name + ROWS] = rows
+            delta[name + VALUES] = column[rows]
+    return delta
+
+def apply_delta(base: Dict[str, np.ndarray], delta: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """The save columns base becomes with a state_delta applied"""
+    columns = dict(base)
+    for name, column in delta.items():
+        if name.endswith(ROWS):
+            name = name[:-len(ROWS)]
+            updated = columns[name].copy()
+            updated[column] = delta[name + VALUES]
+            columns[name] = updated
+        elif not name.endswith(VALUES):
+            columns[name] = column
+    return columns
+
+def delta_checksum(delta: Dict[str, np.ndarray], previous: int) -> int:
+    return zlib.crc32(savegame.encode(delta, compress=False), previous)
+
+class Connection:
+    """The server's end of one player's connection, with its traffic counted"""
+
+    def __init__(self, player: int, faction: str, name: str, writer: asyncio.StreamWriter):
+        self.player = player
+        self.faction = faction
+        self.name = name
+        self.writer = writer
+        self.sent = 0  # Bytes sent after the welcome
+        self.received = 0  # Bytes received after the hello
+        self.welcome_bytes = 0
+
+    def send(self, kind: int, payload: bytes = b""):
+        data = message(kind, payload)
+        self.sent += len(data)
+        self.writer.write(data)
+
+class LockstepServer:
+    """Relays turns between the players of one match and checks that they stay in sync.
+
+    The server never steps the simulation; it only hands out the starting
+    state and compares the clients' checksums.
+    """
+
+    def __init__(self, sim: Simulation, players: int = 2, dt: float = NET_DT,
+                 input_delay: int = INPUT_DELAY, checksum_ticks: int = CHECKSUM_TICKS):
+        with savegame.paused_gc():
+            self.state = savegame.encode(savegame.capture(sim))
+        self.players = players
+        self.dt = dt
+        self.input_delay = input_delay
+        self.checksum_ticks = checksum_ticks
+        self.connections: List[Connection] = []
+        self.turns: Dict[int, Dict[int, list]] = {}  # Tick -> player -> commands
+        self.checksums: Dict[int, Dict[int, int]] = {}  # Tick -> player -> CRC-32
+        self.resyncs: Dict[int, List[int]] = {}  # Tick -> players waiting for a resync to it
+        self.desyncs = 0  # Checkpoints where some client disagreed
+        self.resync_bytes = 0
+        self.started = asyncio.Event()
+        self.finished = asyncio.Event()
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.handlers: set = set()  # Tasks serving the connections
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        """Listen for players; port 0 picks a free port"""
+        self.server = await asyncio.start_server(self.handle, host, port)
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    def close(self):
+        """End the match and disconnect everyone"""
+        for connection in self.connections:
+            connection.writer.close()
+        if self.server is not None:
+            self.server.close()
+        self.finished.set()
+
+    async def wait_closed(self):
+        """Wait until every connection has been served to its end"""
+        await asyncio.gather(*self.handlers)
+        if self.server is not None:
+            await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.handlers.add(asyncio.current_task())
+        try:
+            kind, payload = await read_message(reader)
+            if kind != HELLO or HELLO_HEADER.unpack_from(payload)[0] != PROTOCOL_VERSION:
+                raise NetplayError("expected a hello of protocol version "
+                                   f"{PROTOCOL_VERSION}")
+            if self.started.is_set():
+                raise NetplayError("the match has already started")
+            player = len(self.connections)
+            connection = Connection(player, FACTIONS[player % len(FACTIONS)],
+                                    payload[HELLO_HEADER.size:].decode("utf-8", "replace"), writer)
+            self.connections.append(connection)
+            if len(self.connections) == self.players:
+                self.welcome()
+            await self.started.wait()
+            while True:
+                kind, payload = await read_message(reader)
+                connection.received += MESSAGE.size + len(payload)
+                self.dispatch(connection, kind, payload)
+        except (asyncio.IncompleteReadError, ConnectionError, NetplayError, struct.error) as error:
+            if not self.finished.is_set() and not isinstance(error, asyncio.IncompleteReadError):
+                print(f"Ending the match: {error}")
+        finally:
+            # Lockstep cannot go on without every player
+            writer.close()
+            self.close()
+
+    def welcome(self):
+        """Start the match, sending every player its place in it and the starting state"""
+        for connection in self.connections:
+            faction = connection.faction.encode("utf-8")
+            data = message(WELCOME, WELCOME_HEADER.pack(
+                connection.player, self.players, self.input_delay, self.checksum_ticks, self.dt,
+                len(faction)) + faction + self.state)
+            connection.welcome_bytes = len(data)
+            connection.writer.write(data)
+        self.started.set()
+
+    def dispatch(self, connection: Connection, kind: int, payload: bytes):
+        if kind == TURN:
+            tick, commands = decode_batch(payload)
+            # Players only command their own faction
+            turns = self.turns.setdefault(tick, {})
+            turns[connection.player] = [cmd for cmd in commands if cmd.faction == connection.faction]
+            if len(turns) == self.players:
+                del self.turns[tick]
+                step = encode_batch(tick, [cmd for player in range(self.players) for cmd in turns[player]])
+                for other in self.connections:
+                    other.send(STEP, step)
+        elif kind == CHECKSUM_MESSAGE:
+            tick, crc = CHECKSUM.unpack(payload)
+            checksums = self.checksums.setdefault(tick, {})
+            checksums[connection.player] = crc
+            if len(checksums) == self.players:
+                del self.checksums[tick]
+                self.compare(tick, checksums)
+        elif kind == RESYNC:
+            (tick,) = TICK.unpack_from(payload)
+            self.resync_bytes += len(payload) * len(self.resyncs.get(tick, ()))
+            for player in self.resyncs.pop(tick, ()):
+                self.connections[player].send(RESYNC, payload)
+        else:
+            raise NetplayError(f"unexpected message kind {kind}")
+
+    def compare(self, tick: int, checksums: Dict[int, int]):
+        """Confirm a checkpoint, or resync the players that disagree with the majority"""
+        counts = Counter(checksums.values())
+        # The majority is right; on a tie, the side of the lowest numbered player
+        truth = max(counts, key=lambda crc: (counts[crc], -min(player for player, other in checksums.items()
+                                                              if other == crc)))
+        agreeing = sorted(player for player, crc in checksums.items() if crc == truth)
+        behind = sorted(player for player, crc in checksums.items() if crc != truth)
+        if behind:
+            self.desyncs += 1
+            self.resyncs[tick] = behind
+            # Asked before the agreement, so the answer is based on the last agreed checkpoint
+            self.connections[agreeing[0]].send(RESYNC_REQUEST, TICK.pack(tick))
+        for player in agreeing:
+            self.connections[player].send(AGREED, TICK.pack(tick))
+
+class LockstepClient:
+    """One player's side of a lockstep match.
+
+    Commands submitted to the client's simulation by anything running
+    between its steps, such as a chunk streamer, are sent to the server
+    instead of being applied, and come back with everyone else's.
+    """
+
+    def __init__(self, name: str = "player"):
+        self.name = name
+        self.sim: Optional[Simulation] = None
+        self.player = 0
+        self.players = 0
+        self.faction = ""
+        self.dt = NET_DT
+        self.input_delay = INPUT_DELAY
+        self.checksum_ticks = CHECKSUM_TICKS
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.receiver: Optional[asyncio.Task] = None
+        self.outbox: list = []  # Commands for the next turn
+        self.steps: Dict[int, list] = {}  # Tick -> every player's commands, as sent by the server
+        self.history: Dict[int, list] = {}  # Tick -> commands applied, since the last agreed checkpoint
+        self.agreed = None  # (tick, save columns, CRC-32) of the last checkpoint everyone agreed on
+        self.checkpoints: Dict[int, tuple] = {}  # Tick -> (save columns, CRC-32) awaiting agreement
+        self.resyncs = 0
+        self.arrived = asyncio.Event()  # Set when a step arrives or the match ends
+        self.closed = False
+        self.on_resync: Optional[Callable] = None  # Called with the simulation that replaced the old one
+
+    async def connect(self, host: str, port: int = DEFAULT_PORT):
+        """Join a match and wait for it to start"""
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.send(HELLO, HELLO_HEADER.pack(PROTOCOL_VERSION) + self.name.encode("utf-8"))
+        try:
+            kind, payload = await read_message(self.reader)
+        except asyncio.IncompleteReadError:
+            raise NetplayError("the server turned the connection down") from None
+        if kind != WELCOME:
+            raise NetplayError(f"expected a welcome, got message kind {kind}")
+        (self.player, self.players, self.input_delay, self.checksum_ticks, self.dt,
+         length) = WELCOME_HEADER.unpack_from(payload)
+        start = WELCOME_HEADER.size + length
+        self.faction = payload[WELCOME_HEADER.size:start].decode("utf-8")
+        with savegame.paused_gc():
+            self.sim = savegame.restore(savegame.decode(payload[start:]))
+            columns = savegame.capture(self.sim)
+        self.agreed = (self.sim.tick, columns, zlib.crc32(savegame.encode(columns, compress=False)))
+        # Nobody can have issued commands for the first ticks
+        for tick in range(self.sim.tick, self.sim.tick + self.input_delay):
+            self.send(TURN, encode_batch(tick, []))
+        self.receiver = asyncio.ensure_future(self.receive())
+
+    def send(self, kind: int, payload: bytes = b""):
+        if not self.closed:
+            self.writer.write(message(kind, payload))
+
+    def submit(self, command):
+        """Send a command with the next turn"""
+        self.outbox.append(command)
+
+    def close(self):
+        self.closed = True
+        self.arrived.set()
+        if self.writer is not None:
+            self.writer.close()
+
+    async def play(self, ticks: Optional[int] = None, realtime: bool = True,
+                   between: Optional[Callable] = None) -> int:
+        """Step through the match for ticks ticks, or until it ends, and return the ticks stepped.
+
+        In real time each tick takes dt seconds at least.  between() is
+        called after every step and ends play by returning False.
+        """
+        loop = asyncio.get_running_loop()
+        start, first = loop.time(), self.sim.tick
+        while not self.closed and (ticks is None or self.sim.tick - first < ticks):
+            tick = self.sim.tick
+            self.outbox.extend(self.sim.pending_commands)
+            self.sim.pending_commands = []
+            self.send(TURN, encode_batch(tick + self.input_delay, self.outbox))
+            self.outbox = []
+            while tick not in self.steps:
+                if self.closed:
+                    return self.sim.tick - first
+                self.arrived.clear()
+                await self.arrived.wait()
+            self.advance(self.steps.pop(tick))
+            if between is not None and not between():
+                break
+            if realtime:
+                delay = start + (self.sim.tick - first) * self.dt - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        return self.sim.tick - first
+
+    def advance(self, commands: list, report: bool = True):
+        """Run one tick with every player's commands, checkpointing when it is due"""
+        self.history[self.sim.tick] = commands
+        for command in commands:
+            self.sim.submit(command)
+        self.sim.step(self.dt)
+        if self.sim.tick % self.checksum_ticks == 0:
+            self.checkpoint(report)
+
+    def checkpoint(self, report: bool = True):
+        """Record the state and report its checksum, chained onto the previous checkpoint's"""
+        with savegame.paused_gc():
+            columns = savegame.capture(self.sim)
+        previous = self.checkpoints[max(self.checkpoints)] if self.checkpoints else self.agreed[1:]
+        crc = delta_checksum(state_delta(previous[0], columns), previous[1])
+        self.checkpoints[self.sim.tick] = (columns, crc)
+        if report:
+            self.send(CHECKSUM_MESSAGE, CHECKSUM.pack(self.sim.tick, crc))
+
+    async def receive(self):
+        try:
+            while True:
+                kind, payload = await read_message(self.reader)
+                if kind == STEP:
+                    tick, commands = decode_batch(payload)
+                    self.steps[tick] = commands
+                    self.arrived.set()
+                elif kind == AGREED:
+                    self.agree(TICK.unpack(payload)[0])
+                elif kind == RESYNC_REQUEST:
+                    self.send_resync(TICK.unpack(payload)[0])
+                elif kind == RESYNC:
+                    self.resync(payload)
+                else:
+                    raise NetplayError(f"unexpected message kind {kind}")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.close()
+
+    def agree(self, tick: int):
+        """Make a checkpoint everyone reported the same the base of later resyncs"""
+        checkpoint = self.checkpoints.get(tick)
+        if checkpoint is None:
+            return
+        self.agreed = (tick,) + checkpoint
+        for older in [older for older in self.checkpoints if older <= tick]:
+            del self.checkpoints[older]
+        for older in [older for older in self.history if older < tick]:
+            del self.history[older]
+
+    def send_resync(self, tick: int):
+        """Send the rows changed between the last agreed checkpoint and the one at tick"""
+        columns, crc = self.checkpoints[tick]
+        base_tick, base, _ = self.agreed
+        with savegame.paused_gc():
+            delta = savegame.encode(state_delta(base, columns))
+        self.send(RESYNC, RESYNC_HEADER.pack(tick, base_tick, crc) + delta)
+
+    def resync(self, payload: bytes):
+        """Replace the simulation with the majority's state at a checkpoint and catch up again"""
+        tick, base_tick, crc = RESYNC_HEADER.unpack_from(payload)
+        if self.agreed[0] != base_tick or tick > self.sim.tick:
+            return  # Based on a checkpoint this client never agreed to; a later resync will follow
+        with savegame.paused_gc():
+            columns = apply_delta(self.agreed[1], savegame.decode(payload[RESYNC_HEADER.size:]))
+            sim = savegame.restore(columns)
+        current = self.sim.tick
+        self.sim = sim
+        self.agreed = (tick, columns, crc)
+        self.checkpoints.clear()
+        for older in [older for older in self.history if older < tick]:
+            del self.history[older]
+        for later in range(tick, current):
+            self.advance(self.history[later], report=False)
+        self.resyncs += 1
+        if self.on_resync is not None:
+            self.on_resync(sim)
+
+class LockstepThread(SimThread):
+    """Plays a networked match on a background thread, for the pygame front end.
+
+    The client must have connected on loop, which the thread then runs.  The
+    steps come from the match instead of the clock; snapshots, submit() and
+    call() work as for a SimThread.
+    """
+
+    networked = True
+
+    def __init__(self, client: LockstepClient, loop: asyncio.AbstractEventLoop, hooks: List[Callable] = ()):
+        super().__init__(client.sim, client.dt, 1, client.dt, hooks)
+        self.client = client
+        self.loop = loop
+        client.on_resync = self.replaced
+
+    def replaced(self, sim: Simulation):
+        self.sim = sim
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.client.close)
+            self.thread.join()
+
+    def run(self):
+        try:
+            self.loop.run_until_complete(self.client.play(between=self.stepped))
+        except BaseException as error:
+            self.error = error
+            raise
+
+    def stepped(self) -> bool:
+        self.drain()
+        for hook in self.hooks:
+            hook(self.sim)
+        self.steps += 1
+        self.stale = not self.publish()
+        return not self.stopping.is_set()
+
+class Bot:
+    """Random orders for one client's faction, standing in for a player.
+
+    Orders are submitted to the client's simulation, so they go through the
+    match like a player's.  In a procedural galaxy the bot's view drifts
+    and streams in chunks as it goes.
+    """
+
+    def __init__(self, client: LockstepClient, seed: int, desync_tick: Optional[int] = None):
+        self.client = client
+        self.rng = random.Random(seed)
+        self.desync_tick = desync_tick  # Tick to corrupt the local state at, to exercise resyncs
+        galaxy = client.sim.galaxy
+        self.streamer = ChunkStreamer(client.faction) if galaxy is not None else None
+        if galaxy is not None:
+            home = [chunk for chunk, _, owner in galaxy.homes() if owner == client.faction][0]
+            self.view = [home[0] * CHUNK_SIZE, home[1] * CHUNK_SIZE]
+
+    def __call__(self) -> bool:
+        sim = self.client.sim
+        faction = self.client.faction
+        if sim.tick == self.desync_tick:
+            sim.resources[faction] += 1000
+        if sim.tick % BOT_ORDER_TICKS == self.client.player % BOT_ORDER_TICKS:
+            self.order(sim, faction)
+        if self.streamer is not None:
+            self.view[0] += BOT_CAMERA_SPEED[0]
+            self.view[1] += BOT_CAMERA_SPEED[1]
+            self.streamer.update(sim, self.view[0], self.view[1], 1024, 768)
+        return True
+
+    def order(self, sim: Simulation, faction: str):
+        owned = [planet for planet in sim.planets.values() if planet.owner == faction]
+        if not owned:
+            return
+        planet = self.rng.choice(owned)
+        if planet.fleet is not None:
+            sim.submit(TransferFleet(faction, planet.name, self.rng.choice(list(sim.planets))))
+        elif not planet.has_space_station:
+            sim.submit(BuildStation(faction, planet.name))
+        else:
+            sim.submit(BuildFighter(faction, planet.name))
+
+def new_match(chunks: int, seed: int) -> Simulation:
+    """A fixed map, or a procedural galaxy of chunks x chunks chunks"""
+    if chunks:
+        return Simulation((), seed=seed, galaxy=ChunkedGalaxy(seed, chunks, chunks))
+    return Simulation(seed=seed)
+
+async def local_match(players: int, chunks: int, ticks: int = LOCAL_TICKS, desync: Optional[int] = None,
+                      seed: int = 0) -> dict:
+    """Play bots against each other through a server on localhost and measure the traffic"""
+    server = LockstepServer(new_match(chunks, seed), players)
+    await server.start("127.0.0.1", 0)
+    clients = [LockstepClient(f"bot {player}") for player in range(players)]
+    await asyncio.gather(*(client.connect("127.0.0.1", server.port) for client in clients))
+    bots = [Bot(client, seed + client.player, desync if client.player == players - 1 else None)
+            for client in clients]
+    start = time.perf_counter()
+    await asyncio.gather(*(client.play(ticks, realtime=False, between=bot)
+                           for client, bot in zip(clients, bots)))
+    seconds = time.perf_counter() - start
+    await asyncio.sleep(SETTLE_SECONDS)
+    checksums = {savegame.checksum(client.sim) for client in clients}
+    for client in clients:
+        client.close()
+    server.close()
+    await asyncio.gather(server.wait_closed(), *(client.receiver for client in clients))
+    connections = server.connections
+    return {
+        "chunks": chunks,
+        "planets": len(clients[0].sim.planets),
+        "ticks": ticks,
+        "seconds": seconds,
+        "up": sum(connection.received for connection in connections) / players / ticks,
+        "down": sum(connection.sent for connection in connections) / players / ticks,
+        "welcome": max(connection.welcome_bytes for connection in connections),
+        "desyncs": server.desyncs,
+        "resyncs": sum(client.resyncs for client in clients),
+        "resync_bytes": server.resync_bytes,
+        "in_sync": len(checksums) == 1,
+    }
+
+def print_local_results(results: List[dict]):
+    print(f"{'galaxy':>8}{'planets':>9}{'ticks/s':>9}{'up B/tick':>11}{'down B/tick':>13}"
+          f"{'welcome B':>11}{'resyncs':>9}{'resync B':>10}  in sync")
+    for result in results:
+        galaxy = f"{result['chunks']}^2" if result["chunks"] else "fixed"
+        print(f"{galaxy:>8}{result['planets']:>9}{result['ticks'] / result['seconds']:>9.0f}"
+              f"{result['up']:>11.1f}{result['down']:>13.1f}{result['welcome']:>11}"
+              f"{result['resyncs']:>9}{result['resync_bytes']:>10}  {result['in_sync']}")
+
+async def serve(sim: Simulation, players: int, host: str, port: int):
+    server = LockstepServer(sim, players)
+    await server.start(host, port)
+    print(f"Waiting for {players} players on {host}:{server.port}")
+    await server.started.wait()
+    print("Match started: " + ", ".join(f"{connection.name} ({connection.faction})"
+                                         for connection in server.connections))
+    await server.finished.wait()
+    print(f"Match over, {server.desyncs} desyncs")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Lockstep multiplayer for Galaxy Conquest")
+    parser.add_argument("mode", choices=("serve", "local"),
+                        help="relay a match for players to join, or play bots against each other")
+    parser.add_argument("--players", type=int, default=2, help="players in the match")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--galaxy", type=int, nargs="+", default=[0],
+                        help="chunks per side of a procedural galaxy, 0 for the fixed map")
+    parser.add_argument("--load", help="start the served match from this save")
+    parser.add_argument("--seed", type=int, help="match seed (default: random when serving, 0 locally)")
+    parser.add_argument("--ticks", type=int, default=LOCAL_TICKS, help="ticks of each local match")
+    parser.add_argument("--desync", type=int, help="tick at which a local bot corrupts its state")
+    args = parser.parse_args(argv)
+    if args.players < 2:
+        parser.error("a match needs at least 2 players")
+
+    if args.mode == "serve":
+        if args.load:
+            try:
+                sim = savegame.load(args.load)
+            except (OSError, savegame.SaveError) as error:
+                print(f"Could not load {args.load}: {error}")
+                return 2
+        else:
+            sim = new_match(args.galaxy[0], random.randrange(2 ** 32) if args.seed is None else args.seed)
+        asyncio.run(serve(sim, args.players, args.host, args.port))
+        return 0
+
+    results = [asyncio.run(local_match(args.players, chunks, args.ticks, args.desync, args.seed or 0))
+               for chunks in args.galaxy]
+    print_local_results(results)
+    return 0 if all(result["in_sync"] for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""Struct-of-arrays planet storage.
+
+Every planet is a row of a PlanetStore, whose NumPy columns hold the
+positions, owners, resource rates, stations and construction state of the
+whole galaxy.  Owners are interned as small integers and docked fleets are
+kept as slots of the simulation's FleetStore.  Planet objects are __slots__
+views onto a row, so the rules and the drawing code keep using attributes
+while a planet costs tens of bytes of column data instead of a dict-backed
+object of its own.  Production queues are rare and kept in a dict by row.
+
+Removing a planet moves the last row into its place, so rows stay dense;
+version counts additions and removals for callers that cache rows.
+"""
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from fleet_store import Fleet, FleetStore
+
+INITIAL_PLANET_CAPACITY = 32
+EMPTY_QUEUE = ()  # Production queue of planets without waiting orders
+
+# Column name -> dtype; position is (n, 2) and takes its dtype from the planet data
+PLANET_COLUMNS = {
+    "owner": np.int16,
+    "resources": np.int64,
+    "fleet_size": np.int32,
+    "resource_rate": np.int32,
+    "station_level": np.int8,
+    "has_space_station": bool,
+    "building_station": bool,
+    "building_fighter": bool,
+    "station_build_start": np.float64,
+    "fighter_build_start": np.float64,
+    "fleet": np.int32,  # Slot of the docked fleet, -1 for none
+}
+
+class PlanetStore:
+    """Columnar storage for all planets of one simulation"""
+
+    def __init__(self, fleet_store: Optional[FleetStore] = None, capacity: int = INITIAL_PLANET_CAPACITY,
+                 position_dtype=np.int32):
+        self.fleet_store = fleet_store if fleet_store is not None else FleetStore()
+        self.capacity = 0
+        self.count = 0
+        self.names: List[str] = []
+        self.views: List["Planet"] = []
+        self.owner_ids: Dict[str, int] = {}
+        self.owner_names: List[str] = []
+        self.queues: Dict[int, list] = {}  # Row -> paid (kind, cost) orders waiting to start
+        self.version = 0  # Bumped whenever planets are added or removed
+
+        self.position = np.zeros((0, 2), dtype=position_dtype)
+        for name, dtype in PLANET_COLUMNS.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self.grow(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def grow(self, capacity: int):
+        """Resize every column to hold at least capacity planets"""
+        if capacity <= self.capacity:
+            return
+        for name in ("position",) + tuple(PLANET_COLUMNS):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+        self.fleet[self.count:] = -1
+        self.capacity = capacity
+
+    def intern_owner(self, owner: str) -> int:
+        """Small integer id for an owner name"""
+        owner_id = self.owner_ids.get(owner)
+        if owner_id is None:
+            owner_id = len(self.owner_names)
+            self.owner_ids[owner] = owner_id
+            self.owner_names.append(owner)
+        return owner_id
+
+    @classmethod
+    def from_data(cls, planet_data, fleet_store: Optional[FleetStore] = None) -> "PlanetStore":
+        """A store holding (name, position, owner, resource rate) rows, with views"""
+        planet_data = list(planet_data)
+        positions = np.array([position for _, position, _, _ in planet_data]).reshape(-1, 2)
+        integral = not len(planet_data) or np.issubdtype(positions.dtype, np.integer)
+        store = cls(fleet_store, max(INITIAL_PLANET_CAPACITY, len(planet_data)),
+                    np.int32 if integral else np.float64)
+        n = len(planet_data)
+        store.count = n
+        store.names = [name for name, _, _, _ in planet_data]
+        store.position[:n] = positions
+        store.owner[:n] = [store.intern_owner(owner) for _, _, owner, _ in planet_data]
+        store.resource_rate[:n] = [rate for _, _, _, rate in planet_data]
+        store.views = [Planet.attach(store, row) for row in range(n)]
+        return store
+
+    def add(self, name: str, position, owner: str, resource_rate: int) -> "Planet":
+        """Append a planet and return its view"""
+        if self.count == self.capacity:
+            self.grow(max(INITIAL_PLANET_CAPACITY, self.capacity * 2))
+        row = self.count
+        self.count += 1
+        self.names.append(name)
+        self.position[row] = position
+        self.owner[row] = self.intern_owner(owner)
+        self.resource_rate[row] = resource_rate
+        planet = Planet.attach(self, row)
+        self.views.append(planet)
+        self.version += 1
+        return planet
+
+    def remove(self, row: int):
+        """Remove a planet, moving the last planet into its row"""
+        last = self.count - 1
+        self.queues.pop(row, None)
+        if row != last:
+            for name in ("position",) + tuple(PLANET_COLUMNS):
+                column = getattr(self, name)
+                column[row] = column[last]
+            moved = self.views[last]
+            moved.row = row
+            self.views[row] = moved
+            self.names[row] = self.names[last]
+            queue = self.queues.pop(last, None)
+            if queue is not None:
+                self.queues[row] = queue
+        for name in ("position",) + tuple(PLANET_COLUMNS):
+            getattr(self, name)[last] = 0
+        self.fleet[last] = -1
+        self.views.pop()
+        self.names.pop()
+        self.count = last
+        self.version += 1
+
+    def positions(self) -> np.ndarray:
+        """(n, 2) float64 copy of every planet position, in row order"""
+        return self.position[:self.count].astype(np.float64)
+
+    def owner_codes(self, codes: Dict[str, int], default: int) -> np.ndarray:
+        """Every planet's owner mapped through codes, default for owners not in it"""
+        table = np.array([codes.get(owner, default) for owner in self.owner_names], dtype=np.int8)
+        return table[self.owner[:self.count]]
+
+class Planet:
+    """A single planet, viewed through its row in a PlanetStore"""
+
+    __slots__ = ("store", "row", "name")
+
+    def __init__(self, name: str, position: tuple[int, int], owner: str, resources: int = 0,
+                 fleet_size: int = 0, resource_rate: int = 0, store: PlanetStore = None):
+        store = store if store is not None else PlanetStore(capacity=1)
+        planet = store.add(name, position, owner, resource_rate)
+        self.store, self.row, self.name = store, planet.row, name
+        store.views[self.row] = self
+        self.resources = resources
+        self.fleet_size = fleet_size
+
+    @classmethod
+    def attach(cls, store: PlanetStore, row: int) -> "Planet":
+        """A view onto a row that already holds a planet"""
+        planet = cls.__new__(cls)
+        planet.store = store
+        planet.row = row
+        planet.name = store.names[row]
+        return planet
+
+    def __repr__(self):
+        return (f"Planet(name={self.name!r}, position={self.position}, owner={self.owner!r}, "
+                f"resource_rate={self.resource_rate}, station_level={self.station_level})")
+
+    @property
+    def position(self) -> tuple:
+        x, y = self.store.position[self.row].tolist()
+        return (x, y)
+
+    @property
+    def owner(self) -> str:
+        return self.store.owner_names[self.store.owner[self.row]]
+
+    @owner.setter
+    def owner(self, value: str):
+        self.store.owner[self.row] = self.store.intern_owner(value)
+
+    @property
+    def resources(self) -> int:
+        return int(self.store.resources[self.row])
+
+    @resources.setter
+    def resources(self, value: int):
+        self.store.resources[self.row] = value
+
+    @property
+    def fleet_size(self) -> int:
+        return int(self.store.fleet_size[self.row])
+
+    @fleet_size.setter
+    def fleet_size(self, value: int):
+        self.store.fleet_size[self.row] = value
+
+    @property
+    def resource_rate(self) -> int:
+        """Resources generated per day"""
+        return int(self.store.resource_rate[self.row])
+
+    @property
+    def station_level(self) -> int:
+        """Current station level (0-5)"""
+        return int(self.store.station_level[self.row])
+
+    @station_level.setter
+    def station_level(self, value: int):
+        self.store.station_level[self.row] = value
+
+    @property
+    def has_space_station(self) -> bool:
+        return bool(self.store.has_space_station[self.row])
+
+    @has_space_station.setter
+    def has_space_station(self, value: bool):
+        self.store.has_space_station[self.row] = value
+
+    @property
+    def building_station(self) -> bool:
+        return bool(self.store.building_station[self.row])
+
+    @building_station.setter
+    def building_station(self, value: bool):
+        self.store.building_station[self.row] = value
+
+    @property
+    def building_fighter(self) -> bool:
+        return bool(self.store.building_fighter[self.row])
+
+    @building_fighter.setter
+    def building_fighter(self, value: bool):
+        self.store.building_fighter[self.row] = value
+
+    @property
+    def station_build_start(self) -> float:
+        return float(self.store.station_build_start[self.row])
+
+    @station_build_start.setter
+    def station_build_start(self, value: float):
+        self.store.station_build_start[self.row] = value
+
+    @property
+    def fighter_build_start(self) -> float:
+        return float(self.store.fighter_build_start[self.row])
+
+    @fighter_build_start.setter
+    def fighter_build_start(self, value: float):
+        self.store.fighter_build_start[self.row] = value
+
+    @property
+    def fleet(self) -> Optional[Fleet]:
+        """The fleet stationed at the planet, one of the store's fleet store"""
+        slot = self.store.fleet[self.row]
+        return self.store.fleet_store.views[slot] if slot >= 0 else None
+
+    @fleet.setter
+    def fleet(self, value: Optional[Fleet]):
+        self.store.fleet[self.row] = value.slot if value is not None else -1
+
+    @property
+    def production_queue(self) -> Sequence[tuple]:
+        """Paid (kind, cost) orders waiting to start; reading never changes the store"""
+        return self.store.queues.get(self.row, EMPTY_QUEUE)
+
+    def enqueue(self, kind: str, cost: int):
+        """Add a paid order to the production queue"""
+        self.store.queues.setdefault(self.row, []).append((kind, cost))
+
+    def complete_station(self):
+        """Finish the station level under construction"""
+        self.building_station = False
+        self.has_space_station = True
+        self.station_level += 1  # Increment station level
+
+    def complete_fighter(self, fleet_store: FleetStore = None):
+        """Finish the fighter under construction"""
+        self.building_fighter = False
+        fleet = self.fleet
+        if not fleet:
+            # Create new fleet only when ship is complete
+            self.fleet = Fleet(owner=self.owner, size=0, position=self.position, fighters=1,
+                               store=fleet_store if fleet_store is not None else self.store.fleet_store)
+        else:
+            fleet.fighters += 1
+
+    def queued(self, kind: str) -> int:
+        """Number of waiting production orders of a kind"""
+        queue = self.store.queues.get(self.row)
+        if not queue:
+            return 0
+        return sum(1 for queued_kind, _ in queue if queued_kind == kind)
+
+    def add_fighter(self, current_time):
+        """Start fighter construction"""
+        self.building_fighter = True
+        self.fighter_build_start = current_time
+
+    def add_station_level(self, current_time):
+        """Start building the next space station level"""
+        self.building_station = True
+        self.station_build_start = current_time
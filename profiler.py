@@ -0,0 +1,201 @@
+"""Low-overhead frame profiler.
+
+Phases of a frame are timed with nested scoped timers, either as
+``with profiler.section("name"):`` blocks or with the ``@profiler.timed()``
+decorator.  Nested phases are recorded under slash-separated paths such as
+"draw/world/draw_planets".  Each phase keeps a rolling window of recent
+frames for p50/p95/p99 statistics, and whole-frame samples are kept for CSV
+or JSON export.
+
+While disabled, section() hands out one shared no-op context manager and
+timed() wrappers call straight through, so instrumented code costs only an
+attribute check.  Pure Python, no pygame.
+"""
+from collections import deque
+from typing import Dict, List, Optional
+import csv
+import functools
+import json
+import math
+import time
+
+PROFILE_WINDOW = 300  # Frames in the rolling percentile window
+PROFILE_HISTORY = 36_000  # Per-frame samples kept for export, ten minutes at 60 FPS
+PERCENTILES = (50, 95, 99)
+FRAME_PHASE = "total"  # Path under which the whole frame is recorded
+
+class NullSection:
+    """Shared do-nothing context manager handed out while profiling is off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_SECTION = NullSection()
+
+class Section:
+    """Times one phase and records it under its nested path"""
+
+    __slots__ = ("profiler", "name", "path", "start")
+
+    def __init__(self, profiler: "FrameProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler.stack
+        self.path = f"{stack[-1]}/{self.name}" if stack else self.name
+        stack.append(self.path)
+        # Claim the phase's slot on entry so parents are listed before children
+        self.profiler.current.setdefault(self.path, 0.0)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        profiler = self.profiler
+        profiler.stack.pop()
+        profiler.record(self.path, elapsed)
+        return False
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = math.ceil(p / 100 * len(ordered))
+    return ordered[min(len(ordered), max(1, rank)) - 1]
+
+class FrameProfiler:
+    """Per-frame phase timings with rolling percentiles and export"""
+
+    def __init__(self, window: int = PROFILE_WINDOW, history: int = PROFILE_HISTORY):
+        self.enabled = False
+        self.window = window
+        self.stack: List[str] = []
+        self.current: Dict[str, float] = {}  # Milliseconds per phase path this frame
+        self.frame_start: Optional[float] = None
+        self.frame_index = 0
+        self.phases: List[str] = []  # Phase paths in tree order, parents first
+        self.recent: Dict[str, deque] = {}  # Phase path -> last window frame times
+        self.samples: deque = deque(maxlen=history)  # (frame index, {path: ms})
+
+    def enable(self, enabled: bool = True):
+        """Start or stop recording; a frame in progress is dropped"""
+        self.enabled = enabled
+        self.stack.clear()
+        self.current = {}
+        self.frame_start = None
+
+    def reset(self):
+        """Forget every recorded frame"""
+        self.phases.clear()
+        self.recent.clear()
+        self.samples.clear()
+        self.frame_index = 0
+
+    def section(self, name: str):
+        """Context manager timing a phase nested in the enclosing sections"""
+        if not self.enabled:
+            return NULL_SECTION
+        return Section(self, name)
+
+    def timed(self, name: Optional[str] = None):
+        """Decorator timing every call of a function as a phase"""
+        def decorate(func):
+            phase = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with Section(self, phase):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, path: str, seconds: float):
+        """Add time to a phase of the current frame"""
+        self.current[path] = self.current.get(path, 0.0) + seconds * 1000
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.stack.clear()
+        self.current = {FRAME_PHASE: 0.0}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """Close the current frame and fold its phases into the statistics"""
+        if not self.enabled or self.frame_start is None:
+            return
+        self.record(FRAME_PHASE, time.perf_counter() - self.frame_start)
+        self.frame_start = None
+        for path, ms in self.current.items():
+            recent = self.recent.get(path)
+            if recent is None:
+                recent = self.recent[path] = deque(maxlen=self.window)
+                self.add_phase(path)
+            recent.append(ms)
+        self.samples.append((self.frame_index, self.current))
+        self.current = {}
+        self.frame_index += 1
+
+    def add_phase(self, path: str):
+        """List a new phase after its parent's existing subtree"""
+        parent = path.rpartition("/")[0]
+        if parent not in self.recent:
+            self.phases.append(path)
+            return
+        index = self.phases.index(parent) + 1
+        while index < len(self.phases) and self.phases[index].startswith(parent + "/"):
+            index += 1
+        self.phases.insert(index, path)
+
+    def frame_times(self) -> List[float]:
+        """Whole-frame times in milliseconds over the rolling window, oldest first"""
+        return list(self.recent.get(FRAME_PHASE, ()))
+
+    def percentiles(self, path: str) -> tuple:
+        """p50, p95 and p99 of a phase over the rolling window, in milliseconds.
+
+        Frames in which the phase did not run are not counted.
+        """
+        ordered = sorted(self.recent.get(path, ()))
+        return tuple(percentile(ordered, p) for p in PERCENTILES)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Rolling statistics for every phase, in tree order"""
+        result = {}
+        for path in self.phases:
+            ordered = sorted(self.recent[path])
+            stats = {f"p{p}": percentile(ordered, p) for p in PERCENTILES}
+            stats["max"] = ordered[-1] if ordered else 0.0
+            stats["frames"] = len(ordered)
+            result[path] = stats
+        return result
+
+    def export_csv(self, path: str):
+        """Write one row per recorded frame with a millisecond column per phase"""
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame"] + self.phases)
+            for index, phases in self.samples:
+                writer.writerow([index] + [f"{phases[phase]:.4f}" if phase in phases else ""
+                                           for phase in self.phases])
+
+    def export_json(self, path: str):
+        """Write the rolling summary and every recorded frame as JSON"""
+        data = {
+            "window": self.window,
+            "summary": self.summary(),
+            "frames": [{"frame": index, "phases": phases} for index, phases in self.samples],
+        }
+        with open(path, "w") as file:
+            json.dump(data, file, indent=1)
+
+# Shared by the game and its modules so every phase lands in the same frame
+profiler = FrameProfiler()
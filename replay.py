@@ -0,0 +1,255 @@
+"""Command logs and replays.
+
+A CommandLog records a match as it is played: every command the simulation
+applies, tagged with its tick, plus a keyframe snapshot of the whole game at
+the start and every KEYFRAME_DAYS days.  The file is append-only and flushed
+after each record, so a log cut short by a crash is still readable up to its
+last complete record:
+
+    header    magic, format version, step length in game seconds
+    command   kind, tick, encoded command                    (repeated)
+    keyframe  kind, tick, day, state checksum, zlib save data
+
+Since the simulation is deterministic given its commands, a Replay can
+re-run a match headless at full speed from its first keyframe, optionally
+checking the replayed state against every later keyframe, or seek to any day
+by starting from the nearest keyframe before it.  Reproduce a match from the
+command line with:
+
+    python replay.py replays/match.gclog --day 12 --save day12.gcs
+
+Pure Python and NumPy, no pygame.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import argparse
+import struct
+import sys
+import time
+import zlib
+import savegame
+from commands import encode_command, decode_command
+from simulation import Simulation
+
+LOG_MAGIC = b"GCLG"
+LOG_VERSION = 2
+KEYFRAME_DAYS = 1  # Days between keyframes
+KEYFRAME_COMPRESSION_LEVEL = 1
+
+LOG_HEADER = struct.Struct("<4sHd")
+RECORD = struct.Struct("<BI")  # Kind, tick
+KEYFRAME = struct.Struct("<IIQ")  # Day, checksum, data length
+
+# Record kinds
+COMMAND_RECORD = 1
+KEYFRAME_RECORD = 2
+
+class ReplayError(Exception):
+    """A command log is damaged or was written by an unsupported version"""
+
+@dataclass
+class Keyframe:
+    tick: int  # Steps taken when the snapshot was captured
+    day: int
+    checksum: int  # savegame.checksum of the captured state
+    data: bytes  # zlib-compressed uncompressed-format save
+
+    def restore(self) -> Simulation:
+        with savegame.paused_gc():
+            return savegame.restore(savegame.decode(zlib.decompress(self.data)))
+
+@dataclass
+class MatchLog:
+    """The contents of a command log"""
+    dt: float  # Game seconds per step
+    commands: Dict[int, list] = field(default_factory=dict)  # Tick -> commands in order
+    keyframes: List[Keyframe] = field(default_factory=list)  # In tick order
+    complete: bool = True  # False if the file ended in the middle of a record
+
+    @property
+    def end_tick(self) -> int:
+        """Tick after the last recorded event"""
+        last_command = max(self.commands, default=-1) + 1
+        last_keyframe = self.keyframes[-1].tick if self.keyframes else 0
+        return max(last_command, last_keyframe)
+
+class CommandLog:
+    """Append-only recording of a simulation's commands and keyframes.
+
+    Attaches itself to the simulation, which reports every applied command
+    and every new day.
+    """
+
+    def __init__(self, path: str, sim: Simulation, dt: float, keyframe_days: int = KEYFRAME_DAYS):
+        self.path = path
+        self.keyframe_days = keyframe_days
+        self.last_keyframe_day = None
+        self.last_keyframe_tick = None
+        self.file = open(path, "wb")
+        self.file.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, dt))
+        self.keyframe(sim)
+        sim.command_log = self
+
+    def record(self, tick: int, command):
+        self.file.write(RECORD.pack(COMMAND_RECORD, tick) + encode_command(command))
+        self.file.flush()
+
+    def day_started(self, sim: Simulation):
+        if sim.current_day - self.last_keyframe_day >= self.keyframe_days:
+            self.keyframe(sim)
+
+    def keyframe(self, sim: Simulation):
+        """Append a snapshot of the whole game at its current tick"""
+        with savegame.paused_gc():
+            data = savegame.encode(savegame.capture(sim), compress=False)
+        compressed = zlib.compress(data, KEYFRAME_COMPRESSION_LEVEL)
+        self.file.write(RECORD.pack(KEYFRAME_RECORD, sim.tick)
+                        + KEYFRAME.pack(sim.current_day, zlib.crc32(data), len(compressed)))
+        self.file.write(compressed)
+        self.file.flush()
+        self.last_keyframe_day = sim.current_day
+        self.last_keyframe_tick = sim.tick
+
+    def close(self, sim: Optional[Simulation] = None):
+        """Stop recording, ending with a keyframe of sim's final state if given"""
+        if self.file.closed:
+            return
+        if sim is not None:
+            if sim.tick != self.last_keyframe_tick:
+                self.keyframe(sim)
+            sim.command_log = None
+        self.file.close()
+
+def read_log(path: str) -> MatchLog:
+    """Parse a command log, keeping every complete record"""
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < LOG_HEADER.size:
+        raise ReplayError("command log is truncated")
+    magic, version, dt = LOG_HEADER.unpack_from(data)
+    if magic != LOG_MAGIC:
+        raise ReplayError("not a Galaxy Conquest command log")
+    if version != LOG_VERSION:
+        raise ReplayError(f"unsupported command log version {version}, expected {LOG_VERSION}")
+
+    log = MatchLog(dt)
+    view = memoryview(data)
+    offset = LOG_HEADER.size
+    while offset < len(data):
+        try:
+            kind, tick = RECORD.unpack_from(view, offset)
+            position = offset + RECORD.size
+            if kind == COMMAND_RECORD:
+                command, position = decode_command(view, position)
+                log.commands.setdefault(tick, []).append(command)
+            elif kind == KEYFRAME_RECORD:
+                day, checksum, length = KEYFRAME.unpack_from(view, position)
+                position += KEYFRAME.size
+                if position + length > len(data):
+                    raise ValueError("keyframe is truncated")
+                log.keyframes.append(Keyframe(tick, day, checksum, data[position:position + length]))
+                position += length
+            else:
+                raise ReplayError(f"unknown record kind {kind} at byte {offset}")
+        except (struct.error, IndexError, ValueError):
+            # A crash while writing leaves a partial last record
+            log.complete = False
+            break
+        offset = position
+    if not log.keyframes:
+        raise ReplayError("command log has no keyframe to start from")
+    return log
+
+class Replay:
+    """Re-runs a recorded match from its keyframes and commands"""
+
+    def __init__(self, log: MatchLog, verify: bool = False):
+        self.log = log
+        self.verify = verify  # Compare the replayed state with each keyframe reached
+        self.sim: Optional[Simulation] = None
+        self.next_keyframe = 0  # Index of the next keyframe to verify against
+        self.mismatches: List[Keyframe] = []  # Keyframes the replayed state differed from
+
+    def start(self, index: int = 0) -> Simulation:
+        """Restore the game from a keyframe"""
+        keyframe = self.log.keyframes[index]
+        self.sim = keyframe.restore()
+        self.next_keyframe = index + 1
+        return self.sim
+
+    def step(self):
+        """Advance one tick, applying the commands recorded for it"""
+        sim = self.sim
+        for command in self.log.commands.get(sim.tick, ()):
+            sim.submit(command)
+        sim.step(self.log.dt)
+
+        keyframes = self.log.keyframes
+        if self.next_keyframe < len(keyframes) and keyframes[self.next_keyframe].tick == sim.tick:
+            keyframe = keyframes[self.next_keyframe]
+            self.next_keyframe += 1
+            if self.verify and savegame.checksum(sim) != keyframe.checksum:
+                self.mismatches.append(keyframe)
+
+    def run(self, until_day: Optional[int] = None) -> Simulation:
+        """Step until the start of until_day, or to the end of the log"""
+        if self.sim is None:
+            self.start()
+        end_tick = self.log.end_tick
+        while self.sim.tick < end_tick and (until_day is None or self.sim.current_day < until_day):
+            self.step()
+        return self.sim
+
+    def seek(self, day: int) -> Simulation:
+        """The game at the start of day, resumed from the last keyframe before it"""
+        index = 0
+        for candidate, keyframe in enumerate(self.log.keyframes):
+            if keyframe.day > day:
+                break
+            index = candidate
+            if keyframe.day == day:
+                break
+        self.start(index)
+        return self.run(until_day=day)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded Galaxy Conquest match")
+    parser.add_argument("log", help="command log to replay")
+    parser.add_argument("--day", type=int, help="stop at the start of this day")
+    parser.add_argument("--save", help="write the game where the replay stopped to this save file")
+    parser.add_argument("--verify", action="store_true",
+                        help="replay from the start, comparing the state with every keyframe")
+    args = parser.parse_args(argv)
+
+    try:
+        log = read_log(args.log)
+    except (OSError, ReplayError) as error:
+        print(f"Could not read {args.log}: {error}")
+        return 2
+    if not log.complete:
+        print("The log ends with a partial record, replaying up to it")
+
+    replay = Replay(log, verify=args.verify)
+    start = time.perf_counter()
+    if args.day is not None and not args.verify:
+        sim = replay.seek(args.day)
+    else:
+        # Verification runs through every keyframe from the first
+        sim = replay.run(until_day=args.day)
+    seconds = time.perf_counter() - start
+
+    owners = {}
+    for planet in sim.planets.values():
+        owners[planet.owner] = owners.get(planet.owner, 0) + 1
+    print(f"Day {sim.current_day}, tick {sim.tick}, {seconds:.2f} s")
+    for owner, amount in sim.resources.items():
+        print(f"  {owner}: {amount} resources, {owners.get(owner, 0)} planets")
+    for keyframe in replay.mismatches:
+        print(f"DESYNC at day {keyframe.day}, tick {keyframe.tick}")
+
+    if args.save:
+        savegame.save(sim, args.save)
+    return 1 if replay.mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
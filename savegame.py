@@ -0,0 +1,374 @@
+"""Compact binary save games.
+
+A save is a column-oriented snapshot of a Simulation: every planet, fleet,
+production order and pending build event becomes a row in a handful of
+NumPy columns, strings are interned into tables, and the columns are
+written back to back behind a small versioned header:
+
+    header   magic, format version, flags, column count
+    column   name, dtype, shape, raw little-endian data  (repeated)
+
+Everything after the header is zlib-compressed when the COMPRESSED flag is
+set.  Loading reads the columns straight out of the buffer without parsing
+individual records.
+
+capture() copies the state on the caller's thread; encoding, compression
+and disk I/O can then run elsewhere, which is what Autosaver does on a
+background thread.  Pure Python and NumPy, no pygame.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import gc
+import os
+import struct
+import zlib
+import numpy as np
+from fleet_store import FleetStore, SNAPSHOT_COLUMNS
+from galaxy import ChunkedGalaxy
+from simulation import Simulation, Rules
+
+SAVE_MAGIC = b"GCSV"
+SAVE_VERSION = 5
+COMPRESSED = 1  # Header flag: the column data is zlib-compressed
+SAVE_COMPRESSION_LEVEL = 1  # Fast; the columns are already compact
+AUTOSAVE_INTERVAL = 150  # Game seconds between autosaves, five days
+
+HEADER = struct.Struct("<4sHHI")
+BUILD_KINDS = ("station", "fighter")
+
+# Planet flag bits
+HAS_SPACE_STATION = 1
+BUILDING_STATION = 2
+BUILDING_FIGHTER = 4
+
+class SaveError(Exception):
+    """A save file is damaged or was written by an unsupported version"""
+
+@contextmanager
+def paused_gc():
+    """Hold off cyclic garbage collection while building many objects.
+
+    Creating a large galaxy allocates hundreds of thousands of objects that
+    live on, so the collector would otherwise run over and over for nothing.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def pack_strings(strings: List[str]) -> tuple[np.ndarray, np.ndarray]:
+    """UTF-8 blob and end offsets for a list of strings"""
+    encoded = [s.encode("utf-8") for s in strings]
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    offsets = np.cumsum([len(e) for e in encoded], dtype=np.int64)
+    return blob, offsets
+
+def unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = blob.tobytes()
+    ends = offsets.tolist()
+    starts = [0] + ends[:-1]
+    return [data[start:end].decode("utf-8") for start, end in zip(starts, ends)]
+
+def capture(sim: Simulation) -> Dict[str, np.ndarray]:
+    """Copy the simulation state into save columns"""
+    planet_store = sim.planet_store
+    n = planet_store.count
+    store = sim.fleet_store
+    fleets = store.snapshot()
+
+    # Owners are interned into one table shared by planets, fleets and resources
+    owners = list(store.owner_names)
+    owner_ids = {owner: index for index, owner in enumerate(owners)}
+    def intern(owner):
+        if owner not in owner_ids:
+            owner_ids[owner] = len(owners)
+            owners.append(owner)
+        return owner_ids[owner]
+
+    # Planet owners in order of first appearance so equal states encode equally
+    planet_owner = planet_store.owner[:n]
+    present, first = np.unique(planet_owner, return_index=True)
+    for owner in present[np.argsort(first)].tolist():
+        intern(planet_store.owner_names[owner])
+    owner_table = np.array([owner_ids.get(owner, -1) for owner in planet_store.owner_names],
+                           dtype=np.int16)
+
+    # The planet columns are copied as they are, the dtype of positions is kept in the file
+    columns = {}
+    columns["planet_name_blob"], columns["planet_name_offsets"] = pack_strings(planet_store.names)
+    columns["planet_position"] = planet_store.position[:n].copy()
+    columns["planet_owner"] = owner_table[planet_owner]
+    columns["planet_resources"] = planet_store.resources[:n].copy()
+    columns["planet_fleet_size"] = planet_store.fleet_size[:n].copy()
+    columns["planet_resource_rate"] = planet_store.resource_rate[:n].copy()
+    columns["planet_station_level"] = planet_store.station_level[:n].copy()
+    columns["planet_flags"] = (planet_store.has_space_station[:n] * np.uint8(HAS_SPACE_STATION)
+                               | planet_store.building_station[:n] * np.uint8(BUILDING_STATION)
+                               | planet_store.building_fighter[:n] * np.uint8(BUILDING_FIGHTER))
+    columns["planet_build_start"] = np.stack([planet_store.station_build_start[:n],
+                                              planet_store.fighter_build_start[:n]], axis=1)
+    columns["planet_fleet"] = planet_store.fleet[:n].copy()
+
+    # Production queues, one row per waiting order
+    queue = [(row, BUILD_KINDS.index(kind), cost)
+             for row, orders in sorted(planet_store.queues.items()) for kind, cost in orders]
+    columns["queue"] = np.array(queue, dtype=np.int64).reshape(-1, 3)
+
+    # Pending construction, in firing order
+    events = [event for event in sim.scheduler.pending() if event.action == "build"]
+    row_of_planet = ({name: planet.row for name, planet in sim.planets.items()}
+                     if events or sim.voyages else {})
+    columns["build_event"] = np.array(
+        [(row_of_planet[event.args[0]], BUILD_KINDS.index(event.args[1]), event.args[2])
+         for event in events], dtype=np.int64).reshape(-1, 3)
+    columns["build_event_time"] = np.array([event.time for event in events], dtype=np.float64)
+
+    # Fleets keep their store slots, and the fleets in space their order, so a
+    # restored game allocates and iterates fleets exactly like the original
+    for name, column in fleets.items():
+        columns["fleet_" + name] = column
+    columns["fleet_in_space"] = np.array(list(sim.fleets), dtype=np.int64)
+    columns["fleet_free_slots"] = np.array(store.free_slots, dtype=np.int64)
+    columns["fleet_store"] = np.array([store.count, len(store.owner_names), store.settling],
+                                      dtype=np.int64)
+
+    # Remaining waypoints of fleets on multi-hop routes, and where they are headed
+    routes = store.routes
+    columns["route_slot"] = np.array(list(routes), dtype=np.int64)
+    columns["route_offsets"] = np.cumsum([len(route) for route in routes.values()], dtype=np.int64)
+    columns["route_points"] = np.array([point for route in routes.values() for point in route],
+                                       dtype=np.float64).reshape(-1, 2)
+    columns["voyage"] = np.array([(slot, row_of_planet[name]) for slot, name in sim.voyages.items()],
+                                 dtype=np.int64).reshape(-1, 2)
+
+    columns["resources"] = np.array([(intern(owner), amount)
+                                     for owner, amount in sim.resources.items()],
+                                    dtype=np.int64).reshape(-1, 2)
+    columns["clock"] = np.array([sim.current_time, sim.day_timer, sim.seconds_per_day],
+                                dtype=np.float64)
+    columns["counters"] = np.array([sim.current_day, sim.revision, sim.tick, sim.seed],
+                                   dtype=np.int64)
+    rules = sim.rules
+    columns["rules"] = np.array([rules.space_station_cost, rules.fighter_cost,
+                                 rules.station_build_time, rules.fighter_build_time], dtype=np.float64)
+    _, rng_state, gauss_next = sim.rng.getstate()
+    columns["rng_state"] = np.array(rng_state, dtype=np.uint32)
+    columns["rng_gauss"] = np.array([] if gauss_next is None else [gauss_next], dtype=np.float64)
+    columns["owner_blob"], columns["owner_offsets"] = pack_strings(owners)
+
+    # A procedural galaxy is saved as its seed and size and which chunks are
+    # loaded, in load order, and modified; the chunks' planets are above
+    galaxy = sim.galaxy
+    columns["galaxy"] = np.array([] if galaxy is None else [galaxy.seed, galaxy.width, galaxy.height],
+                                 dtype=np.int64)
+    columns["chunk_loaded"] = np.array(list(galaxy.loaded) if galaxy is not None else [],
+                                       dtype=np.int64).reshape(-1, 2)
+    columns["chunk_modified"] = np.array(sorted(galaxy.modified) if galaxy is not None else [],
+                                         dtype=np.int64).reshape(-1, 2)
+    return columns
+
+def encode(columns: Dict[str, np.ndarray], compress: bool = True) -> bytes:
+    """Serialize save columns into the binary save format"""
+    parts = []
+    for name, column in columns.items():
+        column = np.ascontiguousarray(column)
+        dtype = column.dtype.newbyteorder("<").str.encode("ascii")
+        encoded_name = name.encode("ascii")
+        parts.append(struct.pack("<B", len(encoded_name)) + encoded_name)
+        parts.append(struct.pack("<B", len(dtype)) + dtype)
+        parts.append(struct.pack(f"<B{column.ndim}Q", column.ndim, *column.shape))
+        parts.append(column.astype(column.dtype.newbyteorder("<"), copy=False).tobytes())
+    body = b"".join(parts)
+    flags = 0
+    if compress:
+        body = zlib.compress(body, SAVE_COMPRESSION_LEVEL)
+        flags |= COMPRESSED
+    return HEADER.pack(SAVE_MAGIC, SAVE_VERSION, flags, len(columns)) + body
+
+def decode(data: bytes) -> Dict[str, np.ndarray]:
+    """Read save columns back out of the binary save format"""
+    if len(data) < HEADER.size:
+        raise SaveError("save file is truncated")
+    magic, version, flags, count = HEADER.unpack_from(data)
+    if magic != SAVE_MAGIC:
+        raise SaveError("not a Galaxy Conquest save file")
+    if version != SAVE_VERSION:
+        raise SaveError(f"unsupported save version {version}, expected {SAVE_VERSION}")
+    body = memoryview(data)[HEADER.size:]
+    if flags & COMPRESSED:
+        try:
+            body = memoryview(zlib.decompress(body))
+        except zlib.error as error:
+            raise SaveError(f"save file is damaged: {error}") from None
+
+    columns = {}
+    offset = 0
+    try:
+        for _ in range(count):
+            length = body[offset]
+            name = bytes(body[offset + 1:offset + 1 + length]).decode("ascii")
+            offset += 1 + length
+            length = body[offset]
+            dtype = np.dtype(bytes(body[offset + 1:offset + 1 + length]).decode("ascii"))
+            offset += 1 + length
+            ndim = body[offset]
+            shape = struct.unpack_from(f"<{ndim}Q", body, offset + 1)
+            offset += 1 + 8 * ndim
+            size = int(np.prod(shape, dtype=np.int64))
+            columns[name] = np.frombuffer(body, dtype=dtype, count=size, offset=offset).reshape(shape)
+            offset += size * dtype.itemsize
+    except (IndexError, ValueError, struct.error) as error:
+        raise SaveError(f"save file is damaged: {error}") from None
+    return columns
+
+def restore(columns: Dict[str, np.ndarray]) -> Simulation:
+    """Rebuild a Simulation from save columns"""
+    owners = unpack_strings(columns["owner_blob"], columns["owner_offsets"])
+    names = unpack_strings(columns["planet_name_blob"], columns["planet_name_offsets"])
+    positions = columns["planet_position"].tolist()
+    planet_owners = columns["planet_owner"].tolist()
+    rates = columns["planet_resource_rate"].tolist()
+    current_time, day_timer, seconds_per_day = columns["clock"].tolist()
+    current_day, revision, tick, seed = columns["counters"].tolist()
+
+    planet_data = [(name, tuple(position), owners[owner], rate)
+                   for name, position, owner, rate in zip(names, positions, planet_owners, rates)]
+    galaxy = None
+    if len(columns["galaxy"]):
+        galaxy = ChunkedGalaxy(*columns["galaxy"].tolist())
+        for chunk in map(tuple, columns["chunk_loaded"].tolist()):
+            galaxy.loaded[chunk] = galaxy.systems(chunk).names
+        galaxy.modified = set(map(tuple, columns["chunk_modified"].tolist()))
+    space_station_cost, fighter_cost, station_build_time, fighter_build_time = columns["rules"].tolist()
+    rules = Rules(int(space_station_cost), int(fighter_cost), station_build_time, fighter_build_time)
+    sim = Simulation(planet_data, seconds_per_day=seconds_per_day, starting_resources=0, seed=seed,
+                     galaxy=galaxy, rules=rules)
+    sim.resources = {owners[owner]: amount for owner, amount in columns["resources"].tolist()}
+    sim.current_time = current_time
+    sim.day_timer = day_timer
+    sim.current_day = current_day
+    sim.revision = revision
+    sim.tick = tick
+    gauss_next = columns["rng_gauss"].tolist()
+    sim.rng.setstate((3, tuple(columns["rng_state"].tolist()), gauss_next[0] if gauss_next else None))
+
+    count, owner_count, settling = columns["fleet_store"].tolist()
+    fleet_columns = {name: columns["fleet_" + name] for name in SNAPSHOT_COLUMNS + ("slot",)}
+    store = FleetStore.restore(fleet_columns, owners[:owner_count], count,
+                               columns["fleet_free_slots"].tolist())
+    store.settling = bool(settling)
+    sim.fleet_store = store
+    sim.fleets = {slot: store.views[slot] for slot in columns["fleet_in_space"].tolist()}
+    points = [tuple(point) for point in columns["route_points"].tolist()]
+    ends = columns["route_offsets"].tolist()
+    for slot, start, end in zip(columns["route_slot"].tolist(), [0] + ends[:-1], ends):
+        store.routes[slot] = points[start:end]
+
+    # The planet columns are copied straight into the planet store
+    planet_store = sim.planet_store
+    planets = planet_store.views
+    planet_store.fleet_store = store
+    n = planet_store.count
+    station_level = columns["planet_station_level"]
+    flags = columns["planet_flags"]
+    planet_store.resources[:n] = columns["planet_resources"]
+    planet_store.fleet_size[:n] = columns["planet_fleet_size"]
+    planet_store.station_level[:n] = station_level
+    planet_store.has_space_station[:n] = flags & HAS_SPACE_STATION
+    planet_store.building_station[:n] = flags & BUILDING_STATION
+    planet_store.building_fighter[:n] = flags & BUILDING_FIGHTER
+    planet_store.station_build_start[:n] = columns["planet_build_start"][:, 0]
+    planet_store.fighter_build_start[:n] = columns["planet_build_start"][:, 1]
+    planet_store.fleet[:n] = columns["planet_fleet"]
+
+    # The constructor counted every planet at station level 0
+    levels = np.bincount(columns["planet_owner"], weights=station_level, minlength=len(owners))
+    for owner, total in enumerate(levels.tolist()):
+        if total:
+            sim.ledger.get(owners[owner]).station_levels += int(total)
+
+    sim.voyages = {slot: planets[row].name for slot, row in columns["voyage"].tolist()}
+
+    for row, kind, cost in columns["queue"].tolist():
+        planets[row].enqueue(BUILD_KINDS[kind], cost)
+    for (row, kind, cost), time in zip(columns["build_event"].tolist(),
+                                       columns["build_event_time"].tolist()):
+        name = planets[row].name
+        sim.build_events[(name, BUILD_KINDS[kind])] = sim.scheduler.schedule(
+            time, "build", name, BUILD_KINDS[kind], cost)
+    return sim
+
+def write_snapshot(columns: Dict[str, np.ndarray], path: str, compress: bool = True):
+    """Encode captured columns and replace the file at path atomically"""
+    data = encode(columns, compress)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+def save(sim: Simulation, path: str, compress: bool = True):
+    with paused_gc():
+        columns = capture(sim)
+    write_snapshot(columns, path, compress)
+
+def checksum(sim: Simulation) -> int:
+    """CRC-32 of the simulation's uncompressed save; equal states have equal checksums"""
+    with paused_gc():
+        return zlib.crc32(encode(capture(sim), compress=False))
+
+def load(path: str) -> Simulation:
+    with open(path, "rb") as file:
+        data = file.read()
+    with paused_gc():
+        return restore(decode(data))
+
+class Autosaver:
+    """Periodic saves written on a background thread.
+
+    The state is captured on the calling thread, so the save is a consistent
+    snapshot of one tick; encoding, compression and the file write happen on
+    a single worker thread.  An autosave is skipped while the previous save
+    is still being written; other saves are queued behind it.
+    """
+
+    def __init__(self, path: str, interval: float = AUTOSAVE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        self.pending: List[Future] = []  # Saves still being written, oldest first
+        self.last_save_time = 0.0  # Game time of the last save
+        self.last_error: Optional[BaseException] = None
+
+    def update(self, sim: Simulation) -> bool:
+        """Start an autosave if interval game seconds have passed since the last one"""
+        if sim.current_time - self.last_save_time < self.interval:
+            return False
+        return self.save(sim)
+
+    def save(self, sim: Simulation, path: Optional[str] = None, queue: bool = False) -> bool:
+        """Capture the simulation now and write it in the background.
+
+        Skipped while another save is being written, unless queued after it.
+        """
+        if self.busy() and not queue:
+            return False
+        self.last_save_time = sim.current_time
+        with paused_gc():
+            columns = capture(sim)
+        self.pending.append(self.executor.submit(write_snapshot, columns, path or self.path))
+        return True
+
+    def busy(self) -> bool:
+        """Whether a save is still being written; records the error of the last one finished"""
+        while self.pending and self.pending[0].done():
+            self.last_error = self.pending.pop(0).exception()
+        return bool(self.pending)
+
+    def close(self):
+        """Wait for the save in progress and stop the worker thread"""
+        self.executor.shutdown(wait=True)
+        self.busy()
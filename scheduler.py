@@ -0,0 +1,75 @@
+"""Priority-queue timer service for time-based game events.
+
+Events are kept in a binary heap ordered by due time, so each tick only
+touches the events that are actually due.  Cancellation is lazy: cancelled
+events stay in the heap and are skipped when they surface.  Pure Python, no
+pygame.
+"""
+from typing import List
+import heapq
+import itertools
+
+class TimerEvent:
+    """A scheduled action, identified by a name plus plain-data arguments"""
+
+    __slots__ = ("time", "seq", "action", "args", "cancelled")
+
+    def __init__(self, time: float, seq: int, action: str, args: tuple):
+        self.time = time
+        self.seq = seq
+        self.action = action
+        self.args = args
+        self.cancelled = False
+
+    def __lt__(self, other: "TimerEvent"):
+        return (self.time, self.seq) < (other.time, other.seq)
+
+    def __repr__(self):
+        return f"TimerEvent(time={self.time}, action={self.action!r}, args={self.args})"
+
+class Scheduler:
+    """Min-heap of TimerEvents with lazy cancellation"""
+
+    def __init__(self):
+        self.heap: List[TimerEvent] = []
+        self.counter = itertools.count()  # Keeps same-time events in FIFO order
+        self.active = 0
+
+    def __len__(self):
+        return self.active
+
+    def schedule(self, time: float, action: str, *args) -> TimerEvent:
+        """Schedule action to fire once the clock reaches time"""
+        event = TimerEvent(time, next(self.counter), action, args)
+        heapq.heappush(self.heap, event)
+        self.active += 1
+        return event
+
+    def cancel(self, event: TimerEvent):
+        """Stop a pending event from firing"""
+        if not event.cancelled:
+            event.cancelled = True
+            self.active -= 1
+
+    def next_time(self) -> float:
+        """Due time of the earliest pending event, or infinity if none"""
+        while self.heap and self.heap[0].cancelled:
+            heapq.heappop(self.heap)
+        return self.heap[0].time if self.heap else float("inf")
+
+    def pop_due(self, now: float) -> List[TimerEvent]:
+        """Remove and return every pending event due at or before now, in order"""
+        due = []
+        heap = self.heap
+        while heap and heap[0].time <= now:
+            event = heapq.heappop(heap)
+            if not event.cancelled:
+                # Mark fired events so a late cancel() is a no-op
+                event.cancelled = True
+                self.active -= 1
+                due.append(event)
+        return due
+
+    def pending(self) -> List[TimerEvent]:
+        """Pending events in firing order"""
+        return sorted(event for event in self.heap if not event.cancelled)
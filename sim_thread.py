@@ -0,0 +1,286 @@
+"""Simulation stepped on its own thread, rendered from double-buffered snapshots.
+
+A SimThread owns a Simulation: it runs the fixed steps, the commands and the
+hooks (such as the AI and autosaves) on a background thread, and after
+stepping it copies everything the renderer reads into a WorldSnapshot.  Two
+snapshots are kept.  The renderer takes the front one at the start of each
+frame and the thread only ever writes into the other, swapping them under a
+lock once the copy is complete, so a frame never sees a half-stepped world.
+The thread publishes again only after the renderer has taken the last
+snapshot, so a slow renderer costs the simulation no copies.
+
+Snapshot columns are copied in place and made read-only; planet views and
+the spatial index are rebuilt only when planets are added or removed, and
+fleet views only for slots that came into use.  Input from other threads
+reaches the simulation through submit() and call(), applied between steps
+in the order they were made.  Pure Python and NumPy, no pygame.
+"""
+from dataclasses import replace
+from operator import methodcaller
+from typing import Callable, Dict, List, Optional
+import queue
+import threading
+import time
+import numpy as np
+from economy import EconomyLedger
+from fleet_store import Fleet, FleetStore
+from galaxy import ChunkedGalaxy
+from hyperlanes import HyperlaneGraph
+from planet_store import PLANET_COLUMNS, Planet, PlanetStore
+from spatial_index import SpatialGrid
+
+PLANET_SNAPSHOT_COLUMNS = ("position",) + tuple(PLANET_COLUMNS)
+FLEET_SNAPSHOT_COLUMNS = ("position", "previous_position", "destination", "speed", "owner",
+                          "size", "fighters", "moving", "alive")
+
+def copy_columns(target, source, names, count: int):
+    """Copy the first count rows of columns from one store into another's read-only ones"""
+    for name in names:
+        column = getattr(target, name)
+        column.flags.writeable = True
+        column[:count] = getattr(source, name)[:count]
+        column.flags.writeable = False
+
+def copy_galaxy(galaxy: ChunkedGalaxy) -> ChunkedGalaxy:
+    """Which chunks of a galaxy are loaded, without its generated contents"""
+    copy = ChunkedGalaxy(galaxy.seed, galaxy.width, galaxy.height, cache_size=0)
+    copy.loaded = dict(galaxy.loaded)
+    copy.modified = set(galaxy.modified)
+    copy.version = galaxy.version
+    return copy
+
+class WorldSnapshot:
+    """A read-only copy of the simulation state the renderer reads.
+
+    Offers the same attributes as Simulation for drawing, hit-testing and
+    the HUD, so the renderer can read either one.
+    """
+
+    def __init__(self):
+        self.source = None  # Simulation last captured
+        self.fleet_store = FleetStore(0)
+        self.planet_store = PlanetStore(self.fleet_store, 0)
+        self.planets_version = None  # Planet store version the views and index were built for
+        self.planets: Dict[str, Planet] = {}
+        self.planet_index = SpatialGrid()
+        self.fleets: Dict[int, Fleet] = {}
+        self.battles: list = []
+        self.ownership_changes: List[str] = []
+        self.ledger = EconomyLedger()
+        self.resources: Dict[str, int] = {}
+        self.hyperlanes: Optional[HyperlaneGraph] = None
+        self.galaxy: Optional[ChunkedGalaxy] = None
+        self.current_day = 1
+        self.day_timer = 0.0
+        self.seconds_per_day = 0.0
+        self.current_time = 0.0
+        self.tick = 0
+        self.revision = 0
+        self.seed = 0
+        self.rules = None
+        self.world_size = (0, 0)
+        self.captured_at = 0.0  # perf_counter() when the snapshot was taken
+        self.interpolation = 0.0  # Fraction of a step owed to the simulation when taken
+        self.game_speed = 1
+
+    def capture(self, sim, hyperlanes: HyperlaneGraph, galaxy: Optional[ChunkedGalaxy]):
+        """Copy the state of sim, which must not be stepped meanwhile"""
+        if sim is not self.source:
+            # A replaced simulation shares no rows or history with the old one
+            self.source = sim
+            self.planets_version = None
+            self.battles = []
+            self.ownership_changes = []
+        self.capture_fleets(sim)
+        self.capture_planets(sim)
+        self.battles.extend(sim.battles[len(self.battles):])
+        self.ownership_changes.extend(sim.ownership_changes[len(self.ownership_changes):])
+        self.ledger.totals = {owner: replace(totals) for owner, totals in sim.ledger.totals.items()}
+        self.resources = dict(sim.resources)
+        self.hyperlanes = hyperlanes
+        self.galaxy = galaxy
+        self.current_day = sim.current_day
+        self.day_timer = sim.day_timer
+        self.seconds_per_day = sim.seconds_per_day
+        self.current_time = sim.current_time
+        self.tick = sim.tick
+        self.revision = sim.revision
+        self.seed = sim.seed
+        self.rules = sim.rules
+        self.world_size = sim.world_size
+
+    def capture_fleets(self, sim):
+        source = sim.fleet_store
+        store = self.fleet_store
+        if store.capacity != source.capacity:
+            store = self.fleet_store = FleetStore(source.capacity)
+            self.planet_store.fleet_store = store
+        was_alive = store.alive[:source.count].copy()
+        copy_columns(store, source, FLEET_SNAPSHOT_COLUMNS, source.count)
+        store.count = source.count
+        store.owner_names = list(source.owner_names)
+        alive = store.alive[:source.count]
+        for slot in np.flatnonzero(alive & ~was_alive).tolist():
+            Fleet.attach(store, slot)
+        for slot in np.flatnonzero(was_alive & ~alive).tolist():
+            store.views[slot] = None
+        views = store.views
+        self.fleets = {slot: views[slot] for slot in sim.fleets}
+
+    def capture_planets(self, sim):
+        source = sim.planet_store
+        store = self.planet_store
+        if self.planets_version != source.version:
+            store = self.planet_store = PlanetStore(self.fleet_store, source.capacity,
+                                                    source.position.dtype)
+            store.count = source.count
+            store.names = list(source.names)
+            copy_columns(store, source, PLANET_SNAPSHOT_COLUMNS, source.count)
+            store.views = [Planet.attach(store, row) for row in range(store.count)]
+            self.planets = dict(zip(store.names, store.views))
+            self.planet_index = SpatialGrid()
+            self.planet_index.insert_many(store.views, store.position[:store.count].tolist())
+            self.planets_version = source.version
+        else:
+            copy_columns(store, source, PLANET_SNAPSHOT_COLUMNS, source.count)
+        store.owner_names = list(source.owner_names)
+        store.owner_ids = dict(source.owner_ids)
+        store.queues = {row: list(queue) for row, queue in source.queues.items() if queue}
+
+    def daily_income(self, owner: str) -> int:
+        return self.ledger.income(owner)
+
+    def fleets_in_rect(self, x: float, y: float, width: float, height: float) -> List[Fleet]:
+        """Fleets in space positioned inside a world-space rectangle"""
+        slots = self.fleet_store.query_rect(x, y, width, height)
+        return [self.fleets[slot] for slot in slots.tolist() if slot in self.fleets]
+
+class SimThread:
+    """Steps a simulation in real time on a background thread and publishes snapshots of it.
+
+    Every hook is called with the simulation after each round of steps.
+    """
+
+    networked = False  # Whether the steps come from other players, see netplay.py
+
+    def __init__(self, sim, dt: float, max_steps: int, max_frame_time: float,
+                 hooks: List[Callable] = ()):
+        self.sim = sim
+        self.dt = dt
+        self.max_steps = max_steps  # Steps per round before the backlog is dropped
+        self.max_frame_time = max_frame_time
+        self.hooks = list(hooks)
+        self.game_speed = 1  # Game seconds per real second, set by the renderer
+        self.accumulator = 0.0
+        self.steps = 0  # Steps taken on the thread, for measuring throughput
+        self.stale = False  # The simulation changed since the last published snapshot
+        self.inbox = queue.SimpleQueue()  # (function, args) to run on the thread
+        self.snapshots = [WorldSnapshot(), WorldSnapshot()]
+        self.front = self.snapshots[0]  # Latest complete snapshot
+        self.reading: Optional[WorldSnapshot] = None  # Snapshot the renderer last took
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.lanes = (None, -1, None)  # (simulation graph, its version, renderer's copy)
+        self.galaxy_copy: Optional[ChunkedGalaxy] = None
+        self.thread = threading.Thread(target=self.run, name="simulation", daemon=True)
+        self.capture(self.front, time.perf_counter())
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        """Finish the current round and stop stepping; the simulation is the caller's again"""
+        self.stopping.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def submit(self, command):
+        """Queue a command for the simulation, applied at the start of its next step"""
+        self.call(methodcaller("submit", command))
+
+    def call(self, function: Callable, *args):
+        """Run function(sim, *args) on the thread before its next step"""
+        self.inbox.put((function, args))
+
+    def latest(self) -> WorldSnapshot:
+        """The newest snapshot, which stays unchanged until latest() is called again"""
+        if self.error is not None:
+            raise RuntimeError("simulation thread failed") from self.error
+        with self.lock:
+            self.reading = self.front
+            return self.front
+
+    def run(self):
+        try:
+            previous = time.perf_counter()
+            while not self.stopping.is_set():
+                now = time.perf_counter()
+                self.accumulator += min(now - previous, self.max_frame_time) * self.game_speed
+                previous = now
+                changed = self.drain()
+                changed = self.advance() or changed
+                for hook in self.hooks:
+                    hook(self.sim)
+                self.stale = (self.stale or changed) and not self.publish()
+                # Sleep until the next step is due
+                elapsed = time.perf_counter() - now
+                self.stopping.wait(max(0.0, (self.dt - self.accumulator) / self.game_speed - elapsed))
+        except BaseException as error:
+            self.error = error
+            raise
+
+    def drain(self) -> bool:
+        """Run everything queued by other threads; returns whether there was any"""
+        ran = False
+        while True:
+            try:
+                function, args = self.inbox.get_nowait()
+            except queue.Empty:
+                return ran
+            function(self.sim, *args)
+            ran = True
+
+    def advance(self) -> int:
+        """Take the steps the accumulated time is owed"""
+        steps = 0
+        while self.accumulator >= self.dt:
+            if steps == self.max_steps:
+                # Too slow to keep up, drop the backlog rather than stall
+                self.accumulator = 0.0
+                break
+            self.sim.step(self.dt)
+            self.accumulator -= self.dt
+            steps += 1
+        self.steps += steps
+        return steps
+
+    def publish(self) -> bool:
+        """Copy the simulation into the back snapshot and swap it to the front.
+
+        Skipped while the renderer has not taken the front snapshot yet, as
+        the back one may be the snapshot it is still drawing.
+        """
+        with self.lock:
+            if self.reading is not self.front:
+                return False
+            back = self.snapshots[1] if self.front is self.snapshots[0] else self.snapshots[0]
+        self.capture(back, time.perf_counter())
+        with self.lock:
+            self.front = back
+        return True
+
+    def capture(self, snapshot: WorldSnapshot, now: float):
+        sim = self.sim
+        graph = sim.hyperlanes
+        if self.lanes[0] is not graph or self.lanes[1] != graph.version:
+            # The renderer's own copy, so its route queries never touch the simulation's cache
+            copy = graph.copy()
+            self.lanes = (graph, graph.version, copy)
+        galaxy = sim.galaxy
+        if galaxy is not None and (self.galaxy_copy is None or self.galaxy_copy.version != galaxy.version):
+            self.galaxy_copy = copy_galaxy(galaxy)
+        snapshot.capture(sim, self.lanes[2], self.galaxy_copy if galaxy is not None else None)
+        snapshot.captured_at = now
+        snapshot.interpolation = self.accumulator / self.dt
+        snapshot.game_speed = self.game_speed
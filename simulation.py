@@ -0,0 +1,520 @@
+"""Headless Galaxy Conquest simulation.
+
+Owns planets, fleets, construction, battles, day ticks and the economy.  The
+planets are either a fixed map or the loaded chunks of a procedural galaxy
+(see galaxy.py); costs and build times come from the match's Rules.  This
+module must never import pygame so it can run on servers without SDL; the
+pygame front end in galaxy_conquest.py drives it and renders its state.
+"""
+from dataclasses import dataclass
+from typing import List, Dict, Optional
+import random
+import numpy as np
+import combat
+from combat import Battle
+from economy import EconomyLedger
+from fleet_store import Fleet, FleetStore
+from galaxy import ChunkedGalaxy
+from planet_store import Planet, PlanetStore
+from hyperlanes import HyperlaneGraph
+from scheduler import Scheduler, TimerEvent
+from spatial_index import SpatialGrid
+
+# Constants
+WORLD_WIDTH = 4096
+WORLD_HEIGHT = 3072
+SPACE_STATION_COST = 500  # Cost of a level 1 station, each level costs 500 more
+FIGHTER_COST = 100
+STATION_BUILD_TIME = 20  # Seconds
+FIGHTER_BUILD_TIME = 10  # Seconds
+MAX_STATION_LEVEL = 5
+SECONDS_PER_DAY = 30
+STARTING_RESOURCES = 100_000
+
+# Planet Data - Fixed positions for 20 planets with Star Wars names
+PLANET_DATA = [
+    # Core worlds (Player start) - Highest resource generation
+    ("Coruscant", (800, 1536), "player", 50),    # Player's capital - major industrial center
+    ("Bastion", (3296, 1536), "ai", 50),         # AI's capital - major industrial center
+
+    # Inner Ring - High resource generation
+    ("Corellia", (1248, 800), "neutral", 30),    # Major shipyard world
+    ("Alderaan", (2048, 600), "neutral", 35),    # Wealthy core world
+    ("Kuat", (2848, 800), "neutral", 40),        # Major shipyard world
+    ("Naboo", (1248, 2272), "neutral", 25),      # Rich in plasma energy
+    ("Kashyyyk", (2048, 2472), "neutral", 30),   # Rich in natural resources
+    ("Mon Calamari", (2848, 2272), "neutral", 35), # Major shipyard world
+
+    # Middle Ring - Medium resource generation
+    ("Mandalore", (1000, 1200), "neutral", 20),  # Mining world
+    ("Bothawui", (1600, 1000), "neutral", 15),   # Trade hub
+    ("Fondor", (2496, 1000), "neutral", 25),     # Industrial world
+    ("Bilbringi", (3096, 1200), "neutral", 20),  # Shipyard world
+    ("Ord Mantell", (1000, 1872), "neutral", 15), # Trade hub
+    ("Bestine", (1600, 2072), "neutral", 20),    # Mining colony
+    ("Anaxes", (2496, 2072), "neutral", 25),     # Fortress world
+    ("Rhinnal", (3096, 1872), "neutral", 15),    # Medical world
+
+    # Outer Systems - Lower resource generation
+    ("Hoth", (2048, 200), "neutral", 10),        # Ice world
+    ("Tatooine", (400, 1536), "neutral", 5),     # Desert world
+    ("Endor", (3696, 1536), "neutral", 10),      # Forest moon
+    ("Mustafar", (2048, 2872), "neutral", 15),   # Mining world
+]
+
+def station_cost(level: int, space_station_cost: int = SPACE_STATION_COST) -> int:
+    """Cost of building a station up to the given level"""
+    return space_station_cost * level
+
+@dataclass(frozen=True)
+class Rules:
+    """Costs and build times of a match, the parameters balance runs vary"""
+    space_station_cost: int = SPACE_STATION_COST  # Level 1, each level costs this much more
+    fighter_cost: int = FIGHTER_COST
+    station_build_time: float = STATION_BUILD_TIME  # Seconds
+    fighter_build_time: float = FIGHTER_BUILD_TIME  # Seconds
+
+    def station_cost(self, level: int) -> int:
+        return station_cost(level, self.space_station_cost)
+
+DEFAULT_RULES = Rules()
+
+class Simulation:
+    """Game state and rules, advanced in fixed steps of game time"""
+
+    def __init__(self, planet_data=PLANET_DATA, seconds_per_day: float = SECONDS_PER_DAY,
+                 starting_resources: int = STARTING_RESOURCES, seed: int = 0,
+                 galaxy: Optional[ChunkedGalaxy] = None, rules: Rules = DEFAULT_RULES):
+        """A game on a fixed map, or on a procedural galaxy with planet_data empty.
+
+        A galaxy without loaded chunks gets its home chunks loaded and the
+        capitals handed to their factions.
+        """
+        self.fleet_store = FleetStore()
+        self.fleets: Dict[int, Fleet] = {}  # Fleets in space by store slot, not docked at a planet
+        self.arrived_fleets: List[Fleet] = []  # Fleets that reached their destination this step
+        self.voyages: Dict[int, str] = {}  # Slot of each fleet travelling to a planet -> that planet
+        self._hyperlanes = None
+        self.resources: Dict[str, int] = {"player": starting_resources, "ai": starting_resources}
+        self.current_day = 1
+        self.day_timer = 0
+        self.seconds_per_day = seconds_per_day
+        self.current_time = 0.0
+        self.planet_index = SpatialGrid()
+        self.scheduler = Scheduler()
+        self.build_events: Dict[tuple[str, str], TimerEvent] = {}  # (planet, kind) -> completion
+        self.ledger = EconomyLedger()
+        self.revision = 0  # Bumped whenever visible state changes
+        self.ownership_changes: List[str] = []  # Names of planets in the order they changed owner
+        self.battles: List[Battle] = []  # Every battle fought, in order
+        self.seed = seed
+        self.rng = random.Random(seed)  # Every random draw of the rules comes from this stream
+        self.tick = 0  # Steps taken so far
+        self.pending_commands: list = []  # Submitted commands, applied at the start of the next step
+        self.command_log = None  # Told about every applied command and each new day, see replay.py
+        self.galaxy = galaxy
+        self.rules = rules
+
+        # Planets don't store resources, so every column but these starts at zero
+        self.planet_store = PlanetStore.from_data(planet_data, self.fleet_store)
+        store = self.planet_store
+        self.planets: Dict[str, Planet] = dict(zip(store.names, store.views))
+        for owner, resource_rate in zip(store.owner[:store.count].tolist(),
+                                        store.resource_rate[:store.count].tolist()):
+            self.ledger.add_planet(store.owner_names[owner], resource_rate)
+        self.planet_index.insert_many(store.views, store.position[:store.count].tolist())
+        if galaxy is not None and not galaxy.loaded:
+            for chunk, index, owner in galaxy.homes():
+                self.load_chunk(chunk)
+                self.set_owner(self.planets[galaxy.loaded[chunk][index]], owner)
+
+    def step(self, dt: float):
+        """Advance the simulation by dt seconds of game time"""
+        # Commands take effect on tick boundaries so replays see them at the same tick
+        if self.pending_commands:
+            self.apply_commands()
+
+        self.current_time += dt
+        self.day_timer += dt
+
+        # Finish only the construction that is due
+        for event in self.scheduler.pop_due(self.current_time):
+            self.complete_build(*event.args)
+            self.revision += 1
+
+        # Move all fleets in flight in one vectorized pass
+        arrived = self.fleet_store.advance(dt)
+        views = self.fleet_store.views
+        self.arrived_fleets = [views[slot] for slot in arrived]
+        if self.fleet_store.settling:
+            self.revision += 1
+        if self.voyages:
+            landings = [(fleet, self.planets[self.voyages.pop(fleet.slot)])
+                        for fleet in self.arrived_fleets if fleet.slot in self.voyages]
+            if landings:
+                self.land(landings)
+
+        # Update day timer, carrying the overshoot into the next day so the clock doesn't drift
+        new_day = False
+        while self.day_timer >= self.seconds_per_day:
+            self.day_timer -= self.seconds_per_day
+            self.current_day += 1
+            self.collect_income()
+            new_day = True
+
+        self.tick += 1
+        if new_day and self.command_log is not None:
+            self.command_log.day_started(self)
+
+    @property
+    def hyperlanes(self) -> HyperlaneGraph:
+        """The lane network fleets travel on, built on first use"""
+        if self._hyperlanes is None:
+            store = self.planet_store
+            lanes = self.galaxy.loaded_lanes() if self.galaxy is not None else None
+            self._hyperlanes = HyperlaneGraph(store.names, store.position[:store.count].tolist(),
+                                              lanes=lanes)
+        return self._hyperlanes
+
+    @property
+    def world_size(self) -> tuple:
+        """Width and height of the world planets can be in"""
+        if self.galaxy is not None:
+            return self.galaxy.size
+        return (WORLD_WIDTH, WORLD_HEIGHT)
+
+    def add_planet(self, name: str, position, owner: str, resource_rate: int) -> Planet:
+        planet = self.planet_store.add(name, position, owner, resource_rate)
+        self.planets[name] = planet
+        self.ledger.add_planet(owner, resource_rate)
+        self.planet_index.insert(planet, planet.position)
+        return planet
+
+    def remove_planet(self, name: str):
+        """Take a planet out of the game, with whatever it holds"""
+        planet = self.planets.pop(name)
+        self.planet_index.remove(planet)
+        self.ledger.remove_planet(planet.owner, planet.resource_rate, planet.station_level)
+        self.planet_store.remove(planet.row)
+
+    def load_chunk(self, chunk: tuple) -> bool:
+        """Add the planets of a galaxy chunk that isn't loaded yet"""
+        galaxy = self.galaxy
+        if galaxy is None or chunk in galaxy.loaded or not galaxy.contains(chunk):
+            return False
+        systems = galaxy.systems(chunk)
+        for name, position, rate in zip(systems.names, systems.positions.tolist(),
+                                        systems.rates.tolist()):
+            self.add_planet(name, tuple(position), "neutral", rate)
+        galaxy.loaded[chunk] = systems.names
+        if self._hyperlanes is not None:
+            for name, position in zip(systems.names, systems.positions.tolist()):
+                self._hyperlanes.add_planet(name, position)
+            self._hyperlanes.add_lanes(galaxy.lanes_of(chunk))
+        self.chunks_changed()
+        return True
+
+    def unload_chunk(self, chunk: tuple) -> bool:
+        """Drop the planets of a loaded chunk, unless the game has changed any of them"""
+        galaxy = self.galaxy
+        if galaxy is None or chunk not in galaxy.loaded or self.chunk_modified(chunk):
+            return False
+        names = galaxy.loaded.pop(chunk)
+        for name in names:
+            self.remove_planet(name)
+        if self._hyperlanes is not None:
+            self._hyperlanes.remove_planets(names)
+        self.chunks_changed()
+        return True
+
+    def chunks_changed(self):
+        self.galaxy.version += 1
+        self.revision += 1
+
+    def chunk_modified(self, chunk: tuple) -> bool:
+        """Whether any planet of a loaded chunk differs from how it was generated.
+
+        Chunks where a planet changed owner stay modified for good; the rest
+        are checked as they are now.
+        """
+        galaxy = self.galaxy
+        if chunk in galaxy.modified:
+            return True
+        names = galaxy.loaded[chunk]
+        store = self.planet_store
+        rows = [self.planets[name].row for name in names]
+        return bool((store.owner[rows] != store.owner_ids.get("neutral", -1)).any()
+                    or (store.fleet[rows] >= 0).any()
+                    or store.station_level[rows].any()
+                    or store.building_station[rows].any()
+                    or store.building_fighter[rows].any()
+                    or store.resources[rows].any()
+                    or store.fleet_size[rows].any()
+                    or any(store.queues.get(row) for row in rows)
+                    or not set(names).isdisjoint(self.voyages.values()))
+
+    def submit(self, command):
+        """Queue a command to be applied at the start of the next step"""
+        self.pending_commands.append(command)
+
+    def apply_commands(self):
+        """Apply the submitted commands in order, logging each before it runs"""
+        commands, self.pending_commands = self.pending_commands, []
+        for command in commands:
+            if self.command_log is not None:
+                self.command_log.record(self.tick, command)
+            command.apply(self)
+
+    def run(self, seconds: float, dt: float):
+        """Advance the simulation by whole steps of dt covering seconds"""
+        for _ in range(int(round(seconds / dt))):
+            self.step(dt)
+
+    def create_fleet(self, owner: str, position, destination=None, fighters: int = 0) -> Fleet:
+        """Create a fleet in space, stored in this simulation's fleet store"""
+        fleet = Fleet(owner=owner, size=0, position=position, destination=destination,
+                      fighters=fighters, store=self.fleet_store)
+        self.fleets[fleet.slot] = fleet
+        return fleet
+
+    def remove_fleet(self, fleet: Fleet, destroy: bool = False):
+        """Take a fleet out of space, releasing its slot if it was destroyed"""
+        self.fleets.pop(fleet.slot, None)
+        self.voyages.pop(fleet.slot, None)
+        if destroy:
+            fleet.release()
+
+    def fleets_in_rect(self, x: float, y: float, width: float, height: float) -> List[Fleet]:
+        """Fleets in space positioned inside a world-space rectangle"""
+        slots = self.fleet_store.query_rect(x, y, width, height)
+        return [self.fleets[slot] for slot in slots.tolist() if slot in self.fleets]
+
+    def collect_income(self):
+        """Add one day of resource income to every faction"""
+        for owner in self.resources:
+            self.resources[owner] += self.ledger.income(owner)
+
+    def daily_income(self, owner: str) -> int:
+        """Total daily resource income from all planets owned by owner"""
+        return self.ledger.income(owner)
+
+    def set_owner(self, planet: Planet, owner: str):
+        """Change a planet's owner, keeping the economy ledger in step"""
+        if planet.owner == owner:
+            return
+        self.ledger.transfer(planet.owner, owner, planet.resource_rate, planet.station_level)
+        planet.owner = owner
+        if self.galaxy is not None:
+            self.galaxy.modified.add(self.galaxy.chunk_of(planet.position))
+        self.ownership_changes.append(planet.name)
+        self.revision += 1
+
+    def build_station(self, planet_name: str) -> bool:
+        """Order the next station level at a planet if its owner can afford it.
+
+        Starts immediately, or waits in the planet's production queue behind
+        the level already under construction.
+        """
+        planet = self.planets[planet_name]
+        level = planet.station_level + planet.building_station + planet.queued("station") + 1
+        if level > MAX_STATION_LEVEL:
+            return False
+        return self.order(planet, "station", self.rules.station_cost(level))
+
+    def build_fighter(self, planet_name: str) -> bool:
+        """Order a fighter at a planet with a station if its owner can afford it"""
+        planet = self.planets[planet_name]
+        if planet.station_level < 1:
+            return False
+        return self.order(planet, "fighter", self.rules.fighter_cost)
+
+    def order(self, planet: Planet, kind: str, cost: int) -> bool:
+        """Pay for a production order and start or queue it"""
+        if self.resources.get(planet.owner, 0) < cost:
+            return False
+        self.resources[planet.owner] -= cost
+        if (planet.name, kind) in self.build_events:
+            planet.enqueue(kind, cost)
+        else:
+            self.start_build(planet, kind, cost)
+        return True
+
+    def start_build(self, planet: Planet, kind: str, cost: int):
+        """Begin construction and schedule its completion"""
+        if kind == "station":
+            planet.add_station_level(self.current_time)
+            build_time = self.rules.station_build_time
+        else:
+            planet.add_fighter(self.current_time)
+            build_time = self.rules.fighter_build_time
+        self.build_events[(planet.name, kind)] = self.scheduler.schedule(
+            self.current_time + build_time, "build", planet.name, kind, cost)
+
+    def complete_build(self, planet_name: str, kind: str, cost: int):
+        """Finish a construction and start the next queued order of its kind"""
+        planet = self.planets[planet_name]
+        del self.build_events[(planet_name, kind)]
+        if kind == "station":
+            planet.complete_station()
+            self.ledger.add_station_level(planet.owner)
+        else:
+            planet.complete_fighter(self.fleet_store)
+        self.start_next(planet, kind)
+
+    def start_next(self, planet: Planet, kind: str):
+        for index, (queued_kind, cost) in enumerate(planet.production_queue):
+            if queued_kind == kind:
+                del planet.production_queue[index]
+                self.start_build(planet, kind, cost)
+                return
+
+    def cancel_build(self, planet_name: str, kind: str) -> bool:
+        """Cancel the newest order of a kind at a planet and refund its cost.
+
+        Queued orders are cancelled before the one under construction.
+        """
+        planet = self.planets[planet_name]
+        for index in range(len(planet.production_queue) - 1, -1, -1):
+            queued_kind, cost = planet.production_queue[index]
+            if queued_kind == kind:
+                del planet.production_queue[index]
+                self.refund(planet.owner, cost)
+                return True
+
+        event = self.build_events.pop((planet_name, kind), None)
+        if event is None:
+            return False
+        self.scheduler.cancel(event)
+        if kind == "station":
+            planet.building_station = False
+        else:
+            planet.building_fighter = False
+        self.refund(planet.owner, event.args[2])
+        return True
+
+    def refund(self, owner: str, amount: int):
+        if owner in self.resources:
+            self.resources[owner] += amount
+
+    def transfer_fleet(self, from_name: str, to_name: str) -> bool:
+        """Send the fleet stationed at one planet along the hyperlanes to another"""
+        source = self.planets[from_name]
+        fleet = source.fleet
+        if fleet is None or from_name == to_name or to_name not in self.planets:
+            return False
+        route = self.hyperlanes.route(from_name, to_name)
+        if route is None:
+            return False
+
+        # The fleet leaves its planet and flies from lane to lane
+        source.fleet = None
+        self.fleets[fleet.slot] = fleet
+        fleet.follow([self.planets[name].position for name in route[1:]])
+        self.voyages[fleet.slot] = to_name
+        self.revision += 1
+        return True
+
+    def land(self, landings: List[tuple]):
+        """Handle fleets arriving at planets, fighting every battle they start at once.
+
+        Fleets of one side attacking the same planet in the same step fight
+        together.  A fleet of a third side arriving at a planet that is
+        already being attacked lands after that battle is decided.
+        """
+        attacks: Dict[str, List[Fleet]] = {}  # Planet name -> attacking fleets
+        later = []
+        for fleet, planet in landings:
+            attackers = attacks.get(planet.name)
+            if attackers is not None:
+                if attackers[0].owner == fleet.owner:
+                    attackers.append(fleet)
+                else:
+                    later.append((fleet, planet))
+            elif self.hostile(planet, fleet.owner):
+                attacks[planet.name] = [fleet]
+            else:
+                self.dock(fleet, planet)
+        if attacks:
+            self.fight(attacks)
+        if later:
+            self.land(later)
+
+    def hostile(self, planet: Planet, owner: str) -> bool:
+        """Whether a fleet of owner arriving at planet has to fight for it"""
+        if planet.fleet is not None and planet.fleet.owner != owner:
+            return True
+        return planet.owner not in ("neutral", owner)
+
+    def fight(self, attacks: Dict[str, List[Fleet]]):
+        """Resolve the battles at every attacked planet in one batched pass"""
+        planets = [self.planets[name] for name in attacks]
+        groups = list(attacks.values())
+        attackers = np.array([sum(fleet.fighters + fleet.size for fleet in group) for group in groups])
+        defenders = np.array([planet.fleet.fighters + planet.fleet.size if planet.fleet else 0
+                              for planet in planets])
+        levels = np.array([planet.station_level for planet in planets])
+        garrisons = np.array([planet.owner != "neutral" for planet in planets])
+        outcome = combat.resolve(attackers, defenders, levels, garrisons)
+
+        columns = zip(outcome.attack.tolist(), outcome.defence.tolist(), attackers.tolist(),
+                      defenders.tolist(), levels.tolist(), outcome.attackers_left.tolist(),
+                      outcome.defenders_left.tolist(), outcome.station_level_left.tolist(),
+                      outcome.conquered.tolist())
+        for planet, group, result in zip(planets, groups, columns):
+            level, attackers_left, defenders_left, level_left, conquered = result[4:]
+            attacker = group[0].owner
+            defender = planet.fleet.owner if planet.fleet else planet.owner
+            for fleet in group:
+                self.fleets.pop(fleet.slot, None)
+            if level_left < level:
+                self.ledger.remove_station_levels(planet.owner, level - level_left)
+                planet.station_level = level_left
+                planet.has_space_station = level_left > 0
+            if planet.fleet is not None:
+                if defenders_left:
+                    planet.fleet.fighters = defenders_left
+                    planet.fleet.size = 0
+                else:
+                    planet.fleet.release()
+                    planet.fleet = None
+
+            if conquered:
+                # The surviving attackers merge into one fleet that holds the planet
+                fleet = group[0]
+                fleet.fighters = attackers_left
+                fleet.size = 0
+                for other in group[1:]:
+                    other.release()
+                self.clear_production(planet)
+                self.set_owner(planet, attacker)
+                planet.fleet = fleet
+            else:
+                for fleet in group:
+                    fleet.release()
+            self.battles.append(Battle(planet.name, attacker, defender, self.current_time, *result))
+        self.revision += 1
+
+    def clear_production(self, planet: Planet):
+        """Drop a lost planet's construction and production queue without refunds"""
+        for kind in ("station", "fighter"):
+            event = self.build_events.pop((planet.name, kind), None)
+            if event is not None:
+                self.scheduler.cancel(event)
+        planet.building_station = False
+        planet.building_fighter = False
+        self.planet_store.queues.pop(planet.row, None)
+
+    def dock(self, fleet: Fleet, planet: Planet):
+        """Station an arriving fleet at a friendly or undefended planet, conquering neutrals"""
+        self.fleets.pop(fleet.slot, None)
+        if planet.owner == "neutral":
+            self.set_owner(planet, fleet.owner)
+
+        if planet.fleet is None:
+            planet.fleet = fleet
+        else:
+            # Fleets of the same side merge
+            planet.fleet.fighters += fleet.fighters
+            planet.fleet.size += fleet.size
+            fleet.release()
+        self.revision += 1
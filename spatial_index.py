@@ -0,0 +1,136 @@
+"""Uniform grid spatial index over world positions.
+
+Used for hit-testing and viewport culling so that click handling and drawing
+only look at the handful of planets and fleets near a point instead of
+scanning the whole galaxy.  Pure Python, no pygame.
+"""
+from typing import Dict, List, Optional
+
+SPATIAL_CELL_SIZE = 256
+
+class SpatialGrid:
+    """Buckets items into square world-space cells by position.
+
+    Items are tracked by identity, so unhashable objects such as dataclass
+    instances can be indexed directly.
+    """
+
+    def __init__(self, cell_size: int = SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells: Dict[tuple[int, int], Dict[int, object]] = {}
+        self.entries: Dict[int, tuple[object, float, float, tuple[int, int]]] = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, item):
+        return id(item) in self.entries
+
+    def cell_of(self, x: float, y: float) -> tuple[int, int]:
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def insert(self, item, pos):
+        """Add an item at a world position, or move it if already indexed"""
+        key = id(item)
+        if key in self.entries:
+            self.move(item, pos)
+            return
+        cell = self.cell_of(pos[0], pos[1])
+        self.cells.setdefault(cell, {})[key] = item
+        self.entries[key] = (item, pos[0], pos[1], cell)
+
+    def insert_many(self, items, positions):
+        """Add many items that are not indexed yet, in one pass"""
+        size = self.cell_size
+        cells = self.cells
+        entries = self.entries
+        for item, (x, y) in zip(items, positions):
+            key = id(item)
+            cell = (int(x // size), int(y // size))
+            bucket = cells.get(cell)
+            if bucket is None:
+                bucket = cells[cell] = {}
+            bucket[key] = item
+            entries[key] = (item, x, y, cell)
+
+    def move(self, item, pos):
+        """Update an item's position, rebucketing only if it changed cell"""
+        key = id(item)
+        _, _, _, old_cell = self.entries[key]
+        cell = self.cell_of(pos[0], pos[1])
+        if cell != old_cell:
+            bucket = self.cells[old_cell]
+            del bucket[key]
+            if not bucket:
+                del self.cells[old_cell]
+            self.cells.setdefault(cell, {})[key] = item
+        self.entries[key] = (item, pos[0], pos[1], cell)
+
+    def remove(self, item):
+        """Remove an item from the index if it is present"""
+        entry = self.entries.pop(id(item), None)
+        if entry is None:
+            return
+        cell = entry[3]
+        bucket = self.cells[cell]
+        del bucket[id(item)]
+        if not bucket:
+            del self.cells[cell]
+
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+
+    def query_radius(self, pos, radius: float) -> List[object]:
+        """All items within radius of a world position"""
+        x, y = pos
+        radius_sq = radius * radius
+        first_cx, first_cy = self.cell_of(x - radius, y - radius)
+        last_cx, last_cy = self.cell_of(x + radius, y + radius)
+        found = []
+        for cx in range(first_cx, last_cx + 1):
+            for cy in range(first_cy, last_cy + 1):
+                bucket = self.cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for key in bucket:
+                    item, ix, iy, _ = self.entries[key]
+                    dx = ix - x
+                    dy = iy - y
+                    if dx * dx + dy * dy <= radius_sq:
+                        found.append(item)
+        return found
+
+    def query_point(self, pos, radius: float) -> Optional[object]:
+        """The item nearest to a world position within radius, if any"""
+        x, y = pos
+        best = None
+        best_sq = radius * radius
+        for item in self.query_radius(pos, radius):
+            _, ix, iy, _ = self.entries[id(item)]
+            distance_sq = (ix - x) ** 2 + (iy - y) ** 2
+            if distance_sq <= best_sq:
+                best = item
+                best_sq = distance_sq
+        return best
+
+    def query_rect(self, x: float, y: float, width: float, height: float) -> List[object]:
+        """All items whose position lies inside a world-space rectangle"""
+        first_cx, first_cy = self.cell_of(x, y)
+        last_cx, last_cy = self.cell_of(x + width, y + height)
+        if (last_cx - first_cx + 1) * (last_cy - first_cy + 1) > len(self.cells):
+            # Rectangles spanning more cells than are occupied visit the occupied ones
+            buckets = [bucket for (cx, cy), bucket in self.cells.items()
+                       if first_cx <= cx <= last_cx and first_cy <= cy <= last_cy]
+        else:
+            buckets = [self.cells.get((cx, cy)) for cx in range(first_cx, last_cx + 1)
+                       for cy in range(first_cy, last_cy + 1)]
+        found = []
+        for bucket in buckets:
+            if not bucket:
+                continue
+            for key in bucket:
+                item, ix, iy, _ = self.entries[key]
+                if x <= ix <= x + width and y <= iy <= y + height:
+                    found.append(item)
+        return found